@@ -0,0 +1,99 @@
+"""Throughput of API calls issued from a pool of threads sharing a client.
+"""
+from __future__ import absolute_import
+
+from concurrent.futures import ThreadPoolExecutor
+
+from civis.tests.mock_api import MockCivisAPI
+
+N_CALLS = 64
+
+
+class ConcurrentRequests(object):
+    params = [1, 2, 4, 8, 16]
+    param_names = ['n_threads']
+
+    def setup(self, n_threads):
+        self.server = MockCivisAPI(latency=0.01).start()
+        self.client = self.server.client(pool_maxsize=n_threads)
+        self.pool = ThreadPoolExecutor(n_threads)
+
+    def teardown(self, n_threads):
+        self.pool.shutdown()
+        self.server.stop()
+
+    def time_get_requests(self, n_threads):
+        calls = [self.pool.submit(self.client.users.list_me)
+                 for _ in range(N_CALLS)]
+        for call in calls:
+            call.result()
+
+    def time_batch(self, n_threads):
+        self.client.batch([(self.client.users.list_me, ())] * N_CALLS,
+                          max_workers=n_threads)
+
+
+class GetMany(object):
+    """Getting 64 files by ID, one call after another or with
+    ``files.get_many``.
+    """
+    params = [1, 8, 16]
+    param_names = ['max_workers']
+
+    def setup(self, max_workers):
+        self.server = MockCivisAPI(latency=0.01).start()
+        self.client = self.server.client(pool_maxsize=max_workers)
+        self.file_ids = [self.server.add_file(b'data')
+                         for _ in range(N_CALLS)]
+
+    def teardown(self, max_workers):
+        self.server.stop()
+
+    def time_get_many(self, max_workers):
+        self.client.files.get_many(self.file_ids, max_workers=max_workers)
+
+
+class PaginatedListing(object):
+    """Iterating over a 1000-item listing in pages of 50."""
+    params = [1, 4, 8]
+    param_names = ['max_workers']
+
+    def setup(self, max_workers):
+        self.server = MockCivisAPI(latency=0.01, n_items=1000).start()
+        self.client = self.server.client(pool_maxsize=max_workers)
+
+    def teardown(self, max_workers):
+        self.server.stop()
+
+    def time_iterate(self, max_workers):
+        items = self.client.credentials.list(iterator=True)
+        for _ in items.prefetch(max_workers, page_size=50):
+            pass
+
+
+class Transports(object):
+    """Concurrent API calls from 8 threads with each transport. The local
+    server speaks HTTP/1.1, so this measures the overhead of each transport
+    rather than the gains from multiplexing.
+    """
+    params = ['requests', 'http2']
+    param_names = ['transport']
+
+    def setup(self, transport):
+        if transport == 'http2':
+            from civis._transport import HAS_HTTPX
+            if not HAS_HTTPX:
+                raise NotImplementedError("httpx is not installed")
+        self.server = MockCivisAPI(latency=0.01).start()
+        self.client = self.server.client(pool_maxsize=8, transport=transport)
+        self.pool = ThreadPoolExecutor(8)
+
+    def teardown(self, transport):
+        self.pool.shutdown()
+        self.server.stop()
+
+    def time_get_requests(self, transport):
+        calls = [self.pool.submit(self.client.users.list_me)
+                 for _ in range(N_CALLS)]
+        for call in calls:
+            call.result()
@@ -0,0 +1,67 @@
+"""Overhead of calling a generated API method, without any HTTP request,
+and of measuring its requests.
+"""
+from __future__ import absolute_import
+
+from collections import OrderedDict
+import json
+import os
+
+from jsonref import JsonRef
+
+import civis
+from civis._metrics import RequestMetrics
+from civis.compat import mock
+from civis.resources._resources import parse_api_spec
+
+SPEC_PATH = os.path.join(os.path.dirname(civis.__file__),
+                         'tests', 'civis_api_spec.json')
+N_CALLS = 10000
+
+
+class MethodDispatch(object):
+
+    def setup(self):
+        with open(SPEC_PATH) as f:
+            spec = json.load(f, object_pairs_hook=OrderedDict)
+        classes = parse_api_spec(JsonRef.replace_refs(spec), "1.0", "base")
+        self.scripts = classes['scripts'](session=None, return_type='raw')
+        self.scripts._call_api = lambda *args, **kwargs: None
+
+    def time_path_argument(self):
+        get = self.scripts.get_containers
+        for i in range(N_CALLS):
+            get(i)
+
+    def time_query_arguments(self):
+        list_runs = self.scripts.list_containers_runs
+        for i in range(N_CALLS):
+            list_runs(i, limit=50, page_num=2, iterator=False)
+
+    def time_body_arguments(self):
+        patch = self.scripts.patch_containers
+        for i in range(N_CALLS):
+            patch(i, name='script', docker_image_tag='latest')
+
+
+class RequestOverhead(object):
+    """Client-side cost of a request to a stubbed session."""
+    params = [False, True]
+    param_names = ['instrument']
+
+    def setup(self, instrument):
+        with open(SPEC_PATH) as f:
+            spec = json.load(f, object_pairs_hook=OrderedDict)
+        classes = parse_api_spec(JsonRef.replace_refs(spec), "1.0", "base")
+        response = mock.Mock(status_code=200, ok=True, content=b'{}',
+                             raw=None, request=mock.Mock(body=None))
+        session = mock.Mock()
+        session.request.return_value = response
+        metrics = RequestMetrics() if instrument else None
+        self.scripts = classes['scripts'](session=session, return_type='raw',
+                                          metrics=metrics)
+
+    def time_get(self, instrument):
+        get = self.scripts.get_containers
+        for i in range(N_CALLS):
+            get(i)
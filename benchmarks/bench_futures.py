@@ -0,0 +1,52 @@
+"""Waiting on CivisFutures which poll a local stand-in for the API.
+
+Runs take 0.2 seconds, so the time beyond that is the cost of polling.
+"""
+from __future__ import absolute_import
+
+from civis.futures import CivisFuture
+from civis.tests.mock_api import MockCivisAPI
+
+JOB_DURATION = 0.2
+POLLING_INTERVAL = 0.01
+
+
+class FuturePolling(object):
+    params = [1, 16]
+    param_names = ['n_futures']
+
+    def setup(self, n_futures):
+        self.server = MockCivisAPI(latency=0.005,
+                                   job_duration=JOB_DURATION).start()
+        self.client = self.server.client(pool_maxsize=n_futures)
+        self.job_id = self.client.scripts.post_containers(
+            required_resources={}, docker_command='true',
+            docker_image_name='image').id
+
+    def teardown(self, n_futures):
+        self.server.stop()
+
+    def _wait(self, n_futures):
+        scripts = self.client.scripts
+        futures = []
+        for _ in range(n_futures):
+            run_id = scripts.post_containers_runs(self.job_id).id
+            futures.append(CivisFuture(scripts.get_containers_runs,
+                                       (self.job_id, run_id),
+                                       polling_interval=POLLING_INTERVAL,
+                                       client=self.client))
+        for future in futures:
+            future.result()
+        return futures
+
+    def time_wait_for_runs(self, n_futures):
+        self._wait(n_futures)
+
+    def track_polls_per_run(self, n_futures):
+        self.server.calls.clear()
+        self._wait(n_futures)
+        polls = sum(count for (method, path), count in
+                    self.server.calls.items()
+                    if method == 'GET' and '/runs/' in path)
+        return polls / n_futures
+    track_polls_per_run.unit = 'calls'
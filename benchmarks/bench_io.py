@@ -0,0 +1,93 @@
+"""Round trips through civis.io against a local stand-in for the API and
+S3: serializing DataFrames for import, parsing the results of SQL queries,
+and transferring files.
+"""
+from __future__ import absolute_import
+
+import io
+
+import civis
+from civis.tests.mock_api import MockCivisAPI
+
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+POLLING_INTERVAL = 0.01
+
+
+def _csv(n_rows):
+    lines = ['id,name,value,created_at']
+    lines.extend('{0},name_{0},{1},2017-01-01 00:00:00'.format(i, i * 0.5)
+                 for i in range(n_rows))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class DataFrameImport(object):
+    params = [1000, 100000]
+    param_names = ['n_rows']
+
+    def setup(self, n_rows):
+        if not HAS_PANDAS:
+            raise NotImplementedError("pandas is not installed")
+        self.df = pd.read_csv(io.BytesIO(_csv(n_rows)))
+        self.server = MockCivisAPI().start()
+        self.client = self.server.client()
+
+    def teardown(self, n_rows):
+        self.server.stop()
+
+    def time_dataframe_to_civis(self, n_rows):
+        civis.io.dataframe_to_civis(
+            self.df, 'mock', 'schema.table', client=self.client,
+            polling_interval=POLLING_INTERVAL).result()
+
+
+class SQLRead(object):
+    params = [1000, 100000]
+    param_names = ['n_rows']
+
+    def setup(self, n_rows):
+        self.server = MockCivisAPI().start()
+        self.server.sql_result = _csv(n_rows)
+        self.client = self.server.client()
+
+    def teardown(self, n_rows):
+        self.server.stop()
+
+    def _read(self, use_pandas):
+        return civis.io.read_civis_sql(
+            'select * from schema.table', 'mock', use_pandas=use_pandas,
+            client=self.client, polling_interval=POLLING_INTERVAL)
+
+    def time_read_civis_sql(self, n_rows):
+        self._read(use_pandas=False)
+
+    def time_read_civis_sql_pandas(self, n_rows):
+        if not HAS_PANDAS:
+            raise NotImplementedError("pandas is not installed")
+        self._read(use_pandas=True)
+
+
+class FileTransfer(object):
+    params = [2 ** 10, 2 ** 24]
+    param_names = ['n_bytes']
+
+    def setup(self, n_bytes):
+        self.server = MockCivisAPI().start()
+        self.client = self.server.client()
+        self.contents = b'x' * n_bytes
+        self.file_id = self.server.add_file(self.contents)
+
+    def teardown(self, n_bytes):
+        self.server.stop()
+
+    def time_file_to_civis(self, n_bytes):
+        civis.io.file_to_civis(io.BytesIO(self.contents), 'file',
+                               client=self.client)
+
+    def time_civis_to_file(self, n_bytes):
+        civis.io.civis_to_file(self.file_id, io.BytesIO(),
+                               client=self.client)
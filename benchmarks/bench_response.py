@@ -0,0 +1,166 @@
+"""Converting list and single-object responses into
+civis.response.Response objects or columns, decoding them from JSON, and
+iterating over paginated responses, and finding objects in list responses.
+"""
+from __future__ import absolute_import
+
+import json
+
+import requests
+
+import civis
+from civis.response import (
+    PaginatedResponse, _response_to_json, convert_response_data_type)
+
+N_ROWS = 10000
+N_CALLS = 10000
+
+
+def _row(i):
+    return {'id': i, 'name': 'file_{}'.format(i), 'createdAt': '2017-01-01',
+            'fileSize': 1024, 'fileUrl': 'https://example.com/{}'.format(i),
+            'author': {'id': 1, 'name': 'Author', 'username': 'author',
+                       'initials': 'AU', 'online': False},
+            'detail': {'tags': ['a', 'b'], 'expiresAt': None}}
+
+
+class LargeListResponse(object):
+    params = [100, N_ROWS]
+    param_names = ['n_rows']
+
+    def setup(self, n_rows):
+        self.data = [_row(i) for i in range(n_rows)]
+        self.headers = {'X-RateLimit-Remaining': '999',
+                        'X-RateLimit-Limit': '1000'}
+
+    def _convert(self):
+        return convert_response_data_type(self.data, headers=self.headers,
+                                          return_type='snake')
+
+    def time_convert(self, n_rows):
+        self._convert()
+
+    def time_convert_and_read_top_level(self, n_rows):
+        for row in self._convert():
+            row.id, row.name, row.file_size
+
+    def time_convert_and_read_nested(self, n_rows):
+        for row in self._convert():
+            row.author.username
+
+    def peakmem_convert(self, n_rows):
+        self._convert()
+
+    def time_convert_columnar(self, n_rows):
+        convert_response_data_type(self.data, headers=self.headers,
+                                   return_type='columnar')
+
+    def peakmem_convert_columnar(self, n_rows):
+        convert_response_data_type(self.data, headers=self.headers,
+                                   return_type='columnar')
+
+
+class DecodeListResponse(object):
+    params = ['json', 'orjson']
+    param_names = ['decoder']
+
+    def setup(self, decoder):
+        import json
+        import requests
+        from civis.response import set_json_decoder
+        if decoder == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                raise NotImplementedError("orjson is not installed")
+            set_json_decoder(orjson.loads)
+        else:
+            set_json_decoder(json.loads)
+        self.response = requests.Response()
+        self.response.status_code = 200
+        self.response.encoding = 'utf-8'
+        self.response._content = json.dumps(
+            [_row(i) for i in range(N_ROWS)]).encode('utf-8')
+
+    def teardown(self, decoder):
+        from civis.response import set_json_decoder
+        set_json_decoder()
+
+    def time_decode(self, decoder):
+        _response_to_json(self.response)
+
+
+class SmallResponse(object):
+    """Converting the response to a call such as ``files.get``."""
+
+    def setup(self):
+        self.data = _row(1)
+        self.headers = {'X-RateLimit-Remaining': '999',
+                        'X-RateLimit-Limit': '1000'}
+
+    def time_convert(self):
+        for _ in range(N_CALLS):
+            convert_response_data_type(self.data, headers=self.headers,
+                                       return_type='snake')
+
+    def time_convert_and_read(self):
+        for _ in range(N_CALLS):
+            response = convert_response_data_type(
+                self.data, headers=self.headers, return_type='snake')
+            response.id, response.author.username
+
+
+class _PagedEndpoint(object):
+    """Answer requests for pages of a list without HTTP."""
+    _return_type = 'snake'
+
+    def __init__(self, n_items, page_size):
+        self.pages = {}
+        n_pages = -(-n_items // page_size)
+        # The page after the last one is empty
+        for page_num in range(1, n_pages + 2):
+            start = (page_num - 1) * page_size
+            rows = [_row(i) for i in
+                    range(start, min(start + page_size, n_items))]
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(rows).encode('utf-8')
+            response.headers['X-Pagination-Total-Pages'] = str(n_pages)
+            self.pages[page_num] = response
+
+    def _make_request(self, method, path=None, params=None, **kwargs):
+        return self.pages[params['page_num']]
+
+
+class PaginatedIteration(object):
+    """Client-side cost of iterating over a paginated list."""
+    params = [1000, N_ROWS]
+    param_names = ['n_items']
+
+    def setup(self, n_items):
+        self.endpoint = _PagedEndpoint(n_items, page_size=100)
+
+    def time_iterate(self, n_items):
+        for row in PaginatedResponse('files', {}, self.endpoint):
+            row.id
+
+
+class FindInList(object):
+    """Looking up 100 names in a list response."""
+    params = [1000, N_ROWS]
+    param_names = ['n_rows']
+
+    def setup(self, n_rows):
+        self.response = convert_response_data_type(
+            [_row(i) for i in range(n_rows)], return_type='snake')
+        self.names = ['file_{}'.format(i)
+                      for i in range(0, n_rows, n_rows // 100)]
+
+    def time_find_one(self, n_rows):
+        for name in self.names:
+            civis.find_one(self.response, name=name)
+
+    def time_response_index(self, n_rows):
+        index = civis.ResponseIndex(self.response)
+        for name in self.names:
+            index.find_one(name=name)
@@ -0,0 +1,134 @@
+"""Cost of importing civis, and of creating an APIClient from an API
+specification.
+"""
+from __future__ import absolute_import
+
+from collections import OrderedDict
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import civis
+from civis.resources import write_compiled_api_spec
+
+SPEC_PATH = os.path.join(os.path.dirname(civis.__file__),
+                         'tests', 'civis_api_spec.json')
+
+
+class ClientStartup(object):
+    params = ['base', 'all']
+    param_names = ['resources']
+
+    def setup(self, resources):
+        with open(SPEC_PATH) as f:
+            self.spec = json.load(f, object_pairs_hook=OrderedDict)
+        self.tempdir = tempfile.mkdtemp()
+        self.compiled_spec = os.path.join(self.tempdir, 'spec.bin')
+        write_compiled_api_spec(self.spec, self.compiled_spec)
+
+    def teardown(self, resources):
+        shutil.rmtree(self.tempdir)
+
+    def _client(self, resources):
+        return civis.APIClient(api_key='benchmark', resources=resources,
+                               local_api_spec=self.spec)
+
+    def time_create_client(self, resources):
+        self._client(resources)
+
+    def time_create_client_from_compiled_spec(self, resources):
+        civis.APIClient(api_key='benchmark', resources=resources,
+                        local_api_spec=self.compiled_spec)
+
+    def time_create_client_and_use_one_resource(self, resources):
+        self._client(resources).files.get
+
+    def time_create_client_and_use_all_resources(self, resources):
+        client = self._client(resources)
+        for name in client._classes:
+            endpoint = getattr(client, name)
+            for method in endpoint._operations:
+                getattr(endpoint, method)
+
+    def peakmem_create_client_and_use_one_resource(self, resources):
+        self._client(resources).files.get
+
+
+class PickledClient(object):
+    """Pickling an APIClient and unpickling it, as when passing it to a
+    worker process.
+    """
+
+    def setup(self):
+        with open(SPEC_PATH) as f:
+            spec = json.load(f, object_pairs_hook=OrderedDict)
+        self.client = civis.APIClient(api_key='benchmark',
+                                      local_api_spec=spec)
+        self.pickled = pickle.dumps(self.client)
+
+    def time_pickle(self):
+        pickle.dumps(self.client)
+
+    def time_unpickle(self):
+        pickle.loads(self.pickled)
+
+    def time_unpickle_and_use_one_resource(self):
+        pickle.loads(self.pickled).files.get
+
+    def track_pickled_bytes(self):
+        return len(self.pickled)
+    track_pickled_bytes.unit = 'bytes'
+
+
+class SpecDownload(object):
+    """Downloading the API specification from a local stand-in for the API
+    and generating classes from it, without and with the on-disk cache.
+    """
+
+    def setup(self):
+        from civis.compat import mock
+        from civis.tests.mock_api import MockCivisAPI
+        self.server = MockCivisAPI().start()
+        self.tempdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict('os.environ', {
+            'CIVIS_API_ENDPOINT': self.server.url,
+            'CIVIS_API_SPEC_CACHE_DIR': self.tempdir})
+        self.env.start()
+
+    def teardown(self):
+        self.env.stop()
+        self.server.stop()
+        shutil.rmtree(self.tempdir)
+
+    def _generate_classes(self):
+        from civis.resources._resources import get_api_spec, generate_classes
+        get_api_spec.cache_clear()
+        generate_classes.cache_clear()
+        return generate_classes('benchmark', '1.0', 'base')
+
+    def time_download_and_generate_classes(self):
+        from civis.compat import mock
+        with mock.patch.dict('os.environ', {'CIVIS_API_SPEC_CACHE_TTL': '0'}):
+            self._generate_classes()
+
+    def time_generate_classes_from_disk_cache(self):
+        self._generate_classes()
+
+    def track_spec_bytes_transferred(self):
+        import requests
+        response = requests.get(self.server.url + 'endpoints',
+                                auth=('benchmark', ''), stream=True)
+        return len(response.raw.read())
+    track_spec_bytes_transferred.unit = 'bytes'
+
+
+class Import(object):
+    """``import civis`` in a new interpreter."""
+
+    def timeraw_import_civis(self):
+        return "import civis"
+
+    def timeraw_import_civis_io(self):
+        return "import civis.io"
@@ -1,7 +1,25 @@
 from __future__ import absolute_import
+import sys
 
+from civis._lazy import set_lazy_attributes
 from civis._version import __version__
-from civis.civis import APIClient, find, find_one
-from civis import io
+from civis.civis import APIClient, ResponseIndex, find, find_one
 
-__all__ = ["__version__", "APIClient", "find", "find_one", "io"]
+__all__ = ["__version__", "APIClient", "ResponseIndex", "find", "find_one",
+           "io"]
+
+# These modules, and the optional dependencies they use, are imported on
+# first use so that `import civis` stays fast.
+_lazy_attributes = {
+    'io': ('civis.io', None),
+    'ml': ('civis.ml', None),
+    'futures': ('civis.futures', None),
+    'polling': ('civis.polling', None),
+    'utils': ('civis.utils', None),
+}
+if sys.version_info >= (3, 5):
+    _lazy_attributes['AsyncAPIClient'] = ('civis._async', 'AsyncAPIClient')
+    __all__.append("AsyncAPIClient")
+
+if not set_lazy_attributes(__name__, _lazy_attributes):
+    from civis import io  # NOQA
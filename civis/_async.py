@@ -0,0 +1,333 @@
+"""An asyncio-based client for the Civis API.
+
+This module uses ``async``/``await`` syntax and requires Python 3.5 or
+later, along with the optional ``aiohttp`` dependency.
+"""
+import asyncio
+from collections import deque, OrderedDict
+
+import civis
+from civis.base import CivisAPIError, CivisAPIKeyError, Endpoint
+from civis.civis import RETRY_CODES, _get_api_key
+from civis.resources import generate_classes_maybe_cached
+from civis.response import (
+    _json_loads, _response_to_json, convert_response_data_type, RETURN_TYPES)
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+# Mirror the behavior of `civis.base.AggressiveRetry`: retry responses with
+# a Retry-After header regardless of verb, and other retryable status codes
+# only for idempotent verbs.
+_RETRY_AFTER_STATUS_CODES = frozenset([413, 429, 503])
+_IDEMPOTENT_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'DELETE', 'OPTIONS',
+                                 'TRACE'])
+_BACKOFF_FACTOR = .75
+_BACKOFF_MAX = 120
+
+
+def _encode_params(params):
+    """Encode query parameters the way `requests` would.
+
+    `aiohttp` only accepts strings and numbers, so drop ``None`` values,
+    stringify booleans and expand lists into repeated keys.
+    """
+    encoded = []
+    for key, value in (params or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            if v is None:
+                continue
+            encoded.append((key, str(v) if isinstance(v, bool) else v))
+    return encoded
+
+
+class _AsyncResponse(object):
+    """A fully-read HTTP response with the parts of the
+    :class:`requests.Response` interface that the client relies on.
+    """
+    def __init__(self, status_code, reason, headers, content, url):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return _json_loads(self.content)
+
+
+class _AsyncSession(object):
+    """Make API requests through a lazily-created, pooled
+    :class:`aiohttp.ClientSession`, retrying rate-limited and unavailable
+    responses with exponential backoff.
+    """
+    def __init__(self, api_key, pool_maxsize, retry_total):
+        self._api_key = api_key
+        self._pool_maxsize = pool_maxsize
+        self._retry_total = retry_total
+        self._session = None
+
+    def _get_session(self):
+        # The session needs a running event loop, so defer creating it
+        # until the first request.
+        if self._session is None or self._session.closed:
+            agent = "civis-python/{} aiohttp/{}".format(civis.__version__,
+                                                        aiohttp.__version__)
+            connector = aiohttp.TCPConnector(limit=self._pool_maxsize)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                auth=aiohttp.BasicAuth(self._api_key, ''),
+                headers={'User-Agent': agent})
+        return self._session
+
+    def _retry_delay(self, method, response, attempt):
+        """Seconds to wait before retrying, or None if not retryable.
+        A `response` of None means the connection failed.
+        """
+        if attempt >= self._retry_total:
+            return None
+        if response is None:
+            if method.upper() not in _IDEMPOTENT_METHODS:
+                return None
+        else:
+            retry_after = response.headers.get('Retry-After')
+            if (retry_after and
+                    response.status_code in _RETRY_AFTER_STATUS_CODES):
+                try:
+                    return max(float(retry_after), 0)
+                except ValueError:
+                    pass
+            elif (response.status_code not in RETRY_CODES or
+                  method.upper() not in _IDEMPOTENT_METHODS):
+                return None
+        return min(_BACKOFF_FACTOR * (2 ** attempt), _BACKOFF_MAX)
+
+    async def request(self, method, url, params=None, json=None):
+        session = self._get_session()
+        attempt = 0
+        while True:
+            try:
+                async with session.request(method, url,
+                                           params=_encode_params(params),
+                                           json=json) as resp:
+                    content = await resp.read()
+                    response = _AsyncResponse(resp.status, resp.reason,
+                                              resp.headers, content,
+                                              str(resp.url))
+            except aiohttp.ClientConnectionError:
+                if self._retry_delay(method, None, attempt) is None:
+                    raise
+                response = None
+            delay = self._retry_delay(method, response, attempt)
+            if delay is None:
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncEndpoint(Endpoint):
+    """Base class for the resources of :class:`AsyncAPIClient`.
+
+    Generated methods return a coroutine, or an
+    :class:`AsyncPaginatedResponse` when called with ``iterator=True``.
+    """
+    async def _make_request(self, method, path=None, params=None, data=None,
+                            **kwargs):
+        url = self._build_path(path)
+        response = await self._session.request(method, url, params=params,
+                                               json=data)
+
+        if response.status_code == 401:
+            auth_error = response.headers["www-authenticate"]
+            raise CivisAPIKeyError(auth_error) from CivisAPIError(response)
+
+        if not response.ok:
+            raise CivisAPIError(response)
+
+        return response
+
+    def _call_api(self, method, path=None, params=None, data=None, **kwargs):
+        iterator = kwargs.pop('iterator', False)
+
+        if iterator:
+            return AsyncPaginatedResponse(path, params, self)
+        else:
+            return self._call_api_async(method, path, params, data, **kwargs)
+
+    async def _call_api_async(self, method, path=None, params=None, data=None,
+                              **kwargs):
+        resp = await self._make_request(method, path, params, data, **kwargs)
+        if self._return_type == 'raw':
+            return resp
+        return convert_response_data_type(_response_to_json(resp),
+                                          headers=resp.headers,
+                                          return_type=self._return_type)
+
+    async def _get_many(self, ids, max_workers=None, as_dict=False):
+        unique_ids = list(OrderedDict.fromkeys(ids))
+        # Without a limit, the session's connection pool limits the calls
+        # in flight.
+        semaphore = asyncio.Semaphore(max_workers) if max_workers else None
+
+        async def get(id_):
+            try:
+                if semaphore is None:
+                    return await self.get(id_)
+                async with semaphore:
+                    return await self.get(id_)
+            except Exception as exc:
+                return exc
+
+        results = await asyncio.gather(*[get(id_) for id_ in unique_ids])
+        by_id = OrderedDict(zip(unique_ids, results))
+        if as_dict:
+            return by_id
+        return [by_id[id_] for id_ in ids]
+
+
+class AsyncPaginatedResponse(object):
+    """An asynchronous iterator over all items of a paginated endpoint.
+
+    Parameters
+    ----------
+    path : str
+        Make GET requests to this path.
+    initial_params : dict
+        Query params that should be passed along with each request. Note that
+        if `initial_params` contains the keys `page_num` or `limit`, they will
+        be ignored. The given dict is not modified.
+    endpoint : :class:`AsyncEndpoint`
+        An endpoint used to make API requests.
+
+    Examples
+    --------
+    >>> async for query in client.queries.list(iterator=True):
+    ...    print(query['id'])
+    """
+    def __init__(self, path, initial_params, endpoint):
+        self._path = path
+        self._params = initial_params.copy()
+        self._endpoint = endpoint
+        self._params['page_num'] = 1
+        self._params.pop('limit', None)
+        self._page = deque()
+        self._headers = None
+        self._exhausted = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._page:
+            if self._exhausted:
+                raise StopAsyncIteration
+            response = await self._endpoint._make_request('GET', self._path,
+                                                          self._params)
+            page_data = _response_to_json(response)
+            self._params['page_num'] += 1
+            if not page_data:
+                self._exhausted = True
+                continue
+            self._page.extend(page_data)
+            self._headers = response.headers
+
+        return convert_response_data_type(
+            self._page.popleft(), headers=self._headers,
+            return_type=self._endpoint._return_type)
+
+
+class AsyncAPIClient(object):
+    """An asyncio version of :class:`civis.APIClient`.
+
+    Resources and methods are generated from the same API specification as
+    :class:`civis.APIClient`, but each method returns a coroutine. Calling a
+    paginated list method with ``iterator=True`` returns an asynchronous
+    iterator instead. Requests share a pool of connections, so many calls
+    may be in flight at once without a thread per call.
+
+    Use the client as an asynchronous context manager, or call
+    :meth:`close` when finished, to release its connections.
+
+    Parameters
+    ----------
+    api_key : str, optional
+        Your API key obtained from the Civis Platform. If not given, the
+        client will use the :envvar:`CIVIS_API_KEY` environment variable.
+    return_type : str, optional
+        One of ``'snake'``, ``'raw'``, ``'pandas'`` or ``'columnar'``. See
+        :class:`civis.APIClient`. The ``'raw'`` response has the
+        ``status_code``, ``headers``, ``content`` and ``json()`` members of a
+        :class:`requests:requests.Response`.
+    retry_total : int, optional
+        A number indicating the maximum number of retries for 429, 502, 503, or
+        504 errors.
+    api_version : string, optional
+        The version of endpoints to call. Currently only "1.0" is supported.
+    resources : string, optional
+        Either ``"base"`` or ``"all"``. See :class:`civis.APIClient`.
+    local_api_spec : collections.OrderedDict or string, optional
+        A local copy of the API specification. See :class:`civis.APIClient`.
+        Otherwise the specification is downloaded (synchronously) the first
+        time a client is created.
+    pool_maxsize : int, optional
+        The maximum number of simultaneous connections to the Civis API.
+        Further requests wait for a free connection.
+
+    Examples
+    --------
+    >>> async def get_files(file_ids):
+    ...     async with civis.AsyncAPIClient() as client:
+    ...         return await asyncio.gather(*[client.files.get(file_id)
+    ...                                       for file_id in file_ids])
+    """
+    def __init__(self, api_key=None, return_type='snake', retry_total=6,
+                 api_version="1.0", resources="base", local_api_spec=None,
+                 pool_maxsize=100):
+        if not HAS_AIOHTTP:
+            raise ImportError("AsyncAPIClient requires aiohttp to be "
+                              "installed.")
+        if return_type not in RETURN_TYPES:
+            raise ValueError("Return type must be one of 'snake', 'raw', "
+                             "'pandas', 'columnar'")
+        api_key = _get_api_key(api_key)
+        self._session = _AsyncSession(api_key, pool_maxsize, retry_total)
+        self._return_type = return_type
+        self._classes = generate_classes_maybe_cached(local_api_spec, api_key,
+                                                      api_version, resources,
+                                                      AsyncEndpoint)
+
+    def __getattr__(self, name):
+        # Each resource, such as `client.files`, is created on first use.
+        classes = self.__dict__.get('_classes')
+        if classes is None or name not in classes:
+            raise AttributeError("'{}' object has no attribute "
+                                 "'{}'".format(type(self).__name__, name))
+        endpoint = classes[name](self._session, self._return_type)
+        return self.__dict__.setdefault(name, endpoint)
+
+    def __dir__(self):
+        return sorted(set(dir(self.__class__)) | set(vars(self)) |
+                      set(self._classes))
+
+    async def close(self):
+        """Close all connections held by this client."""
+        await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,164 @@
+"""Cache the responses of idempotent API calls."""
+from __future__ import absolute_import, division
+from collections import OrderedDict
+import json
+import threading
+
+from civis._utils import _clock, _resource
+
+DEFAULT_CACHE_TTL = 60
+
+
+def _related(path, other):
+    # A write to a path changes it, the collections it belongs to,
+    # and its sub-resources.
+    return (path == other or path.startswith(other + '/') or
+            other.startswith(path + '/'))
+
+
+class _CacheEntry(object):
+    __slots__ = ('path', 'response', 'etag', 'expires')
+
+    def __init__(self, path, response, etag, expires):
+        self.path = path
+        self.response = response
+        self.etag = etag
+        self.expires = expires
+
+
+class ResponseCache(object):
+    """A size-bounded, thread-safe cache of GET responses.
+
+    Responses are kept for a time-to-live which may be set separately for
+    each API resource. Once a response with an ``ETag`` header expires, it
+    is revalidated with an ``If-None-Match`` request instead of being
+    downloaded again. A PUT, PATCH, POST or DELETE to a path evicts the
+    cached responses for that path, the collections which contain it, and
+    its sub-resources.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The maximum number of responses to keep. The least recently used
+        response is evicted first.
+    ttl : float, optional
+        The number of seconds a response is used without asking the API.
+    resource_ttls : dict, optional
+        Time-to-live for particular resources, such as ``{'users': 3600}``,
+        overriding `ttl`. A time-to-live of 0 revalidates every call if the
+        API supports it, and otherwise disables caching for the resource.
+    """
+    def __init__(self, maxsize=1024, ttl=DEFAULT_CACHE_TTL,
+                 resource_ttls=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.resource_ttls = dict(resource_ttls or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(path, params=None):
+        """Return the cache key of a GET call."""
+        return (path or '').strip('/'), json.dumps(params or {},
+                                                   sort_keys=True, default=str)
+
+    def ttl_for(self, path):
+        return self.resource_ttls.get(_resource(path), self.ttl)
+
+    def get(self, key):
+        """Return a fresh cached response for `key`, or None.
+
+        If the cached response has expired but can be revalidated, return
+        None and its ``ETag`` as a second value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            # Re-insert to mark as most recently used
+            self._entries[key] = self._entries.pop(key)
+            if _clock() < entry.expires:
+                self._hits += 1
+                return entry.response, None
+            if entry.etag is None:
+                del self._entries[key]
+                return None, None
+            return None, entry.etag
+
+    def revalidated(self, key):
+        """Renew the cached response for `key` after the API reported that
+        it is unchanged, and return it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = _clock() + self.ttl_for(entry.path)
+            self._revalidations += 1
+            self._hits += 1
+            return entry.response
+
+    def put(self, key, response):
+        """Cache a successful GET response."""
+        path = key[0]
+        ttl = self.ttl_for(path)
+        etag = response.headers.get('ETag')
+        with self._lock:
+            self._misses += 1
+            # Remove any old entry, so a new one goes at the end
+            self._entries.pop(key, None)
+            if response.status_code != 200 or (ttl <= 0 and etag is None):
+                return
+            self._entries[key] = _CacheEntry(path, response, etag,
+                                             _clock() + ttl)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, path):
+        """Evict cached responses affected by a write to `path`."""
+        path = (path or '').strip('/')
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if _related(path, entry.path)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Evict all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        """Return a dict describing how often the cache was used.
+
+        Returns
+        -------
+        dict
+            - hits : int
+                The number of GET calls answered from the cache, including
+                revalidated responses.
+            - misses : int
+                The number of GET calls which downloaded a response.
+            - revalidations : int
+                The number of expired responses which the API reported
+                were unchanged.
+            - evictions : int
+                The number of responses evicted to stay within `maxsize`.
+            - hit_rate : float
+                The fraction of GET calls answered from the cache.
+            - size : int
+                The number of responses currently cached.
+        """
+        with self._lock:
+            calls = self._hits + self._misses
+            return {'hits': self._hits,
+                    'misses': self._misses,
+                    'revalidations': self._revalidations,
+                    'evictions': self._evictions,
+                    'hit_rate': self._hits / calls if calls else 0.,
+                    'size': len(self._entries)}
@@ -0,0 +1,44 @@
+"""Module attributes which are imported on first use."""
+from __future__ import absolute_import
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    # Maps attribute names to the name of the module to import, and of the
+    # attribute within it (None for the module itself).
+    _lazy_attributes = {}
+
+    def __getattr__(self, name):
+        try:
+            module_name, attr = self._lazy_attributes[name]
+        except KeyError:
+            raise AttributeError("module '{}' has no attribute "
+                                 "'{}'".format(self.__name__, name))
+        module = importlib.import_module(module_name)
+        value = module if attr is None else getattr(module, attr)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+
+def set_lazy_attributes(module_name, attributes):
+    """Make the module `module_name` import each of `attributes` the first
+    time it is looked up.
+
+    `attributes` maps each attribute name to a ``(module name, attribute
+    name)`` tuple, where the attribute name is None for the module itself.
+    Returns False, leaving the module unchanged, where modules can't be
+    given a new class (before Python 3.5).
+    """
+    module = sys.modules[module_name]
+    lazy_class = type(str('LazyModule'), (_LazyModule,),
+                      {'_lazy_attributes': dict(attributes)})
+    try:
+        module.__class__ = lazy_class
+    except TypeError:
+        return False
+    return True
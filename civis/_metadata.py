@@ -0,0 +1,228 @@
+"""A process-wide index of the databases, credentials and tables which the
+helpers on :class:`civis.APIClient` look up by name.
+"""
+from __future__ import absolute_import
+import threading
+
+from civis._utils import _clock, _hash_key
+
+DEFAULT_METADATA_TTL = 300
+
+DATABASE_CREDENTIAL = 'Database'
+AWS_CREDENTIAL = 'Amazon Web Services S3'
+COLLECTIONS = ('databases', 'credentials', 'tables', 'users')
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class _Entry(object):
+    __slots__ = ('value', 'expires')
+
+    def __init__(self, value, expires):
+        self.value = value
+        self.expires = expires
+
+
+class MetadataIndex(object):
+    """Look up databases, credentials and tables by name without listing
+    them from the API each time.
+
+    One index is shared by every client in the process which uses the same
+    API key with the same API; it is available as the client's
+    ``metadata_index``. Each collection is listed once and then kept for
+    `ttl` seconds. A name which isn't found lists the collection again
+    before failing, so objects created since the last listing are found.
+    The index holds no reference to the clients which use it.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Seconds to keep a listing before it is refreshed.
+    """
+    def __init__(self, ttl=DEFAULT_METADATA_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _get(self, key, load, refresh=False):
+        """Return the value stored under `key`, calling `load` to fetch it
+        if it's missing, expired or `refresh` is True.
+
+        Returns the value and whether it was fetched by this call.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if (not refresh and entry is not None and
+                    _clock() < entry.expires):
+                self._hits += 1
+                return entry.value, False
+            self._misses += 1
+            loading = self._loading.setdefault(key, threading.Lock())
+        # Other threads needing the same listing wait for this one
+        # instead of repeating it.
+        with loading:
+            with self._lock:
+                latest = self._entries.get(key)
+            if latest is not entry and latest is not None:
+                return latest.value, True
+            value = load()
+            with self._lock:
+                self._entries[key] = _Entry(value, _clock() + self.ttl)
+            return value, True
+
+    def _find(self, key, load, lookup):
+        """Return ``lookup(value)`` for the value stored under `key`,
+        listing it again once if it doesn't contain the item.
+        """
+        value, fetched = self._get(key, load)
+        found = lookup(value)
+        if found is None and not fetched:
+            found = lookup(self._get(key, load, refresh=True)[0])
+        return found
+
+    @staticmethod
+    def _list_databases(client):
+        # Imported here because `civis.civis` imports this module
+        from civis.civis import ResponseIndex
+        return ResponseIndex(client.databases.list(), 'id', 'name')
+
+    @staticmethod
+    def _list_credentials(client, cred_type):
+        from civis.civis import ResponseIndex
+        return ResponseIndex(client.credentials.list(type=cred_type,
+                                                     iterator=True))
+
+    def database(self, client, database):
+        """Return the database with a name or ID, or None."""
+        by = 'id' if isinstance(database, int) else 'name'
+        return self._find(('databases',),
+                          lambda: self._list_databases(client),
+                          lambda dbs: dbs.find_one(**{by: database}))
+
+    def credentials(self, client, cred_type, name=None, owner=None,
+                    username=None, host=None):
+        """Return the credentials of type `cred_type` which match all of the
+        given name, owner, username and remote host (a database name or ID).
+        """
+        filters = {'name': name, 'owner': owner, 'username': username}
+        if isinstance(host, int):
+            filters['remote_host_id'] = host
+        else:
+            filters['remote_host_name'] = host
+        filters = {k: v for k, v in filters.items() if v is not None}
+        found = self._find(('credentials', cred_type),
+                           lambda: self._list_credentials(client, cred_type),
+                           lambda creds: creds.find(**filters) or None)
+        return found or []
+
+    def table_id(self, client, database_id, table, database=None):
+        """Return the ID of the table ``schema.name`` in a database, or
+        raise :class:`ValueError` if there's no exact match. `database`
+        names the database in errors.
+        """
+        schema, name = table.split('.')
+
+        def load():
+            tables = client.tables.list(database_id=database_id,
+                                        schema=schema, name=name)
+            if not tables:
+                raise ValueError("No tables found for {} in database "
+                                 "{}".format(table, database or database_id))
+            found = ".".join((tables[0].schema, tables[0].name))
+            if found != table:
+                raise ValueError("Given table {} is not an exact match "
+                                 "for returned table {}.".format(table, found))
+            return tables[0].id
+
+        return self._get(('tables', database_id, schema, name), load)[0]
+
+    def default_credential(self, client):
+        """Return the ID of the current user's default credential."""
+        def load():
+            creds = client.credentials.list(default=True)
+            return creds[0]['id'] if len(creds) > 0 else None
+        return self._get(('users', 'default_credential'), load)[0]
+
+    def username(self, client):
+        """Return the current user's username."""
+        return self._get(('users', 'username'),
+                         lambda: client.users.list_me().username)[0]
+
+    def warm(self, client, databases=True, credentials=True, tables=()):
+        """List collections up front, so later lookups don't call the API.
+
+        Parameters
+        ----------
+        client : :class:`civis.APIClient`
+            The client with which to list them.
+        databases : bool, optional
+            List the databases.
+        credentials : bool, optional
+            List the database and AWS credentials.
+        tables : list, optional
+            ``(database, schema)`` pairs, with the database given by name or
+            ID. All tables in each schema are listed.
+        """
+        if databases:
+            self._get(('databases',), lambda: self._list_databases(client),
+                      refresh=True)
+        if credentials:
+            for cred_type in (DATABASE_CREDENTIAL, AWS_CREDENTIAL):
+                self._get(('credentials', cred_type),
+                          lambda: self._list_credentials(client, cred_type),
+                          refresh=True)
+        for database, schema in tables:
+            if isinstance(database, int):
+                database_id = database
+            else:
+                database_id = client.get_database_id(database)
+            listed = client.tables.list(database_id=database_id,
+                                        schema=schema, iterator=True)
+            with self._lock:
+                expires = _clock() + self.ttl
+                for t in listed:
+                    self._entries[('tables', database_id, t.schema,
+                                   t.name)] = _Entry(t.id, expires)
+
+    def invalidate(self, *collections):
+        """Forget listings so that the next lookups call the API.
+
+        Parameters
+        ----------
+        *collections : str
+            Any of ``'databases'``, ``'credentials'``, ``'tables'`` and
+            ``'users'``. If none are given, everything is forgotten.
+        """
+        unknown = set(collections) - set(COLLECTIONS)
+        if unknown:
+            raise ValueError("Unknown collections {}; choose from "
+                             "{}".format(sorted(unknown), COLLECTIONS))
+        with self._lock:
+            if not collections:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key[0] in collections:
+                    del self._entries[key]
+
+    def metrics(self):
+        """Return a dict with the number of lookups answered from the index
+        (``hits``) and those which listed from the API (``misses``).
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses}
+
+
+def get_metadata_index(api_key, base_url):
+    """Return the :class:`MetadataIndex` shared by every client using
+    `api_key` with the API at `base_url`.
+    """
+    key = _hash_key(api_key, base_url)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = MetadataIndex()
+        return _indexes[key]
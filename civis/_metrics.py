@@ -0,0 +1,185 @@
+"""Measure the API calls made by a client."""
+from __future__ import absolute_import, division
+from bisect import bisect_left
+import logging
+import threading
+import time
+
+# Latencies need a finer clock than `civis._utils._clock`: `monotonic`
+# ticks only every 15 ms or so on Windows.
+_clock = getattr(time, 'perf_counter', time.time)
+
+log = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the buckets of the latency histograms
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+                           2.5, 5, 10, 30, 60)
+
+
+def _retries(response):
+    # The number of retries urllib3 made before getting this response,
+    # through `civis.base.AggressiveRetry`
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    return len(getattr(retries, 'history', ()) or ())
+
+
+def _request_size(response):
+    body = getattr(response.request, 'body', None)
+    return len(body) if body else 0
+
+
+class _MethodStats(object):
+    __slots__ = ('calls', 'errors_4xx', 'errors_5xx', 'exceptions',
+                 'retries', 'bytes_sent', 'bytes_received', 'seconds',
+                 'max_seconds', 'buckets')
+
+    def __init__(self, n_buckets):
+        self.calls = 0
+        self.errors_4xx = 0
+        self.errors_5xx = 0
+        self.exceptions = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.seconds = 0.
+        self.max_seconds = 0.
+        # One more bucket than bounds, for slower calls
+        self.buckets = [0] * (n_buckets + 1)
+
+
+class RequestMetrics(object):
+    """Statistics and callbacks for the API calls of a client.
+
+    Calls are counted separately for each generated method, such as
+    ``'files.get'``. Each method has counts of calls, client errors
+    (4xx), server errors (5xx), calls which raised an exception without a
+    response, and retries made by the client; the bytes sent and
+    received; and a histogram of latencies, which include retries.
+
+    Exceptions raised by callbacks are logged and otherwise ignored, so
+    they don't fail the API calls they observe.
+
+    Parameters
+    ----------
+    latency_buckets : sequence of float, optional
+        The upper bounds, in seconds, of the latency histogram buckets.
+    """
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._before = []
+        self._after = []
+
+    def before_request(self, callback):
+        """Call ``callback(info)`` before each API call.
+
+        `info` is a dict with the ``name`` of the method, the HTTP
+        ``method`` and the ``url``. Returns `callback`, so this can be used
+        as a decorator.
+        """
+        self._before.append(callback)
+        return callback
+
+    def after_request(self, callback):
+        """Call ``callback(info)`` after each API call, including calls
+        which raised an exception.
+
+        `info` is the dict passed to the :meth:`before_request` callbacks
+        with, in addition, the ``status_code`` (None if there was no
+        response), the ``seconds`` taken, ``bytes_sent``,
+        ``bytes_received``, the number of ``retries``, and the
+        ``exception`` raised, if any. Returns `callback`, so this can be
+        used as a decorator.
+        """
+        self._after.append(callback)
+        return callback
+
+    def observe(self, name, method, url, send):
+        """Make an API call with ``send()``, measure it, and return its
+        response.
+        """
+        info = {'name': name, 'method': method, 'url': url}
+        self._run_callbacks(self._before, info)
+        start = _clock()
+        try:
+            response = send()
+        except Exception as exc:
+            info.update(status_code=None, seconds=_clock() - start,
+                        bytes_sent=0, bytes_received=0, retries=0,
+                        exception=exc)
+            self._record(info)
+            raise
+        info.update(status_code=response.status_code,
+                    seconds=_clock() - start,
+                    bytes_sent=_request_size(response),
+                    bytes_received=len(response.content or b''),
+                    retries=_retries(response), exception=None)
+        self._record(info)
+        return response
+
+    def _record(self, info):
+        seconds = info['seconds']
+        status = info['status_code']
+        bucket = bisect_left(self.latency_buckets, seconds)
+        with self._lock:
+            stats = self._stats.get(info['name'])
+            if stats is None:
+                stats = self._stats[info['name']] = _MethodStats(
+                    len(self.latency_buckets))
+            stats.calls += 1
+            if status is None:
+                stats.exceptions += 1
+            elif 400 <= status < 500:
+                stats.errors_4xx += 1
+            elif status >= 500:
+                stats.errors_5xx += 1
+            stats.retries += info['retries']
+            stats.bytes_sent += info['bytes_sent']
+            stats.bytes_received += info['bytes_received']
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.buckets[bucket] += 1
+        self._run_callbacks(self._after, info)
+
+    @staticmethod
+    def _run_callbacks(callbacks, info):
+        # A failing callback mustn't fail the API call it observes
+        for callback in callbacks:
+            try:
+                callback(info)
+            except Exception:
+                log.exception("Error in a request metrics callback")
+
+    def snapshot(self):
+        """Return the statistics of each method as JSON-serializable dicts.
+
+        Returns
+        -------
+        dict
+            Maps each method name to a dict with the counts ``calls``,
+            ``errors_4xx``, ``errors_5xx``, ``exceptions``, ``retries``,
+            ``bytes_sent`` and ``bytes_received``; the total and maximum
+            latency in ``seconds`` and ``max_seconds``; and ``latency``, a
+            list of ``[upper_bound, count]`` histogram buckets. The last
+            bucket's upper bound is None.
+        """
+        bounds = list(self.latency_buckets) + [None]
+        with self._lock:
+            return {name: {'calls': stats.calls,
+                           'errors_4xx': stats.errors_4xx,
+                           'errors_5xx': stats.errors_5xx,
+                           'exceptions': stats.exceptions,
+                           'retries': stats.retries,
+                           'bytes_sent': stats.bytes_sent,
+                           'bytes_received': stats.bytes_received,
+                           'seconds': stats.seconds,
+                           'max_seconds': stats.max_seconds,
+                           'latency': [list(bucket) for bucket in
+                                       zip(bounds, stats.buckets)]}
+                    for name, stats in self._stats.items()}
+
+    def reset(self):
+        """Forget the statistics collected so far. Callbacks are kept."""
+        with self._lock:
+            self._stats.clear()
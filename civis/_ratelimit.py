@@ -0,0 +1,146 @@
+"""Pace API calls to stay within the Civis API rate limit."""
+from __future__ import absolute_import, division
+import threading
+
+from civis._utils import _clock, _hash_key
+
+# The Civis API replenishes `X-RateLimit-Limit` calls over this many seconds.
+RATE_LIMIT_PERIOD = 300
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def _header_int(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitGovernor(object):
+    """A token bucket shared by all threads making API calls with one key.
+
+    The bucket holds up to ``X-RateLimit-Limit`` tokens and refills at
+    ``X-RateLimit-Limit / period`` tokens per second. Each API call takes a
+    token, waiting for one if the bucket is empty. After each response, the
+    bucket is set to the ``X-RateLimit-Remaining`` count reported by the API,
+    so calls made by other processes with the same key are accounted for.
+    Until the API reports a limit, calls are not paced.
+
+    A response with a ``Retry-After`` header pauses all threads using the
+    governor for the requested time.
+
+    Parameters
+    ----------
+    period : float, optional
+        The number of seconds over which the API rate limit is replenished.
+    """
+    def __init__(self, period=RATE_LIMIT_PERIOD):
+        self.period = period
+        self._cond = threading.Condition(threading.Lock())
+        self._limit = None
+        self._tokens = None
+        self._updated = _clock()
+        self._paused_until = 0
+        self._calls = 0
+        self._throttled_calls = 0
+        self._throttled_seconds = 0
+        self._pauses = 0
+
+    def _refill(self, now):
+        if self._limit:
+            rate = self._limit / self.period
+            self._tokens = min(self._limit,
+                               self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def _wait_time(self, now):
+        wait = max(self._paused_until - now, 0)
+        if not wait and self._tokens is not None and self._tokens < 1:
+            wait = (1 - self._tokens) * self.period / self._limit
+        return wait
+
+    def acquire(self):
+        """Wait until an API call may be made, then count it."""
+        waited = 0
+        with self._cond:
+            while True:
+                now = _clock()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if not wait:
+                    break
+                self._cond.wait(wait)
+                waited += _clock() - now
+            if self._tokens is not None:
+                self._tokens -= 1
+            self._calls += 1
+            if waited:
+                self._throttled_calls += 1
+                self._throttled_seconds += waited
+        return waited
+
+    def update(self, headers):
+        """Synchronize with the rate limit headers of an API response."""
+        retry_after = _header_int(headers, 'Retry-After')
+        if retry_after:
+            self.pause(retry_after)
+        limit = _header_int(headers, 'X-RateLimit-Limit')
+        remaining = _header_int(headers, 'X-RateLimit-Remaining')
+        if not limit or remaining is None:
+            return
+        with self._cond:
+            self._refill(_clock())
+            self._limit = limit
+            self._tokens = min(remaining, limit)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Stop all API calls made through this governor for `seconds`."""
+        with self._cond:
+            paused_until = _clock() + seconds
+            if paused_until > self._paused_until:
+                self._paused_until = paused_until
+                self._pauses += 1
+
+    def metrics(self):
+        """Return a dict describing how API calls have been throttled.
+
+        Returns
+        -------
+        dict
+            - calls : int
+                The number of API calls made through this governor.
+            - throttled_calls : int
+                The number of those calls which had to wait.
+            - throttled_seconds : float
+                The total time calls spent waiting.
+            - pauses : int
+                The number of times calls were paused by a ``Retry-After``
+                header.
+            - rate_limit : int or None
+                The most recent ``X-RateLimit-Limit`` reported by the API.
+            - tokens : float or None
+                The number of calls which may currently be made without
+                waiting, if known.
+        """
+        with self._cond:
+            self._refill(_clock())
+            return {'calls': self._calls,
+                    'throttled_calls': self._throttled_calls,
+                    'throttled_seconds': self._throttled_seconds,
+                    'pauses': self._pauses,
+                    'rate_limit': self._limit,
+                    'tokens': self._tokens}
+
+
+def get_governor(api_key, base_url):
+    """Return the :class:`RateLimitGovernor` shared by every client using
+    `api_key` with the API at `base_url`.
+    """
+    key = _hash_key(api_key, base_url)
+    with _governors_lock:
+        if key not in _governors:
+            _governors[key] = RateLimitGovernor()
+        return _governors[key]
@@ -0,0 +1,205 @@
+"""Limit retries and stop calling unhealthy API resources."""
+from __future__ import absolute_import, division
+import logging
+import threading
+
+from civis._utils import _clock, _resource
+
+log = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class _StateChanges(object):
+    """Run callbacks registered with ``on_state_change``."""
+    def __init__(self):
+        self._callbacks = []
+
+    def on_state_change(self, callback):
+        """Call ``callback(name, old_state, new_state)`` on each change of
+        state. Returns `callback`, so this can be used as a decorator.
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    def _notify(self, name, old_state, new_state):
+        log.debug("%s changed from %s to %s", name, old_state, new_state)
+        for callback in self._callbacks:
+            try:
+                callback(name, old_state, new_state)
+            except Exception:
+                log.exception("Error in a state change callback")
+
+
+class RetryBudget(_StateChanges):
+    """Limit retries to a share of the calls made.
+
+    Each call adds `ratio` to a balance, and each retry takes 1 from it.
+    A retry which would overdraw the balance is not made, and the failed
+    response or error is returned to the caller instead. The balance also
+    grows by `min_retries_per_second`, so that a client making few calls
+    can still retry, and never exceeds `max_balance`.
+
+    The state, ``'available'`` or ``'exhausted'``, changes when a retry is
+    first refused and when the next retry is allowed.
+
+    Parameters
+    ----------
+    ratio : float, optional
+        The number of retries allowed for each call.
+    min_retries_per_second : float, optional
+        Retries allowed regardless of the number of calls.
+    max_balance : float, optional
+        The most retries which can be saved up.
+    """
+    def __init__(self, ratio=0.2, min_retries_per_second=1, max_balance=10):
+        super(RetryBudget, self).__init__()
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_balance = max_balance
+        self._lock = threading.Lock()
+        self._balance = max_balance
+        self._updated = _clock()
+        self._exhausted = False
+        self._calls = 0
+        self._retries = 0
+        self._refused = 0
+
+    def _add(self, amount):
+        self._balance = min(self.max_balance, self._balance + amount)
+
+    def deposit(self):
+        """Record a call."""
+        with self._lock:
+            self._calls += 1
+            self._add(self.ratio)
+
+    def withdraw(self):
+        """Return whether a retry may be made, and record it if so."""
+        with self._lock:
+            now = _clock()
+            self._add((now - self._updated) * self.min_retries_per_second)
+            self._updated = now
+            allowed = self._balance >= 1
+            if allowed:
+                self._balance -= 1
+                self._retries += 1
+            else:
+                self._refused += 1
+            changed = allowed == self._exhausted
+            self._exhausted = not allowed
+        if changed and allowed:
+            self._notify('retry_budget', 'exhausted', 'available')
+        elif changed:
+            self._notify('retry_budget', 'available', 'exhausted')
+        return allowed
+
+    @property
+    def state(self):
+        return 'exhausted' if self._exhausted else 'available'
+
+    def metrics(self):
+        """Return a dict with the number of ``calls``, ``retries`` made,
+        and retries ``refused``, and the current ``balance``.
+        """
+        with self._lock:
+            return {'calls': self._calls,
+                    'retries': self._retries,
+                    'refused': self._refused,
+                    'balance': self._balance}
+
+
+class _Breaker(object):
+    __slots__ = ('state', 'failures', 'opened_at', 'trial_in_flight')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+
+class CircuitBreakers(_StateChanges):
+    """A circuit breaker for each API resource, such as ``files``.
+
+    A breaker opens after `failure_threshold` consecutive calls to its
+    resource fail with a server error (5xx) or without a response. While
+    it is open, calls to the resource fail at once with
+    :class:`civis.base.CircuitOpenError`. After `reset_timeout` seconds,
+    one trial call is let through: if it succeeds the breaker closes, and
+    otherwise it opens again.
+
+    Parameters
+    ----------
+    failure_threshold : int, optional
+        The number of consecutive failures which opens a breaker.
+    reset_timeout : float, optional
+        Seconds a breaker stays open before a trial call.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        super(CircuitBreakers, self).__init__()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def _set_state(self, name, breaker, state):
+        # Called with the lock held; returns the change to announce.
+        old_state, breaker.state = breaker.state, state
+        if state == OPEN:
+            breaker.opened_at = _clock()
+        return (name, old_state, state) if old_state != state else None
+
+    def allow(self, path):
+        """Return whether a call to `path` may be made now."""
+        name = _resource(path)
+        change = None
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None or breaker.state == CLOSED:
+                return True
+            if breaker.state == OPEN:
+                if _clock() - breaker.opened_at < self.reset_timeout:
+                    return False
+                change = self._set_state(name, breaker, HALF_OPEN)
+            elif breaker.trial_in_flight:
+                return False
+            breaker.trial_in_flight = True
+        if change:
+            self._notify(*change)
+        return True
+
+    def record(self, path, success):
+        """Record the outcome of a call to `path`."""
+        name = _resource(path)
+        change = None
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                if success:
+                    return
+                breaker = self._breakers[name] = _Breaker()
+            breaker.trial_in_flight = False
+            if success:
+                breaker.failures = 0
+                change = self._set_state(name, breaker, CLOSED)
+            else:
+                breaker.failures += 1
+                if (breaker.state == HALF_OPEN or
+                        breaker.failures >= self.failure_threshold):
+                    change = self._set_state(name, breaker, OPEN)
+        if change:
+            self._notify(*change)
+
+    def state(self, resource):
+        """Return ``'closed'``, ``'open'`` or ``'half_open'``."""
+        with self._lock:
+            breaker = self._breakers.get(_resource(resource))
+            return breaker.state if breaker is not None else CLOSED
+
+    def reset(self):
+        """Close all breakers."""
+        with self._lock:
+            self._breakers.clear()
@@ -0,0 +1,270 @@
+"""An HTTP/2 transport for :class:`civis.APIClient`, backed by ``httpx``.
+
+:mod:`requests` sends each request through the transport adapter mounted
+for its URL on the session (see :class:`requests.adapters.BaseAdapter`).
+The client's API calls, the download of the API specification and the file
+transfers in :mod:`civis.io` all go through the client's session, so the
+adapter here replaces the connection pools of :mod:`requests` for all of
+them. This module requires Python 3.6 or later and the optional
+``httpx[http2]`` dependency.
+"""
+from __future__ import absolute_import
+import logging
+import socket
+
+from requests import exceptions
+from requests.adapters import BaseAdapter, DEFAULT_POOLSIZE
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from requests.packages.urllib3.exceptions import (
+    ConnectTimeoutError, HTTPError as _URLLib3Error, MaxRetryError,
+    ProtocolError)
+from requests.packages.urllib3.util import Retry
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    from httpcore.backends.sync import SyncBackend
+except ImportError:
+    SyncBackend = None
+else:
+    class _NoDelayBackend(SyncBackend):
+        """Open connections with Nagle's algorithm off, as ``urllib3``
+        does, so that a request written in parts isn't held back until
+        the server acknowledges the first part.
+        """
+        def connect_tcp(self, *args, **kwargs):
+            stream = super(_NoDelayBackend, self).connect_tcp(*args, **kwargs)
+            sock = stream.get_extra_info('socket')
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return stream
+
+log = logging.getLogger(__name__)
+
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _set_no_delay(client):
+    # `httpx.HTTPTransport` doesn't take a network backend, so set one on
+    # its connection pool when this version of `httpx` has one.
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    if SyncBackend is not None and hasattr(pool, '_network_backend'):
+        pool._network_backend = _NoDelayBackend()
+
+
+def _timeout(timeout):
+    """Translate a :mod:`requests` timeout into an ``httpx.Timeout``."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(None, connect=connect, read=read)
+    return httpx.Timeout(timeout)
+
+
+def _content(body):
+    if hasattr(body, 'read'):
+        return iter(lambda: body.read(_UPLOAD_CHUNK_SIZE), b'')
+    return body
+
+
+def _tell(body):
+    try:
+        return body.tell()
+    except (AttributeError, IOError, OSError):
+        return None
+
+
+def _rewind(body, position):
+    """Prepare `body` to be sent again, and return whether it can be.
+
+    A body read from a file must be sent again from where it started.
+    """
+    if not hasattr(body, 'read'):
+        return True
+    if position is None:
+        return False
+    body.seek(position)
+    return True
+
+
+def _retry_error(error):
+    """Translate an ``httpx`` error into the ``urllib3`` error which
+    :class:`urllib3.util.Retry` uses to decide whether to retry it.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        # The server didn't receive the request, so any verb is retried
+        return ConnectTimeoutError(str(error))
+    return ProtocolError(str(error))
+
+
+def _requests_error(error, request):
+    """Translate an ``httpx`` error into the :mod:`requests` exception
+    which :class:`requests.adapters.HTTPAdapter` would raise.
+    """
+    if isinstance(error, httpx.ConnectTimeout):
+        exc_type = exceptions.ConnectTimeout
+    elif isinstance(error, httpx.TimeoutException):
+        exc_type = exceptions.ReadTimeout
+    else:
+        exc_type = exceptions.ConnectionError
+    return exc_type(error, request=request)
+
+
+class _RetryResponse(object):
+    """The parts of a ``urllib3`` response which
+    :class:`urllib3.util.Retry` reads.
+    """
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = response.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def get_redirect_location(self):
+        # Redirects are followed by the `requests` session
+        return False
+
+
+class _RawResponse(object):
+    """Stand in for the ``urllib3`` response in ``Response.raw``, so that
+    :meth:`requests.Response.iter_content` streams the body from ``httpx``.
+    """
+    def __init__(self, response, retries):
+        self._response = response
+        # Read by `civis._metrics` to count retries
+        self.retries = retries
+
+    def stream(self, chunk_size, decode_content=True):
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.HTTPError as e:
+            raise exceptions.ChunkedEncodingError(e)
+        finally:
+            self._response.close()
+
+    def close(self):
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """A transport adapter which sends requests with ``httpx``.
+
+    Connections to servers which support HTTP/2 carry many concurrent
+    requests at once, so a few connections serve many threads. Other
+    servers are called with HTTP/1.1. Retries follow `max_retries` as they
+    would with :class:`civis.base.TimeoutHTTPAdapter`.
+
+    Parameters
+    ----------
+    timeout : float or tuple, optional
+        Seconds to wait for the server, either as one number or as a
+        ``(connect, read)`` tuple. Used for requests which don't set their
+        own ``timeout``. ``None`` waits forever.
+    max_retries : :class:`urllib3.util.Retry`, optional
+        How to retry failed requests. Defaults to no retries.
+    pool_maxsize : int, optional
+        The maximum number of connections to keep open to each host.
+    http2 : bool, optional
+        Set to False to use HTTP/1.1 only.
+    **client_kwargs
+        Passed to ``httpx.Client``, e.g. ``verify``, ``proxies`` or
+        ``transport``. TLS verification and proxies are set here rather
+        than for each request.
+    """
+    def __init__(self, timeout=None, max_retries=None,
+                 pool_maxsize=DEFAULT_POOLSIZE, http2=True, **client_kwargs):
+        if not HAS_HTTPX:
+            raise ImportError("The HTTP/2 transport requires httpx. Install "
+                              "it with `pip install civis[http2]`.")
+        super(HTTP2Adapter, self).__init__()
+        self.timeout = timeout
+        if max_retries is None:
+            max_retries = Retry(0, read=False)
+        self.max_retries = max_retries
+        limits = httpx.Limits(max_connections=pool_maxsize,
+                              max_keepalive_connections=pool_maxsize)
+        client_kwargs.setdefault('limits', limits)
+        self._http2 = http2
+        self._client_kwargs = client_kwargs
+        self._client = self._make_client()
+
+    def _make_client(self):
+        client = httpx.Client(http2=self._http2, **self._client_kwargs)
+        _set_no_delay(client)
+        return client
+
+    def reset_connections(self):
+        """Replace the ``httpx`` client without closing its connections,
+        such as those inherited by a forked process from its parent.
+        """
+        self._client = self._make_client()
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        if timeout is None:
+            timeout = self.timeout
+        retries = self.max_retries
+        budget = getattr(retries, 'budget', None)
+        if budget is not None:
+            budget.deposit()
+        # `h2` drops the headers which HTTP/2 forbids, such as Connection
+        headers = list(request.headers.items())
+        method, body = request.method, request.body
+        body_position = _tell(body) if hasattr(body, 'read') else None
+        while True:
+            httpx_request = self._client.build_request(
+                method, request.url, headers=headers, content=_content(body),
+                timeout=_timeout(timeout))
+            try:
+                response = self._client.send(httpx_request, stream=True)
+            except httpx.TransportError as e:
+                if not _rewind(body, body_position):
+                    raise _requests_error(e, request)
+                try:
+                    retries = retries.increment(method, request.url,
+                                                error=_retry_error(e))
+                except _URLLib3Error:
+                    raise _requests_error(e, request)
+                log.debug("Retrying %s %s after %r", method, request.url, e)
+                retries.sleep()
+                continue
+
+            retry_response = _RetryResponse(response)
+            if not retries.is_retry(method, response.status_code,
+                                    'Retry-After' in response.headers):
+                break
+            if not _rewind(body, body_position):
+                break
+            try:
+                retries = retries.increment(method, request.url,
+                                            response=retry_response)
+            except MaxRetryError as e:
+                if retries.raise_on_status:
+                    response.close()
+                    raise exceptions.RetryError(e, request=request)
+                break
+            response.close()
+            retries.sleep(retry_response)
+        return self.build_response(request, response, retries)
+
+    def build_response(self, request, response, retries):
+        """Wrap an ``httpx`` response in a :class:`requests.Response`."""
+        resp = Response()
+        resp.status_code = response.status_code
+        resp.headers = CaseInsensitiveDict(response.headers.items())
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.reason = response.reason_phrase
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.raw = _RawResponse(response, retries)
+        return resp
+
+    def close(self):
+        self._client.close()
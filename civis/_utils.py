@@ -1,10 +1,40 @@
+from concurrent import futures
+import hashlib
 import re
+import time
 import uuid
 
 
 UNDERSCORER1 = re.compile(r'(.)([A-Z][a-z]+)')
 UNDERSCORER2 = re.compile('([a-z0-9])([A-Z])')
 
+# Measures intervals without jumping when the system clock is changed
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def _resource(path):
+    """Return the API resource, such as ``'files'``, of a request path."""
+    return (path or '').strip('/').split('/')[0]
+
+
+def _hash_key(*parts):
+    """Return a hex digest identifying `parts`, such as an API key and
+    base URL, without holding the API key itself.
+    """
+    joined = u'\n'.join(u'{}'.format(part) for part in parts)
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+
+def module_available(name):
+    """Return whether the top-level module `name` can be found, without
+    importing it.
+    """
+    try:
+        from importlib.util import find_spec
+    except ImportError:  # Python 2
+        from pkgutil import find_loader as find_spec
+    return find_spec(name) is not None
+
 
 def maybe_get_random_name(name):
     if not name:
@@ -20,3 +50,23 @@ def camel_to_snake(word):
 
 def to_camelcase(s):
     return re.sub(r'(^|_)([a-zA-Z])', lambda m: m.group(2).upper(), s)
+
+
+def _call_capturing_errors(func):
+    try:
+        return func()
+    except Exception as exc:
+        return exc
+
+
+def run_concurrently(funcs, max_workers):
+    """Call each of the zero-argument functions `funcs` using at most
+    `max_workers` threads. Return their results in the order of `funcs`,
+    with the exception raised by a failed call in place of its result.
+    """
+    funcs = list(funcs)
+    if not funcs:
+        return []
+    max_workers = max(1, min(max_workers, len(funcs)))
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_call_capturing_errors, funcs))
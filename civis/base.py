@@ -1,16 +1,28 @@
 from __future__ import absolute_import
 from builtins import super
+import logging
 import os
 from posixpath import join
-import threading
+import socket
+from collections import OrderedDict
 from concurrent import futures
+from functools import partial
 import six
+from six.moves.urllib.parse import urlparse
 import warnings
 
+from requests import Session
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from requests.packages.urllib3.connection import HTTPConnection
+from requests.packages.urllib3.exceptions import MaxRetryError
 from requests.packages.urllib3.util import Retry
 
+from civis._utils import run_concurrently
 from civis.response import PaginatedResponse, convert_response_data_type
 
+log = logging.getLogger(__name__)
+
 FINISHED = ['success', 'succeeded']
 FAILED = ['failed']
 NOT_FINISHED = ['queued', 'running']
@@ -69,6 +81,11 @@ class CivisAPIKeyError(Exception):
     pass
 
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling an API resource whose circuit breaker is
+    open."""
+
+
 def get_base_url():
     base_url = os.environ.get('CIVIS_API_ENDPOINT', DEFAULT_API_ENDPOINT)
     if not base_url.endswith('/'):
@@ -80,6 +97,40 @@ class AggressiveRetry(Retry):
     # Subclass Retry so that it retries more things. In particular,
     # always retry API requests with a Retry-After header, regardless
     # of the verb.
+    def __init__(self, *args, **kwargs):
+        # A `civis._ratelimit.RateLimitGovernor` to pause when the API
+        # asks us to retry after some time
+        self.governor = kwargs.pop('governor', None)
+        # A `civis._resilience.RetryBudget` which every retry must draw on
+        self.budget = kwargs.pop('budget', None)
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kw):
+        kw.setdefault('governor', self.governor)
+        kw.setdefault('budget', self.budget)
+        return super().new(**kw)
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response=response,
+                                      error=error, _pool=_pool,
+                                      _stacktrace=_stacktrace)
+        # Retries after a response are checked against the budget in
+        # `is_retry`; retries after an error are checked here.
+        if (error is not None and self.budget is not None and
+                not self.budget.withdraw()):
+            # Give up as urllib3 does when retries run out, so that
+            # requests raises its own exceptions (e.g. ConnectionError)
+            raise MaxRetryError(_pool, url, error)
+        return new_retry
+
+    def sleep(self, response=None):
+        if self.governor is not None and response is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after:
+                self.governor.pause(retry_after)
+        super().sleep(response)
+
     def is_retry(self, method, status_code, has_retry_after=False):
         """ Is this method/status code retryable? (Based on whitelists and control
         variables such as the number of total retries to allow, whether to
@@ -91,34 +142,176 @@ class AggressiveRetry(Retry):
                 self.respect_retry_after_header and
                 has_retry_after and
                 (status_code in self.RETRY_AFTER_STATUS_CODES)):
-            return True
+            retry = True
 
         else:
-            return super().is_retry(method=method, status_code=status_code,
-                                    has_retry_after=has_retry_after)
+            retry = super().is_retry(method=method, status_code=status_code,
+                                     has_retry_after=has_retry_after)
+        if retry and self.budget is not None and not self._last_attempt():
+            # Once the budget is spent, the failed response is returned.
+            retry = self.budget.withdraw()
+        return retry
+
+    def _last_attempt(self):
+        # Have the retries for responses run out? If so, `increment` gives
+        # up without retrying, so nothing is taken from the budget.
+        total, status = self.total, self.status
+        return self.new(
+            total=None if total is None else int(total) - 1,
+            status=None if status is None else status - 1).is_exhausted()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter which applies a default timeout to every request and
+    turns on TCP keep-alive, so pooled connections survive idle periods.
 
+    Parameters
+    ----------
+    timeout : float or tuple, optional
+        Seconds to wait for the server, either as one number or as a
+        ``(connect, read)`` tuple. Used for requests which don't set their
+        own ``timeout``. ``None`` waits forever.
+    **kwargs
+        Passed to :class:`requests.adapters.HTTPAdapter`.
+    """
+    __attrs__ = HTTPAdapter.__attrs__ + ['timeout']
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        socket_options = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        kwargs.setdefault('socket_options', socket_options)
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        budget = getattr(self.max_retries, 'budget', None)
+        if budget is not None:
+            budget.deposit()
+        return super().send(request, **kwargs)
+
+    def prewarm(self, url, n_connections):
+        """Open up to `n_connections` connections to the host of `url` and
+        return them to the pool, so later requests skip connection setup.
+        The connections are opened concurrently.
+        """
+        pool = self.poolmanager.connection_from_url(url)
+        conns = [pool._get_conn() for _ in
+                 range(min(n_connections, self._pool_maxsize))]
+        results = run_concurrently([conn.connect for conn in conns],
+                                   len(conns))
+        for conn, result in zip(conns, results):
+            if isinstance(result, Exception):
+                # Pre-warming is an optimization; the connection will be
+                # re-established (and any error raised) on first use.
+                log.debug("Unable to pre-warm a connection to %s: %s",
+                          url, result)
+            pool._put_conn(conn)
+
+    def reset_connections(self):
+        """Replace the connection pools without closing their connections,
+        such as those inherited by a forked process from its parent.
+        """
+        self.proxy_manager = {}
+        self.init_poolmanager(self._pool_connections, self._pool_maxsize,
+                              block=self._pool_block)
 
-class Endpoint(object):
 
-    _lock = threading.Lock()
+class ForkSafeSession(Session):
+    """A :class:`requests.Session` which, when first used in a forked
+    process such as a :mod:`multiprocessing` worker, has its transport
+    adapters replace the connections inherited from the parent process.
+    Otherwise both processes would send requests on the same sockets.
 
-    def __init__(self, session, return_type='civis'):
+    Adapters are reset by calling their ``reset_connections`` method;
+    adapters without one are used as they are.
+    """
+    def __init__(self):
+        super().__init__()
+        self._pid = os.getpid()
+
+    def get_adapter(self, url):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            for adapter in set(self.adapters.values()):
+                reset = getattr(adapter, 'reset_connections', None)
+                if reset is not None:
+                    reset()
+        return super().get_adapter(url)
+
+
+class APIKeyAuth(HTTPBasicAuth):
+    """Authenticate with a Civis API key, but only on requests to the Civis
+    API. Other hosts, such as presigned S3 URLs, don't receive the key.
+    """
+    def __init__(self, api_key, base_url):
+        super().__init__(api_key, '')
+        self.api_host = urlparse(base_url).netloc
+
+    def __call__(self, r):
+        if urlparse(r.url).netloc == self.api_host:
+            return super().__call__(r)
+        return r
+
+
+class Endpoint(object):
+
+    def __init__(self, session, return_type='civis', governor=None,
+                 cache=None, base_url=None, metrics=None, breakers=None,
+                 pool_maxsize=DEFAULT_POOLSIZE):
         self._session = session
         self._return_type = return_type
-        self._base_url = get_base_url()
+        self._base_url = base_url or get_base_url()
+        self._governor = governor
+        self._cache = cache
+        self._metrics = metrics
+        self._breakers = breakers
+        self._pool_maxsize = pool_maxsize
 
     def _build_path(self, path):
         if not path:
             return self._base_url
         return tostr_urljoin(self._base_url, path.strip("/"))
 
+    def _send(self, method, url, params, data, **kwargs):
+        if self._governor is not None:
+            self._governor.acquire()
+        response = self._session.request(method, url, json=data,
+                                         params=params, **kwargs)
+        if self._governor is not None:
+            self._governor.update(response.headers)
+        return response
+
     def _make_request(self, method, path=None, params=None, data=None,
                       **kwargs):
+        # The name of the generated method making this call, if any
+        method_name = kwargs.pop('method_name', None)
         url = self._build_path(path)
-
-        with self._lock:
-            response = self._session.request(method, url, json=data,
-                                             params=params, **kwargs)
+        breakers = self._breakers
+        if breakers is not None and not breakers.allow(path):
+            raise CircuitOpenError("Not calling {} while the API is failing "
+                                   "for this resource".format(url))
+
+        try:
+            if self._metrics is None:
+                response = self._send(method, url, params, data, **kwargs)
+            else:
+                name = '{}.{}'.format(type(self).__name__.lower(),
+                                      method_name or method.upper())
+                response = self._metrics.observe(
+                    name, method, url,
+                    lambda: self._send(method, url, params, data, **kwargs))
+        except Exception:
+            if breakers is not None:
+                breakers.record(path, False)
+            raise
+        if breakers is not None:
+            breakers.record(path, response.status_code < 500)
 
         if response.status_code == 401:
             auth_error = response.headers["www-authenticate"]
@@ -134,12 +327,57 @@ class Endpoint(object):
         iterator = kwargs.pop('iterator', False)
 
         if iterator:
-            return PaginatedResponse(path, params, self)
+            return PaginatedResponse(path, params, self,
+                                     method_name=kwargs.get('method_name'))
+        elif self._cache is not None:
+            resp = self._make_cached_request(method, path, params, data,
+                                             **kwargs)
         else:
             resp = self._make_request(method, path, params, data, **kwargs)
-            resp = convert_response_data_type(resp,
-                                              return_type=self._return_type)
+        resp = convert_response_data_type(resp, return_type=self._return_type)
+        return resp
+
+    def _make_cached_request(self, method, path=None, params=None, data=None,
+                             **kwargs):
+        if method.upper() != 'GET':
+            try:
+                return self._make_request(method, path, params, data,
+                                          **kwargs)
+            finally:
+                self._cache.invalidate(path)
+
+        key = self._cache.key(path, params)
+        resp, etag = self._cache.get(key)
+        if resp is not None:
             return resp
+        if etag is not None:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers['If-None-Match'] = etag
+            resp = self._make_request(method, path, params, data,
+                                      headers=headers, **kwargs)
+            if resp.status_code == 304:
+                cached = self._cache.revalidated(key)
+                if cached is not None:
+                    return cached
+                # Evicted while revalidating; download it again
+                del headers['If-None-Match']
+                resp = self._make_request(method, path, params, data,
+                                          headers=headers, **kwargs)
+        else:
+            resp = self._make_request(method, path, params, data, **kwargs)
+        self._cache.put(key, resp)
+        return resp
+
+    def _get_many(self, ids, max_workers=None, as_dict=False):
+        unique_ids = list(OrderedDict.fromkeys(ids))
+        if max_workers is None:
+            max_workers = self._pool_maxsize
+        results = run_concurrently(
+            [partial(self.get, id_) for id_ in unique_ids], max_workers)
+        by_id = OrderedDict(zip(unique_ids, results))
+        if as_dict:
+            return by_id
+        return [by_id[id_] for id_ in ids]
 
 
 class CivisAsyncResultBase(futures.Future):
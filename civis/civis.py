@@ -1,19 +1,30 @@
 from __future__ import absolute_import
+import functools
 import logging
 import os
 
-import requests
-from requests.adapters import HTTPAdapter
+from requests.adapters import BaseAdapter, DEFAULT_POOLSIZE
 
 import civis
-from civis.base import AggressiveRetry
-from civis.compat import lru_cache
+from civis._cache import DEFAULT_CACHE_TTL, ResponseCache
+from civis._metadata import (AWS_CREDENTIAL, DATABASE_CREDENTIAL,
+                             get_metadata_index)
+from civis._metrics import RequestMetrics
+from civis._ratelimit import get_governor
+from civis._resilience import CircuitBreakers, RetryBudget
+from civis._utils import run_concurrently
+from civis.base import (AggressiveRetry, APIKeyAuth, ForkSafeSession,
+                        TimeoutHTTPAdapter, get_base_url)
 from civis.resources import generate_classes_maybe_cached
+from civis.resources._compiled import (get_compiled_api_spec,
+                                       strip_compiled_api_spec)
+from civis.response import RETURN_TYPES
 
 
 log = logging.getLogger(__name__)
 
 RETRY_CODES = [429, 502, 503, 504]
+TRANSPORTS = ('requests', 'http2')
 
 
 def _get_api_key(api_key):
@@ -29,26 +40,42 @@ def _get_api_key(api_key):
     return api_key
 
 
+def _make_transport(transport, max_retries, timeout, pool_connections,
+                    pool_maxsize):
+    """Create the transport adapter which sends a client's requests."""
+    if isinstance(transport, BaseAdapter):
+        return transport
+    elif transport == 'requests':
+        return TimeoutHTTPAdapter(timeout=timeout, max_retries=max_retries,
+                                  pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize)
+    elif transport == 'http2':
+        from civis._transport import HTTP2Adapter
+        return HTTP2Adapter(timeout=timeout, max_retries=max_retries,
+                            pool_maxsize=pool_maxsize)
+    raise ValueError("transport must be one of {} or a transport adapter, "
+                     "given {!r}".format(TRANSPORTS, transport))
+
+
+def _matches(o, kwargs):
+    for k, v in kwargs.items():
+        if not hasattr(o, k):
+            return False
+        elif callable(v):
+            if not v(getattr(o, k, None)):
+                return False
+        elif isinstance(v, bool):
+            if hasattr(o, k) != v:
+                return False
+        elif v != getattr(o, k, None):
+            return False
+    return True
+
+
 def find(object_list, filter_func=None, **kwargs):
-    _func = filter_func
-    if not filter_func:
-        def default_filter(o):
-            for k, v in kwargs.items():
-                if not hasattr(o, k):
-                    return False
-                elif callable(v):
-                    if not v(getattr(o, k, None)):
-                        return False
-                elif isinstance(v, bool):
-                    if hasattr(o, k) != v:
-                        return False
-                elif v != getattr(o, k, None):
-                    return False
-            return True
-
-        _func = default_filter
-
-    return [o for o in object_list if _func(o)]
+    if filter_func:
+        return [o for o in object_list if filter_func(o)]
+    return [o for o in object_list if _matches(o, kwargs)]
 
 
 def find_one(object_list, filter_func=None, **kwargs):
@@ -57,9 +84,105 @@ def find_one(object_list, filter_func=None, **kwargs):
     return results[0] if results else None
 
 
+_MISSING = object()
+
+
+class ResponseIndex(object):
+    """Find objects in a list by their attributes with hash lookups.
+
+    Lookups return the same results as :func:`find` and :func:`find_one`,
+    but don't test every object in the list. Build an index once to make
+    many lookups in a large list, such as credentials or run outputs. An
+    attribute is indexed the first time a lookup filters on it, or up front
+    if named in `attrs`. Callable and boolean filter values, and
+    `filter_func`, are tested against each candidate as :func:`find` would.
+
+    The list must not change after the index is built.
+
+    Parameters
+    ----------
+    object_list : iterable
+        The objects to look up, such as :class:`civis.response.Response`
+        objects from a list call.
+    *attrs : str
+        Attributes to index now.
+
+    Examples
+    --------
+    >>> outputs = client.scripts.list_containers_runs_outputs(job_id, run_id)
+    >>> index = civis.ResponseIndex(outputs, 'name')
+    >>> file_ids = [index.find_one(name=name, object_type='File').object_id
+    ...             for name in names]
+    """
+    def __init__(self, object_list, *attrs):
+        self._objects = list(object_list)
+        self._indexes = {}
+        for attr in attrs:
+            self._index(attr)
+
+    def _index(self, attr):
+        index = self._indexes.get(attr)
+        if index is None:
+            index = {}
+            for o in self._objects:
+                value = getattr(o, attr, _MISSING)
+                if value is _MISSING:
+                    continue
+                try:
+                    index.setdefault(value, []).append(o)
+                except TypeError:
+                    # An unhashable value can't equal a hashable filter value
+                    pass
+            self._indexes[attr] = index
+        return index
+
+    def find(self, filter_func=None, **kwargs):
+        """Return all objects which match, in the order of the list. Takes
+        the same arguments as :func:`find`.
+        """
+        if filter_func:
+            return find(self._objects, filter_func)
+        candidates = None
+        for k, v in kwargs.items():
+            if callable(v) or isinstance(v, bool):
+                continue
+            try:
+                matches = self._index(k).get(v, ())
+            except TypeError:
+                continue
+            if candidates is None or len(matches) < len(candidates):
+                candidates = matches
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = self._objects
+        return [o for o in candidates if _matches(o, kwargs)]
+
+    def find_one(self, filter_func=None, **kwargs):
+        """Return the first object which matches, or None."""
+        results = self.find(filter_func, **kwargs)
+        return results[0] if results else None
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def __len__(self):
+        return len(self._objects)
+
+
+def _bind_call(method, args=(), kwargs=None):
+    # Only a tuple holds several arguments; a list is a single argument
+    if not isinstance(args, tuple):
+        args = (args,)
+    return functools.partial(method, *args, **(kwargs or {}))
+
+
 class MetaMixin():
+    """Look up objects by name. Lookups go through the client's
+    ``metadata_index``, shared by clients with the same API key, so that
+    repeated lookups don't list the objects from the API again.
+    """
 
-    @lru_cache(maxsize=128)
     def get_database_id(self, database):
         """Return the database ID for a given database name.
 
@@ -81,13 +204,12 @@ class MetaMixin():
         """
         if isinstance(database, int):
             return database
-        db = find_one(self.databases.list(), name=database)
+        db = self.metadata_index.database(self, database)
         if not db:
             raise ValueError("Database {} not found.".format(database))
 
         return db["id"]
 
-    @lru_cache(maxsize=128)
     def get_database_credential_id(self, username, database_name):
         """Return the credential ID for a given username in a given database.
 
@@ -124,20 +246,15 @@ class MetaMixin():
         if isinstance(username, int):
             return username
         else:
-            creds = self.credentials.list(type="Database")
-            filter_kwargs = {'username': username}
-            if isinstance(database_name, int):
-                filter_kwargs['remote_host_id'] = database_name
-            else:
-                filter_kwargs['remote_host_name'] = database_name
-            my_creds = find_one(creds, **filter_kwargs)
-            if my_creds is None:
+            my_creds = self.metadata_index.credentials(
+                self, DATABASE_CREDENTIAL, username=username,
+                host=database_name)
+            if not my_creds:
                 raise ValueError("Credential ID for {} on {} not "
                                  "found.".format(username, database_name))
 
-        return my_creds["id"]
+        return my_creds[0]["id"]
 
-    @lru_cache(maxsize=128)
     def get_aws_credential_id(self, cred_name, owner=None):
         """Find an AWS credential ID.
 
@@ -180,10 +297,8 @@ class MetaMixin():
         if isinstance(cred_name, int):
             return cred_name
         else:
-            creds = self.credentials.list(type="Amazon Web Services S3")
-            my_creds = find(creds, name=cred_name)
-            if owner is not None:
-                my_creds = find(my_creds, owner=owner)
+            my_creds = self.metadata_index.credentials(
+                self, AWS_CREDENTIAL, name=cred_name, owner=owner)
 
             if not my_creds:
                 own_str = "" if owner is None else " owned by {}".format(owner)
@@ -203,7 +318,6 @@ class MetaMixin():
 
         return my_creds["id"]
 
-    @lru_cache(maxsize=128)
     def get_table_id(self, table, database):
         """Return the table ID for a given database and table name.
 
@@ -226,32 +340,19 @@ class MetaMixin():
             If an exact table match can't be found.
         """
         database_id = self.get_database_id(database)
-        schema, name = table.split('.')
-        tables = self.tables.list(database_id=database_id, schema=schema,
-                                  name=name)
-        if not tables:
-            msg = "No tables found for {} in database {}"
-            raise ValueError(msg.format(table, database))
-        found_table = ".".join((tables[0].schema, tables[0].name))
-        if table != found_table:
-            msg = "Given table {} is not an exact match for returned table {}."
-            raise ValueError(msg.format(table, found_table))
-
-        return tables[0].id
+        return self.metadata_index.table_id(self, database_id, table,
+                                            database)
 
     @property
-    @lru_cache(maxsize=128)
     def default_credential(self):
         """The current user's default credential."""
         # NOTE: this should be optional to endpoints...so this could go away
-        creds = self.credentials.list(default=True)
-        return creds[0]['id'] if len(creds) > 0 else None
+        return self.metadata_index.default_credential(self)
 
     @property
-    @lru_cache(maxsize=128)
     def username(self):
         """The current user's username."""
-        return self.users.list_me().username
+        return self.metadata_index.username(self)
 
 
 class APIClient(MetaMixin):
@@ -272,6 +373,13 @@ class APIClient(MetaMixin):
         - ``'pandas'`` Returns a :class:`pandas:pandas.DataFrame` for
           list-like responses and a :class:`pandas:pandas.Series` for single a
           json response.
+        - ``'columnar'`` Returns an ordered dict of columns for list-like
+          responses, built directly from the json without an object for
+          each item, and a :class:`civis.response.Response` for a single
+          json response. Columns are keyed by the snake_case json key and
+          are :class:`numpy:numpy.ndarray` objects if NumPy is installed
+          (lists otherwise). Use ``to_columns()`` on the iterator returned
+          with ``iterator=True`` to gather every page into columns.
     retry_total : int, optional
         A number indicating the maximum number of retries for 429, 502, 503, or
         504 errors.
@@ -289,36 +397,275 @@ class APIClient(MetaMixin):
         When local_api_spec is None, the default, this specification is
         downloaded the first time APIClient is instantiated. Alternatively,
         a local cache of the specification may be passed as either an
-        OrderedDict or a filename which points to a json file.
+        OrderedDict or a filename which points to a json file. The filename
+        may also point to a specification compiled with
+        ``civis compile-api-spec``, which loads much faster.
+    pool_maxsize : int, optional
+        The maximum number of connections to the Civis API which are kept
+        open for reuse. API calls made from different threads run
+        concurrently, so set this to at least the number of threads which
+        share this client. Defaults to 10.
+    pool_connections : int, optional
+        The number of distinct hosts (the Civis API, and the storage hosts
+        used for file transfers) for which connection pools are kept.
+        Defaults to 10.
+    timeout : float or tuple, optional
+        Seconds to wait for a response, either as a single number or as a
+        ``(connect timeout, read timeout)`` tuple. Applies to API calls and
+        to file transfers in :mod:`civis.io`. The default, ``None``, waits
+        forever.
+    prewarm_connections : int, optional
+        Open this many connections to the Civis API when the client is
+        created, so that the first concurrent API calls don't each pay for
+        a new TCP and TLS handshake. At most `pool_maxsize` connections are
+        opened, concurrently, so creating the client takes about as long as
+        one handshake more. Defaults to 0.
+    throttle : bool, optional
+        If True, pace API calls to stay within the Civis API rate limit,
+        rather than relying on retries after the limit is exceeded. The
+        pace is shared by all threads and all clients in this process which
+        use the same API key, and is set from the rate limit headers of
+        each response. If any call is asked to retry later, all calls wait.
+        The ``metrics`` method of the client's ``rate_limit_governor``
+        reports how long calls were throttled. Defaults to False.
+    cache_size : int, optional
+        The number of GET responses to cache, so that repeated lookups such
+        as ``client.files.get(file_id)`` don't call the API every time.
+        Responses are reused until they expire, and then revalidated with
+        their ``ETag`` where the API provides one. A PUT, PATCH, POST or
+        DELETE evicts cached responses for the same path. The client's
+        ``response_cache`` reports hit rates through its ``metrics``
+        method. Defaults to 0, which disables the cache.
+    cache_ttl : float or dict, optional
+        Seconds to reuse a cached response. A dict maps resource names,
+        such as ``'users'``, to their own time-to-live; other resources use
+        60 seconds. Defaults to 60.
+    instrument : bool, optional
+        If True, measure API calls. The client's ``request_metrics``
+        counts calls, errors, retries and bytes transferred, and keeps a
+        latency histogram, for each method such as ``files.get``. Its
+        ``snapshot`` method exports them, and callbacks can be registered
+        to run before and after each call.
+        Defaults to False.
+    retry_budget : float, optional
+        The largest share of calls which may be retries, such as 0.2. The
+        budget is shared by all threads using the client, so that when the
+        API is struggling, calls don't all retry at once; once it is spent,
+        a call which would be retried returns its error instead. The
+        client's ``retry_budget`` reports retries made and refused through
+        its ``metrics`` method. Defaults to None, which retries every call
+        up to `retry_total` times.
+    circuit_breaker : bool or dict, optional
+        If True, stop calling an API resource, such as ``files``, after
+        consecutive calls to it fail with a server error or without a
+        response, and raise :class:`civis.base.CircuitOpenError` instead
+        until a trial call succeeds. A dict sets the
+        ``failure_threshold`` (default 5) and ``reset_timeout`` (default 30
+        seconds) of the breakers. The client's ``circuit_breakers`` report
+        the state of each resource. Defaults to False.
+
+        Register callbacks for changes of state with the
+        ``on_state_change`` method of ``retry_budget`` or
+        ``circuit_breakers``.
+    transport : str or :class:`requests.adapters.BaseAdapter`, optional
+        How requests are sent, for API calls and for the file transfers in
+        :mod:`civis.io`. ``'requests'``, the default, keeps a pool of
+        connections to each host. ``'http2'`` uses HTTP/2 where the server
+        supports it, so that concurrent calls share a few connections;
+        this requires ``httpx`` (``pip install civis[http2]``). A
+        transport adapter, such as an in-memory one for tests, is used
+        as given, including to download the API specification; the
+        `retry_total`, `pool_maxsize`, `pool_connections`, `timeout` and
+        `retry_budget` parameters then don't apply to it. The adapter is
+        available as the client's ``transport``.
+
+    Notes
+    -----
+    The client's connection pool is also used by the functions in
+    :mod:`civis.io` to upload and download files, so bulk file transfers
+    reuse connections. Your API key is only sent to the Civis API.
+
+    The client can be pickled for use in other processes. The pickle holds
+    the client's parameters, API key and a compiled table of its API
+    methods, but not its connections or caches, so unpickling it doesn't
+    download the API specification. The table leaves out doc strings; in a
+    process which hasn't loaded the specification, the methods of an
+    unpickled client only name their API endpoint. A client used in a child
+    process created by ``fork`` replaces the connections inherited from its
+    parent.
+
+    Lookups by name, such as :meth:`get_database_id`, are answered from the
+    client's ``metadata_index``, a :class:`civis._metadata.MetadataIndex`
+    shared by the clients in this process which use the same API key.
     """
     def __init__(self, api_key=None, return_type='snake',
                  retry_total=6, api_version="1.0", resources="base",
-                 local_api_spec=None):
-        if return_type not in ['snake', 'raw', 'pandas']:
+                 local_api_spec=None, pool_maxsize=DEFAULT_POOLSIZE,
+                 pool_connections=DEFAULT_POOLSIZE, timeout=None,
+                 prewarm_connections=0, throttle=False, cache_size=0,
+                 cache_ttl=DEFAULT_CACHE_TTL, instrument=False,
+                 retry_budget=None, circuit_breaker=False,
+                 transport='requests'):
+        if return_type not in RETURN_TYPES:
             raise ValueError("Return type must be one of 'snake', 'raw', "
-                             "'pandas'")
+                             "'pandas', 'columnar'")
+        # Kept so that the client can be pickled
+        self._config = dict(
+            return_type=return_type, retry_total=retry_total,
+            api_version=api_version, resources=resources,
+            pool_maxsize=pool_maxsize, pool_connections=pool_connections,
+            timeout=timeout, prewarm_connections=prewarm_connections,
+            throttle=throttle, cache_size=cache_size, cache_ttl=cache_ttl,
+            instrument=instrument, retry_budget=retry_budget,
+            circuit_breaker=circuit_breaker, transport=transport)
+        self._setup(_get_api_key(api_key), get_base_url(), local_api_spec,
+                    **self._config)
+
+    def _setup(self, session_auth_key, base_url, local_api_spec,
+               return_type, retry_total, api_version, resources,
+               pool_maxsize, pool_connections, timeout, prewarm_connections,
+               throttle, cache_size, cache_ttl, instrument, retry_budget,
+               circuit_breaker, transport):
         self._feature_flags = ()
-        session_auth_key = _get_api_key(api_key)
-        self._session = session = requests.session()
-        session.auth = (session_auth_key, '')
+        self._pool_maxsize = pool_maxsize
+        self._api_key = session_auth_key
+        self._base_url = base_url
+        self._session = session = ForkSafeSession()
+        session.auth = APIKeyAuth(session_auth_key, base_url)
+        self.metadata_index = get_metadata_index(session_auth_key, base_url)
 
         civis_version = civis.__version__
         session_agent = session.headers.get('User-Agent', '')
         user_agent = "civis-python/{} {}".format(civis_version, session_agent)
         session.headers.update({"User-Agent": user_agent.strip()})
 
+        if throttle:
+            self.rate_limit_governor = get_governor(session_auth_key,
+                                                    base_url)
+        else:
+            self.rate_limit_governor = None
+
+        if cache_size:
+            if isinstance(cache_ttl, dict):
+                self.response_cache = ResponseCache(cache_size,
+                                                    resource_ttls=cache_ttl)
+            else:
+                self.response_cache = ResponseCache(cache_size, cache_ttl)
+        else:
+            self.response_cache = None
+
+        self.request_metrics = RequestMetrics() if instrument else None
+
+        if retry_budget is not None:
+            self.retry_budget = RetryBudget(ratio=retry_budget)
+        else:
+            self.retry_budget = None
+
+        if circuit_breaker:
+            options = circuit_breaker if isinstance(circuit_breaker,
+                                                    dict) else {}
+            self.circuit_breakers = CircuitBreakers(**options)
+        else:
+            self.circuit_breakers = None
+
         max_retries = AggressiveRetry(retry_total, backoff_factor=.75,
-                                      status_forcelist=RETRY_CODES)
-        adapter = HTTPAdapter(max_retries=max_retries)
+                                      status_forcelist=RETRY_CODES,
+                                      governor=self.rate_limit_governor,
+                                      budget=self.retry_budget)
+        self.transport = adapter = _make_transport(
+            transport, max_retries, timeout, pool_connections, pool_maxsize)
 
         session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if prewarm_connections and hasattr(adapter, 'prewarm'):
+            adapter.prewarm(base_url, prewarm_connections)
+
+        self._return_type = return_type
+        # Only a transport given by the caller is needed to download the
+        # API specification; the others reach the same API.
+        spec_transport = adapter if isinstance(transport,
+                                               BaseAdapter) else None
+        self._classes = generate_classes_maybe_cached(
+            local_api_spec, session_auth_key, api_version, resources,
+            transport=spec_transport)
+        self._api_spec = local_api_spec
+        self._spec_transport = spec_transport
+        self._api_spec_table = None
+
+    def __getstate__(self):
+        # The connection pool and the caches aren't pickled; the endpoints
+        # are, as a compiled table, so that unpickling the client doesn't
+        # download or parse the API specification. The table only has the
+        # client's methods and no doc strings, to keep the pickle small.
+        if self._api_spec_table is None:
+            self._api_spec_table = strip_compiled_api_spec(
+                get_compiled_api_spec(
+                    self._api_spec, self._api_key,
+                    self._config['api_version'], self._spec_transport),
+                self._config['resources'])
+        return {'api_key': self._api_key, 'base_url': self._base_url,
+                'api_spec': self._api_spec_table, 'config': self._config}
+
+    def __setstate__(self, state):
+        self._config = state['config']
+        self._setup(state['api_key'], state['base_url'], state['api_spec'],
+                    **self._config)
+
+    def __getattr__(self, name):
+        # Each resource, such as `client.files`, is created on first use.
+        classes = self.__dict__.get('_classes')
+        if classes is None or name not in classes:
+            raise AttributeError("'{}' object has no attribute "
+                                 "'{}'".format(type(self).__name__, name))
+        endpoint = classes[name](self._session, self._return_type,
+                                 governor=self.rate_limit_governor,
+                                 cache=self.response_cache,
+                                 base_url=self._base_url,
+                                 metrics=self.request_metrics,
+                                 breakers=self.circuit_breakers,
+                                 pool_maxsize=self._pool_maxsize)
+        return self.__dict__.setdefault(name, endpoint)
+
+    def __dir__(self):
+        return sorted(set(dir(self.__class__)) | set(vars(self)) |
+                      set(self._classes))
+
+    def batch(self, calls, max_workers=None):
+        """Make many independent API calls concurrently.
+
+        Parameters
+        ----------
+        calls : iterable
+            The calls to make. Each is a tuple of a method of this client
+            and its positional arguments, optionally followed by a dict of
+            keyword arguments, e.g. ``(client.files.get, (file_id,))`` or
+            ``(client.scripts.list, (), {'type': 'python3'})``. Any other
+            single argument, including a list, may be given in place of a
+            one-element tuple.
+        max_workers : int, optional
+            The maximum number of calls in flight at once. Defaults to the
+            client's `pool_maxsize`.
+
+        Returns
+        -------
+        results : list
+            The result of each call, in the order of `calls`. If a call
+            raised an exception, such as a :class:`civis.base.CivisAPIError`,
+            that exception is returned in place of its result, so one failed
+            call doesn't prevent the others from completing.
 
-        classes = generate_classes_maybe_cached(local_api_spec,
-                                                session_auth_key,
-                                                api_version,
-                                                resources)
-        for class_name, cls in classes.items():
-            setattr(self, class_name, cls(session, return_type))
+        Examples
+        --------
+        >>> client = civis.APIClient()
+        >>> results = client.batch([(client.files.get, file_id)
+        ...                         for file_id in file_ids])
+        >>> failed = [file_id for file_id, result in zip(file_ids, results)
+        ...           if isinstance(result, Exception)]
+        """
+        if max_workers is None:
+            max_workers = self._pool_maxsize
+        funcs = [_bind_call(*call) for call in calls]
+        return run_concurrently(funcs, max_workers)
 
     @property
     def feature_flags(self):
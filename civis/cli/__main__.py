@@ -25,7 +25,8 @@ from jsonref import JsonRef
 import requests
 import yaml
 from civis.cli._cli_commands import \
-    civis_ascii_art, files_download_cmd, files_upload_cmd
+    civis_ascii_art, files_download_cmd, files_upload_cmd, \
+    compile_api_spec_cmd, check_api_spec_cmd
 from civis.compat import FileNotFoundError
 
 
@@ -229,6 +230,8 @@ def add_extra_commands(cli):
     files_cmd.add_command(files_download_cmd)
     files_cmd.add_command(files_upload_cmd)
     cli.add_command(civis_ascii_art)
+    cli.add_command(compile_api_spec_cmd)
+    cli.add_command(check_api_spec_cmd)
 
 
 def generate_cli():
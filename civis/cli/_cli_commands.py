@@ -4,11 +4,17 @@
 Additional commands to add to the CLI beyond the OpenAPI spec.
 """
 
+from collections import OrderedDict
+import json
 import os
+import sys
 
 import click
 
+from civis.civis import _get_api_key
 from civis.io import file_to_civis, civis_to_file
+from civis.resources import (compiled_api_spec_is_current, get_api_spec,
+                             write_compiled_api_spec)
 
 
 # From http://patorjk.com/software/taag/#p=display&f=3D%20Diagonal&t=CIVIS
@@ -67,6 +73,38 @@ def files_download_cmd(file_id, path):
         civis_to_file(file_id, f)
 
 
+@click.command('compile-api-spec')
+@click.argument('path')
+@click.option('--spec-file', type=str, default=None,
+              help="Compile this JSON API specification instead of "
+                   "downloading the specification for your API key.")
+def compile_api_spec_cmd(path, spec_file):
+    """Compile the API specification to a file which APIClient can load
+    quickly as its local_api_spec.
+    """
+    write_compiled_api_spec(_load_raw_spec(spec_file), path)
+
+
+@click.command('check-api-spec')
+@click.argument('path')
+def check_api_spec_cmd(path):
+    """Check that a compiled API specification matches the live API.
+    Exits with status 1 if it needs to be compiled again.
+    """
+    if compiled_api_spec_is_current(path, _load_raw_spec(None)):
+        print("{} is up to date.".format(path))
+    else:
+        print("{} does not match the live API specification.".format(path))
+        sys.exit(1)
+
+
+def _load_raw_spec(spec_file):
+    if spec_file is None:
+        return get_api_spec(_get_api_key(None))
+    with open(spec_file) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
 @click.command('civis', help="Print Civis")
 def civis_ascii_art():
     print(_CIVIS_ASCII_ART)
@@ -1,22 +1,43 @@
 # flake8: noqa
 from __future__ import print_function
 
+import os as _os
+
 import six
 
 if six.PY3:
-    from unittest import mock
+    from collections.abc import Mapping
     from functools import lru_cache
     from inspect import signature
     FileNotFoundError = FileNotFoundError
+
+    # Only needed by tests, so imported on first use
+    from civis._lazy import set_lazy_attributes
+    if not set_lazy_attributes(__name__, {'mock': ('unittest.mock', None)}):
+        from unittest import mock
 else:
     try:
         import mock
     except ImportError:  # dev dependency
         pass
+    from collections import Mapping
     from functools32 import lru_cache
     from funcsigs import signature
     FileNotFoundError = IOError
 
+if six.PY3:
+    from os import replace as replace_file
+else:
+    def replace_file(src, dst):
+        """Rename `src` to `dst`, overwriting `dst` if it exists.
+
+        Python 2.7 has no ``os.replace``. ``os.rename`` overwrites on
+        POSIX; on Windows remove the destination first.
+        """
+        if _os.name == 'nt' and _os.path.exists(dst):
+            _os.remove(dst)
+        _os.rename(src, dst)
+
 if six.PY3:
     from tempfile import TemporaryDirectory
 else:
@@ -12,17 +12,13 @@ import threading
 import six
 
 from civis import APIClient
+from civis._utils import module_available
 from civis.base import DONE
 from civis.polling import PollableResult, _ResultPollingThread
 
-try:
-    from pubnub.pubnub import PubNub
-    from pubnub.pnconfiguration import PNConfiguration, PNReconnectionPolicy
-    from pubnub.enums import PNStatusCategory
-    from pubnub.callbacks import SubscribeCallback
-    has_pubnub = True
-except ImportError:
-    has_pubnub = False
+# The PubNub SDK is imported when a future first subscribes to job updates,
+# so that `import civis` stays fast.
+has_pubnub = module_available('pubnub')
 
 log = logging.getLogger(__name__)
 
@@ -31,31 +27,51 @@ log = logging.getLogger(__name__)
 # fallback in case the job complete message is missed in an outage.
 _LONG_POLLING_INTERVAL = 9.5 * 60
 
-if has_pubnub:
-    class JobCompleteListener(SubscribeCallback):
-        _disconnect_categories = [
-            PNStatusCategory.PNTimeoutCategory,
-            PNStatusCategory.PNNetworkIssuesCategory,
-            PNStatusCategory.PNUnexpectedDisconnectCategory,
-        ]
 
-        def __init__(self, match_function, callback_function,
-                     disconnect_function=None):
-            self.match_function = match_function
-            self.callback_function = callback_function
-            self.disconnect_function = disconnect_function
+class JobCompleteListener(object):
+    """Handle PubNub messages about a job.
 
-        def message(self, pubnub, message):
-            if self.match_function(message.message):
-                self.callback_function()
+    PubNub only accepts subclasses of its ``SubscribeCallback``;
+    :func:`_pubnub_listener` creates one from this class.
+    """
+    _disconnect_categories = (
+        'PNTimeoutCategory',
+        'PNNetworkIssuesCategory',
+        'PNUnexpectedDisconnectCategory',
+    )
+
+    def __init__(self, match_function, callback_function,
+                 disconnect_function=None):
+        self.match_function = match_function
+        self.callback_function = callback_function
+        self.disconnect_function = disconnect_function
+
+    def message(self, pubnub, message):
+        if self.match_function(message.message):
+            self.callback_function()
+
+    def status(self, pubnub, status):
+        from pubnub.enums import PNStatusCategory
+        if status.category in [getattr(PNStatusCategory, name) for name
+                               in self._disconnect_categories]:
+            if self.disconnect_function:
+                self.disconnect_function()
+
+    def presence(self, pubnub, presence):
+        pass
+
+
+_listener_class = None
 
-        def status(self, pubnub, status):
-            if status.category in self._disconnect_categories:
-                if self.disconnect_function:
-                    self.disconnect_function()
 
-        def presence(self, pubnub, presence):
-            pass
+def _pubnub_listener(*args, **kwargs):
+    """Create a :class:`JobCompleteListener` which PubNub accepts."""
+    global _listener_class
+    if _listener_class is None:
+        from pubnub.callbacks import SubscribeCallback
+        _listener_class = type('JobCompleteListener',
+                               (JobCompleteListener, SubscribeCallback), {})
+    return _listener_class(*args, **kwargs)
 
 
 class CivisFuture(PollableResult):
@@ -140,9 +156,10 @@ class CivisFuture(PollableResult):
                 self._pubnub.unsubscribe_all()
 
     def _subscribe(self, pnconfig, channels):
-        listener = JobCompleteListener(self._check_message,
-                                       self._poll_and_set_api_result,
-                                       self._reset_polling_thread)
+        from pubnub.pubnub import PubNub
+        listener = _pubnub_listener(self._check_message,
+                                    self._poll_and_set_api_result,
+                                    self._reset_polling_thread)
         pubnub = PubNub(pnconfig)
         pubnub.add_listener(listener)
         pubnub.subscribe().channels(channels).execute()
@@ -151,6 +168,8 @@ class CivisFuture(PollableResult):
     def _pubnub_config(self):
         channel_config = self.client.channels.list()
         channels = [channel['name'] for channel in channel_config['channels']]
+        from pubnub.pnconfiguration import (PNConfiguration,
+                                            PNReconnectionPolicy)
         pnconfig = PNConfiguration()
         pnconfig.subscribe_key = channel_config['subscribe_key']
         pnconfig.cipher_key = channel_config['cipher_key']
@@ -6,23 +6,18 @@ import os
 import re
 import six
 
-import requests
 from requests import HTTPError
 
 from civis import APIClient, find_one
+from civis._utils import module_available
 from civis.base import CivisAPIError, EmptyResultError
 from civis.compat import FileNotFoundError
 from civis.utils._deprecation import deprecate_param
-try:
-    from requests_toolbelt.multipart.encoder import MultipartEncoder
-    HAS_TOOLBELT = True
-except ImportError:
-    HAS_TOOLBELT = False
-try:
-    import pandas as pd
-    HAS_PANDAS = True
-except ImportError:
-    HAS_PANDAS = False
+
+# Optional dependencies are imported where they're used, so that
+# `import civis` stays fast.
+HAS_TOOLBELT = module_available('requests_toolbelt')
+HAS_PANDAS = module_available('pandas')
 
 log = logging.getLogger(__name__)
 __all__ = ['file_to_civis', 'civis_to_file', 'file_id_from_run_output',
@@ -112,6 +107,7 @@ def file_to_civis(buf, name, api_key=None, client=None, **kwargs):
     if HAS_TOOLBELT:
         # This streams from the open file buffer without holding the
         # contents in memory.
+        from requests_toolbelt.multipart.encoder import MultipartEncoder
         en = MultipartEncoder(fields=form_key)
         # The refusal error from AWS states 5368730624 is the max size allowed
         if en.len >= 5 * 2 ** 30:  # 5 GB
@@ -120,12 +116,12 @@ def file_to_civis(buf, name, api_key=None, client=None, **kwargs):
         elif en.len <= 100 * 2 ** 20:  # 100 MB
             # Semi-arbitrary cutoff for "small" files.
             # Send these with requests directly because that uses less CPU
-            response = requests.post(url, files=form_key)
+            response = client._session.post(url, files=form_key)
         else:
-            response = requests.post(url, data=en,
-                                     headers={'Content-Type': en.content_type})
+            response = client._session.post(
+                url, data=en, headers={'Content-Type': en.content_type})
     else:
-        response = requests.post(url, files=form_key)
+        response = client._session.post(url, files=form_key)
 
     if not response.ok:
         # Amazon gives back informative error messages
@@ -171,7 +167,7 @@ def civis_to_file(file_id, buf, api_key=None, client=None):
         raise EmptyResultError('Unable to locate file {}. If it previously '
                                'existed, it may have '
                                'expired.'.format(file_id))
-    response = requests.get(url, stream=True)
+    response = client._session.get(url, stream=True)
     response.raise_for_status()
     chunk_size = 32 * 1024
     chunked = response.iter_content(chunk_size)
@@ -300,6 +296,7 @@ def file_to_dataframe(file_id, compression='infer', client=None,
         if ext in comp_exts:
             compression = comp_exts[ext]
 
+    import pandas as pd
     return pd.read_csv(file_url, compression=compression, **read_kwargs)
 
 
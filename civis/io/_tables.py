@@ -6,22 +6,17 @@ import warnings
 
 from civis import APIClient
 from civis.io import civis_to_file
-from civis._utils import maybe_get_random_name
+from civis._utils import maybe_get_random_name, module_available
 from civis.base import EmptyResultError
 from civis.futures import CivisFuture
 from civis.utils._deprecation import deprecate_param
 
-import requests
 
 try:
     from io import StringIO
 except ImportError:
     from cStringIO import StringIO
-try:
-    import pandas as pd
-    NO_PANDAS = False
-except ImportError:
-    NO_PANDAS = True
+NO_PANDAS = not module_available('pandas')
 
 __all__ = ['read_civis', 'read_civis_sql', 'civis_to_csv',
            'civis_to_multifile_csv', 'dataframe_to_civis', 'csv_to_civis']
@@ -224,9 +219,10 @@ def read_civis_sql(sql, database, use_pandas=False, job_name=None,
                                .format(script_id))
     url = outputs[0]["path"]
     if use_pandas:
+        import pandas as pd
         data = pd.read_csv(url, **kwargs)
     else:
-        r = requests.get(url)
+        r = client._session.get(url)
         r.raise_for_status()
         data = list(csv.reader(StringIO(r.text), **kwargs))
     return data
@@ -637,8 +633,8 @@ def _get_sql_select(table, columns=None):
     return sql
 
 
-def _download_file(url, local_path):
-    response = requests.get(url, stream=True)
+def _download_file(url, local_path, client):
+    response = client._session.get(url, stream=True)
     response.raise_for_status()
 
     chunk_size = 32 * 1024
@@ -652,7 +648,7 @@ def _download_callback(job_id, run_id, client, filename):
 
     def callback(future):
         url = client.scripts.get_sql_runs(job_id, run_id)["output"][0]["path"]
-        return _download_file(url, filename)
+        return _download_file(url, filename, client)
 
     return callback
 
@@ -674,7 +670,7 @@ def _import_bytes(buf, database, table, client, max_errors,
                   hidden=hidden)
 
     import_job = client.imports.post_files(**kwargs)
-    put_response = requests.put(import_job.upload_uri, buf)
+    put_response = client._session.put(import_job.upload_uri, buf)
 
     put_response.raise_for_status()
     run_job_result = client._session.post(import_job.run_uri)
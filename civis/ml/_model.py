@@ -14,19 +14,8 @@ import warnings
 from concurrent import futures
 from functools import wraps
 
-try:
-    import joblib
-    HAS_JOBLIB = True
-except ImportError:
-    HAS_JOBLIB = False
-try:
-    from sklearn.base import BaseEstimator
-    HAS_SKLEARN = True
-except ImportError:
-    HAS_SKLEARN = False
-
 from civis import APIClient, find_one
-from civis._utils import camel_to_snake
+from civis._utils import camel_to_snake, module_available
 from civis.base import CivisAPIError, CivisJobFailure
 from civis.compat import FileNotFoundError
 import civis.io as cio
@@ -36,6 +25,10 @@ from civis.polling import _ResultPollingThread
 __all__ = ['ModelFuture', 'ModelError', 'ModelPipeline']
 log = logging.getLogger(__name__)
 
+# joblib and scikit-learn are imported where they're used
+HAS_JOBLIB = module_available('joblib')
+HAS_SKLEARN = module_available('sklearn')
+
 # sentinel value for default primary key value
 SENTINEL = namedtuple('Sentinel', [])()
 
@@ -161,12 +154,21 @@ def _load_estimator(job_id, run_id, filename='estimator.pkl', client=None):
     try:
         tempdir = tempfile.mkdtemp()
         path = _retrieve_file(filename, job_id, run_id, tempdir, client=client)
+        import joblib
         obj = joblib.load(path)
     finally:
         shutil.rmtree(tempdir)
     return obj
 
 
+def _is_estimator(obj):
+    """Return whether `obj` is a scikit-learn estimator."""
+    if not HAS_SKLEARN:
+        return False
+    from sklearn.base import BaseEstimator
+    return isinstance(obj, BaseEstimator)
+
+
 def _exception_from_logs(exc, job_id, run_id, client, nlog=15):
     """Create an exception if the log has a recognizable error
 
@@ -823,8 +825,8 @@ class ModelPipeline:
         if fit_params:
             train_args['FIT_PARAMS'] = json.dumps(fit_params)
 
-        if (HAS_SKLEARN and HAS_JOBLIB and
-                isinstance(self.model, BaseEstimator)):
+        if HAS_JOBLIB and _is_estimator(self.model):
+            import joblib
             try:
                 tempdir = tempfile.mkdtemp()
                 fout = os.path.join(tempdir, 'estimator.pkl')
@@ -1,7 +1,11 @@
 from ._resources import (generate_classes,
                          get_api_spec,
                          generate_classes_maybe_cached)
+from ._compiled import (compiled_api_spec_is_current,
+                        write_compiled_api_spec)
 
 __all__ = ["generate_classes",
            "get_api_spec",
-           "generate_classes_maybe_cached"]
+           "generate_classes_maybe_cached",
+           "compiled_api_spec_is_current",
+           "write_compiled_api_spec"]
@@ -0,0 +1,213 @@
+"""Compile the Civis API specification into a compact table of methods.
+
+Creating classes from a compiled specification skips resolving the
+references in the specification and parsing its schemas, so a client
+starts in milliseconds.
+"""
+from collections import OrderedDict
+from functools import partial
+import hashlib
+import json
+import zlib
+
+from jsonref import JsonRef
+
+from civis.base import Endpoint
+from civis.resources import _resources
+from civis.resources._resources import (
+    create_method, exclude_resource, is_deprecated, parse_method_elements,
+    ResourceClasses)
+from civis._utils import to_camelcase
+
+# Written at the start of compiled specification files
+COMPILED_SPEC_MAGIC = b'CIVISAPI'
+# Bump when the layout of the compiled table changes
+COMPILED_SPEC_FORMAT = 1
+
+# Tables with doc strings compiled or loaded in this process, by the hash of
+# their specification, to give doc strings to tables without them
+_tables_with_docs = {}
+
+
+def api_spec_hash(raw_spec):
+    """Return a hash identifying a version of the API specification."""
+    canonical = json.dumps(raw_spec, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def compile_api_spec(raw_spec, api_version="1.0"):
+    """Compile an API specification into a table of methods.
+
+    Parameters
+    ----------
+    raw_spec : OrderedDict
+        The Civis API specification, as returned by
+        :func:`civis.resources.get_api_spec`.
+    api_version : string, optional
+        The version of endpoints the specification describes.
+
+    Returns
+    -------
+    dict
+        For each resource, its class name and, for each method, its name,
+        HTTP verb, path template, parameters and doc string. Parameters are
+        ``[name, location, required]`` lists, where the location is
+        ``'path'``, ``'query'``, ``'body'``, or None for ``iterator``.
+        All resources are included; the table can be used with either value
+        of ``resources``.
+    """
+    spec = JsonRef.replace_refs(raw_spec)
+    resources = OrderedDict()
+    for path, ops in spec['paths'].items():
+        path = path.strip('/')
+        class_name = to_camelcase(path.split('/')[0])
+        for verb, op in ops.items():
+            if is_deprecated(op):
+                continue
+            name, args, docs = parse_method_elements(verb, op, path)
+            params = [[arg['name'], arg['in'], arg['required']]
+                      for arg in args]
+            resource = resources.setdefault(class_name.lower(),
+                                            [class_name, []])
+            resource[1].append([name, verb, path, params, docs])
+    return {'format': COMPILED_SPEC_FORMAT,
+            'api_version': api_version,
+            'spec_version': raw_spec.get('info', {}).get('version'),
+            'spec_hash': api_spec_hash(raw_spec),
+            'resources': resources}
+
+
+def write_compiled_api_spec(raw_spec, filename, api_version="1.0"):
+    """Compile an API specification and save it to `filename`.
+
+    The file can be passed to :class:`civis.APIClient` as its
+    ``local_api_spec``.
+    """
+    table = compile_api_spec(raw_spec, api_version)
+    data = json.dumps(table, separators=(',', ':')).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(COMPILED_SPEC_MAGIC)
+        f.write(zlib.compress(data))
+
+
+def is_compiled_api_spec(filename):
+    """Is `filename` a compiled API specification?"""
+    with open(filename, 'rb') as f:
+        return f.read(len(COMPILED_SPEC_MAGIC)) == COMPILED_SPEC_MAGIC
+
+
+def load_compiled_api_spec(filename):
+    """Load a table written by :func:`write_compiled_api_spec`."""
+    with open(filename, 'rb') as f:
+        if f.read(len(COMPILED_SPEC_MAGIC)) != COMPILED_SPEC_MAGIC:
+            raise ValueError("{} is not a compiled API "
+                             "specification".format(filename))
+        table = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+    if table.get('format') != COMPILED_SPEC_FORMAT:
+        raise ValueError("{} was compiled by an incompatible version of "
+                         "civis-python; compile it again".format(filename))
+    return table
+
+
+def is_compiled_api_table(obj):
+    """Is `obj` a table returned by :func:`compile_api_spec`?"""
+    return (isinstance(obj, dict) and 'resources' in obj and
+            obj.get('format') == COMPILED_SPEC_FORMAT)
+
+
+def _remember_docs(table):
+    if not table.get('without_docs'):
+        _tables_with_docs[table['spec_hash']] = table
+    return table
+
+
+def get_compiled_api_spec(cache, api_key, api_version="1.0", transport=None):
+    """Return the compiled table of the API specification which
+    :func:`civis.resources.generate_classes_maybe_cached` would use with
+    the same arguments.
+    """
+    if is_compiled_api_table(cache):
+        return _remember_docs(cache)
+    if cache is None:
+        raw_spec = _resources.get_api_spec(api_key, api_version, transport)
+    elif isinstance(cache, OrderedDict):
+        raw_spec = cache
+    elif is_compiled_api_spec(cache):
+        return _remember_docs(load_compiled_api_spec(cache))
+    else:
+        with open(cache, "r") as f:
+            raw_spec = json.load(f, object_pairs_hook=OrderedDict)
+    return _remember_docs(compile_api_spec(raw_spec, api_version))
+
+
+def strip_compiled_api_spec(table, resources):
+    """Return a copy of a compiled `table` without doc strings, which
+    only has the methods exposed with `resources`.
+
+    Doc strings are most of the size of a table. Methods created from the
+    copy take their doc strings from a table for the same specification
+    returned by :func:`get_compiled_api_spec` in the same process, such as
+    a parent process which was forked. Otherwise they are given a short
+    doc string naming the API endpoint.
+    """
+    stripped = OrderedDict()
+    for name, (class_name, methods) in table['resources'].items():
+        methods = [method[:4] + [None] for method in methods
+                   if not exclude_resource(method[2], table['api_version'],
+                                           resources)]
+        if methods:
+            stripped[name] = [class_name, methods]
+    return dict(table, resources=stripped, without_docs=True)
+
+
+def compiled_api_spec_is_current(filename, raw_spec):
+    """Does the compiled specification in `filename` match `raw_spec`?"""
+    table = load_compiled_api_spec(filename)
+    return table['spec_hash'] == api_spec_hash(raw_spec)
+
+
+def _find_docs(spec_hash, class_name, name):
+    table = _tables_with_docs.get(spec_hash)
+    if table is None:
+        return None
+    resource = table['resources'].get(class_name.lower())
+    for method in resource[1] if resource else ():
+        if method[0] == name:
+            return method[4]
+    return None
+
+
+def _method_from_table(name, verb, path, params, docs, spec_hash=None,
+                       class_name=None):
+    if docs is None:
+        docs = (_find_docs(spec_hash, class_name, name) or
+                "Calls {} /{}".format(verb.upper(), path))
+    args = [{'name': arg_name, 'in': param_in, 'required': required}
+            for arg_name, param_in, required in params]
+    return create_method(args, verb, name, path, docs)
+
+
+def _methods_from_table(methods, spec_hash=None, class_name=None):
+    return {name: partial(_method_from_table, name, verb, path, params, docs,
+                          spec_hash, class_name)
+            for name, verb, path, params, docs in methods}
+
+
+def classes_from_compiled_api_spec(table, api_version, resources,
+                                   endpoint_cls=Endpoint):
+    """Create classes to interface with the Civis API from a compiled
+    specification. See :func:`civis.resources.generate_classes`.
+    """
+    if table['api_version'] != api_version:
+        raise ValueError("The compiled API specification is for API version "
+                         "{}, not {}".format(table['api_version'],
+                                             api_version))
+    resource_methods = OrderedDict()
+    for name, (class_name, methods) in table['resources'].items():
+        methods = [method for method in methods
+                   if not exclude_resource(method[2], api_version, resources)]
+        if methods:
+            resource_methods[name] = (
+                class_name, partial(_methods_from_table, methods,
+                                    table.get('spec_hash'), class_name))
+    return ResourceClasses(resource_methods, endpoint_cls)
@@ -1,7 +1,10 @@
 from collections import OrderedDict
+from functools import partial
 import json
+import os
 import re
 import textwrap
+import threading
 try:
     from inspect import Signature, Parameter
 except ImportError:
@@ -13,8 +16,9 @@ from requests.adapters import HTTPAdapter
 
 import civis
 from civis.base import AggressiveRetry, Endpoint, get_base_url
-from civis.compat import lru_cache
+from civis.compat import lru_cache, Mapping
 from civis._utils import camel_to_snake, to_camelcase
+from civis.resources._spec_cache import get_spec_cache
 
 
 API_VERSIONS = ["1.0"]
@@ -26,7 +30,8 @@ ITERATOR_PARAM_DESC = (
     "iterator : bool, optional\n"
     "    If True, return a generator to iterate over all responses. Use when\n"
     "    more results than the maximum allowed by limit are needed. When\n"
-    "    True, limit and page_num are ignored. Defaults to False.\n")
+    "    True, limit and page_num are ignored. Defaults to False. Call\n"
+    "    ``prefetch`` on the generator to fetch pages concurrently.\n")
 MAX_RETRIES = 10
 
 
@@ -228,18 +233,52 @@ def create_method(params, verb, method_name, path, doc):
     sig = create_signature(sig_args, sig_kwargs)
     is_iterable = iterable_method(verb, query_params)
 
-    def f(self, *args, **kwargs):
+    # Precompute how arguments are routed so that calls with valid
+    # arguments don't need `Signature.bind`.
+    n_args = len(sig_args)
+    expected = set(sig_args) | set(sig_kwargs)
+    if is_iterable:
+        expected.add('iterator')
+    routes = {}
+    for names, location in ((body_params, 'body'), (query_params, 'query'),
+                            (path_params, 'path')):
+        routes.update((x, location) for x in names)
+
+    def bind_arguments(args, kwargs):
+        if len(args) <= n_args and len(args) + len(kwargs) >= n_args:
+            arguments = dict(zip(sig_args, args))
+            if not kwargs:
+                if len(arguments) == n_args:
+                    return arguments
+            elif (set(arguments).isdisjoint(kwargs) and
+                    expected.issuperset(kwargs)):
+                arguments.update(kwargs)
+                if all(x in arguments for x in sig_args[len(args):]):
+                    return arguments
+        # Invalid or unusual arguments: bind them the slow way, which
+        # raises the appropriate TypeError.
         arguments = sig.bind(*args, **kwargs).arguments
         if arguments.get("kwargs"):
             arguments.update(arguments.pop("kwargs"))
         raise_for_unexpected_kwargs(method_name, arguments, sig_args,
                                     sig_kwargs, is_iterable)
-        body = {x: arguments[x] for x in body_params if x in arguments}
-        query = {x: arguments[x] for x in query_params if x in arguments}
-        path_vals = {x: arguments[x] for x in path_params if x in arguments}
+        return arguments
+
+    def f(self, *args, **kwargs):
+        arguments = bind_arguments(args, kwargs)
+        body, query, path_vals = {}, {}, {}
+        for name, value in arguments.items():
+            location = routes.get(name)
+            if location == 'body':
+                body[name] = value
+            elif location == 'query':
+                query[name] = value
+            elif location == 'path':
+                path_vals[name] = value
         url = path.format(**path_vals) if path_vals else path
         iterator = arguments.get('iterator', False)
-        return self._call_api(verb, url, query, body, iterator=iterator)
+        return self._call_api(verb, url, query, body, iterator=iterator,
+                              method_name=method_name)
 
     # Add signature to function, including 'self' for class method
     sig_self = create_signature(["self"] + sig_args, sig_kwargs)
@@ -366,20 +405,26 @@ def parse_method_name(verb, path):
 
 def parse_method(verb, operation, path):
     """ Generate a python function from a specification of that function."""
+    if is_deprecated(operation):
+        return None
+    name, args, docs = parse_method_elements(verb, operation, path)
+    method = create_method(args, verb, name, path, docs)
+    return name, method
+
+
+def parse_method_elements(verb, operation, path):
+    """ Return the name, parameters and doc string of a function from
+    its specification.
+    """
     summary = operation["summary"]
     params = operation["parameters"]
     responses = operation["responses"]
-    deprecated = operation.get('deprecated', False)
-    if 'deprecated' in summary.lower() or deprecated:
-        return None
 
     args, param_doc = parse_params(params, summary, verb)
     response_doc = doc_from_responses(responses)
     docs = join_doc_elements(param_doc, response_doc)
     name = parse_method_name(verb, path)
-
-    method = create_method(args, verb, name, path, docs)
-    return name, method
+    return name, args, docs
 
 
 def parse_path(path, operations, api_version, resources):
@@ -401,12 +446,13 @@ def parse_path(path, operations, api_version, resources):
     return class_name, methods
 
 
-def parse_api_spec(api_spec, api_version, resources):
+def parse_api_spec(api_spec, api_version, resources, endpoint_cls=Endpoint):
     """ Dynamically create classes to interface with the Civis API.
 
     Parse an OpenAPI (Swagger) specification into a dictionary of classes
     where each class represents an endpoint resource and contains
-    methods to make http requests on that resource.
+    methods to make http requests on that resource. Classes and their
+    methods are created the first time they are used.
 
     Parameters
     ----------
@@ -421,23 +467,180 @@ def parse_api_spec(api_spec, api_version, resources):
         client object.  Set to "all" to include all endpoints available for
         a given user, including those that may be in development and subject
         to breaking changes at a later date.
+    endpoint_cls : type, optional
+        The base class of the generated classes. Defaults to
+        :class:`civis.base.Endpoint`.
     """
     paths = api_spec['paths']
-    classes = {}
+    resource_paths = OrderedDict()
     for path, ops in paths.items():
-        class_name, methods = parse_path(path, ops, api_version, resources)
+        path = path.strip('/')
+        if exclude_resource(path, api_version, resources):
+            continue
+        operations = [(verb, op) for verb, op in ops.items()
+                      if not is_deprecated(op)]
+        if not operations:
+            continue
+        class_name = to_camelcase(path.split('/')[0])
         class_name_lower = class_name.lower()
-        if methods and classes.get(class_name_lower) is None:
-            classes[class_name_lower] = type(str(class_name), (Endpoint,), {})
-        for method_name, method in methods:
-            setattr(classes[class_name_lower], method_name, method)
-    return classes
+        if class_name_lower not in resource_paths:
+            resource_paths[class_name_lower] = (class_name, [])
+        resource_paths[class_name_lower][1].append((path, operations))
+    resource_methods = OrderedDict(
+        (name, (class_name, partial(_methods_from_paths, paths)))
+        for name, (class_name, paths) in resource_paths.items())
+    return ResourceClasses(resource_methods, endpoint_cls)
+
+
+def _method_from_spec(verb, operation, path):
+    return parse_method(verb, operation, path)[1]
+
+
+def _methods_from_paths(paths):
+    methods = {}
+    for path, ops in paths:
+        for verb, op in ops:
+            name = parse_method_name(verb, path)
+            methods[name] = partial(_method_from_spec, verb, op, path)
+    return methods
+
+
+def is_deprecated(operation):
+    return (operation.get('deprecated', False) or
+            'deprecated' in operation["summary"].lower())
+
+
+class ResourceType(type):
+    """Metaclass of the generated resource classes.
+
+    Each method is created, including its docstring, the first time it is
+    looked up.
+    """
+    def __getattr__(cls, name):
+        try:
+            make_method = cls._operations[name]
+        except KeyError:
+            raise AttributeError("type object '{}' has no attribute "
+                                 "'{}'".format(cls.__name__, name))
+        method = make_method()
+        setattr(cls, name, method)
+        return method
+
+    def __dir__(cls):
+        names = set(cls._operations)
+        for base in cls.__mro__:
+            names.update(vars(base))
+        return sorted(names)
+
+
+def _resource_getattr(self, name):
+    if name not in type(self)._operations:
+        raise AttributeError("'{}' object has no attribute "
+                             "'{}'".format(type(self).__name__, name))
+    return getattr(type(self), name).__get__(self, type(self))
+
+
+def _resource_dir(self):
+    return sorted(set(dir(type(self))) | set(vars(self)))
+
+
+def get_many(self, ids, max_workers=None, as_dict=False):
+    """Get many objects by ID concurrently.
+
+    Each distinct ID is fetched once with ``get``.
+
+    Parameters
+    ----------
+    ids : iterable
+        The IDs of the objects to get.
+    max_workers : int, optional
+        The maximum number of calls in flight at once. Defaults to the
+        client's `pool_maxsize`.
+    as_dict : bool, optional
+        If True, return an OrderedDict mapping each distinct ID to its
+        result, in the order the IDs were first given.
+
+    Returns
+    -------
+    results : list or OrderedDict
+        The object for each of `ids`, in the same order. If getting an
+        object failed, for example with a :class:`civis.base.CivisAPIError`
+        for an object which doesn't exist, the exception is returned in
+        place of the object.
+    """
+    return self._get_many(ids, max_workers=max_workers, as_dict=as_dict)
+
+
+def _get_many_method():
+    return get_many
+
+
+def make_resource_class(class_name, methods, endpoint_cls=Endpoint):
+    """Create the class for one API resource.
+
+    `methods` maps the name of each method to a function which creates it.
+    Methods are added to the class on first use. Resources with a ``get``
+    method also get :func:`get_many`.
+    """
+    if 'get' in methods and 'get_many' not in methods:
+        methods = dict(methods, get_many=_get_many_method)
+    namespace = {'_operations': methods,
+                 '__getattr__': _resource_getattr,
+                 '__dir__': _resource_dir}
+    return ResourceType(str(class_name), (endpoint_cls,), namespace)
+
+
+class ResourceClasses(Mapping):
+    """A mapping from resource names to generated classes.
+
+    Each class is created the first time it is looked up, so that
+    resources which are never used cost nothing.
+
+    Parameters
+    ----------
+    resource_methods : OrderedDict
+        Maps each resource name to its class name and a function which
+        returns the methods to pass to :func:`make_resource_class`.
+    endpoint_cls : type, optional
+        The base class of the generated classes.
+    """
+    def __init__(self, resource_methods, endpoint_cls=Endpoint):
+        self._resource_methods = resource_methods
+        self._endpoint_cls = endpoint_cls
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        try:
+            return self._classes[name]
+        except KeyError:
+            pass
+        class_name, get_methods = self._resource_methods[name]
+        with self._lock:
+            if name not in self._classes:
+                self._classes[name] = make_resource_class(
+                    class_name, get_methods(), self._endpoint_cls)
+            return self._classes[name]
+
+    def __contains__(self, name):
+        return name in self._resource_methods
+
+    def __iter__(self):
+        return iter(self._resource_methods)
+
+    def __len__(self):
+        return len(self._resource_methods)
 
 
 @lru_cache(maxsize=4)
-def get_api_spec(api_key, api_version="1.0"):
+def get_api_spec(api_key, api_version="1.0", transport=None):
     """Download the Civis API specification.
 
+    The specification is also cached on disk, so that other processes
+    using the same API key don't download it again. See
+    :envvar:`CIVIS_API_SPEC_CACHE_DIR` and
+    :envvar:`CIVIS_API_SPEC_CACHE_TTL`.
+
     Parameters
     ----------
     api_key : str
@@ -445,6 +648,29 @@ def get_api_spec(api_key, api_version="1.0"):
     api_version : string, optional
         The version of endpoints to call. May instantiate multiple client
         objects with different versions.  Currently only "1.0" is supported.
+    transport : :class:`requests.adapters.BaseAdapter`, optional
+        The transport adapter which sends the request. Defaults to
+        :mod:`requests`, with retries.
+    """
+    if api_version != "1.0":
+        msg = "API specification for api version {} cannot be found"
+        raise ValueError(msg.format(api_version))
+
+    def download(etag):
+        return _download_api_spec(api_key, api_version, etag, transport)
+
+    spec_cache = get_spec_cache(api_key, api_version, get_base_url())
+    if spec_cache is None:
+        spec, _ = download(None)
+        return spec
+    return spec_cache.get(download)
+
+
+def _download_api_spec(api_key, api_version, etag=None, transport=None):
+    """Download the API specification, unless it matches `etag`.
+
+    Returns the specification and its ETag, or ``(None, None)`` if the
+    API reports that the specification with `etag` is current.
     """
     civis_version = civis.__version__
     session = requests.Session()
@@ -452,25 +678,28 @@ def get_api_spec(api_key, api_version="1.0"):
     session_agent = session.headers.get('User-Agent', '')
     user_agent = "civis-python/{} {}".format(civis_version, session_agent)
     session.headers.update({"User-Agent": user_agent.strip()})
-    max_retries = AggressiveRetry(MAX_RETRIES, backoff_factor=.75,
-                                  status_forcelist=civis.civis.RETRY_CODES)
-    adapter = HTTPAdapter(max_retries=max_retries)
-    session.mount("https://", adapter)
-    if api_version == "1.0":
-        response = session.get("{}endpoints".format(get_base_url()))
-    else:
-        msg = "API specification for api version {} cannot be found"
-        raise ValueError(msg.format(api_version))
+    if transport is None:
+        max_retries = AggressiveRetry(MAX_RETRIES, backoff_factor=.75,
+                                      status_forcelist=civis.civis.RETRY_CODES)
+        transport = HTTPAdapter(max_retries=max_retries)
+    session.mount("https://", transport)
+    session.mount("http://", transport)
+    headers = {'If-None-Match': etag} if etag else {}
+    response = session.get("{}endpoints".format(get_base_url()),
+                           headers=headers)
     if response.status_code in (401, 403):
         msg = "{} error downloading API specification. API key may be expired."
         raise requests.exceptions.HTTPError(msg.format(response.status_code))
+    if etag and response.status_code == 304:
+        return None, None
     response.raise_for_status()
     spec = response.json(object_pairs_hook=OrderedDict)
-    return spec
+    return spec, response.headers.get('ETag')
 
 
 @lru_cache(maxsize=4)
-def generate_classes(api_key, api_version="1.0", resources="base"):
+def generate_classes(api_key, api_version="1.0", resources="base",
+                     endpoint_cls=Endpoint, transport=None):
     """ Dynamically create classes to interface with the Civis API.
 
     The Civis API documents behavior using an OpenAPI/Swagger specification.
@@ -492,20 +721,41 @@ def generate_classes(api_key, api_version="1.0", resources="base"):
         client object.  Set to "all" to include all endpoints available for
         a given user, including those that may be in development and subject
         to breaking changes at a later date.
+    endpoint_cls : type, optional
+        The base class of the generated classes. Defaults to
+        :class:`civis.base.Endpoint`.
+    transport : :class:`requests.adapters.BaseAdapter`, optional
+        The transport adapter which downloads the API specification.
     """
     assert api_version in API_VERSIONS, (
         "APIClient api_version must be one of {}".format(API_VERSIONS))
     assert resources in ["base", "all"], (
         "resources must be one of {}".format(["base", "all"]))
-    raw_spec = get_api_spec(api_key, api_version)
+    raw_spec = get_api_spec(api_key, api_version, transport)
     spec = JsonRef.replace_refs(raw_spec)
-    return parse_api_spec(spec, api_version, resources)
+    return parse_api_spec(spec, api_version, resources, endpoint_cls)
 
 
-def generate_classes_maybe_cached(cache, api_key, api_version, resources):
-    """Generate class objects either from /endpoints or a local cache."""
-    if cache is None:
-        classes = generate_classes(api_key, api_version, resources)
+def generate_classes_maybe_cached(cache, api_key, api_version, resources,
+                                  endpoint_cls=Endpoint, transport=None):
+    """Generate class objects either from /endpoints or a local cache.
+
+    The local cache may also be a specification compiled with
+    :func:`civis.resources.write_compiled_api_spec`, or the table returned
+    by ``compile_api_spec``.
+    """
+    from civis.resources import _compiled
+    if _compiled.is_compiled_api_table(cache):
+        classes = _compiled.classes_from_compiled_api_spec(
+            cache, api_version, resources, endpoint_cls)
+    elif cache is None:
+        classes = generate_classes(api_key, api_version, resources,
+                                   endpoint_cls, transport)
+    elif (isinstance(cache, str) and os.path.isfile(cache) and
+            _compiled.is_compiled_api_spec(cache)):
+        table = _compiled.load_compiled_api_spec(cache)
+        classes = _compiled.classes_from_compiled_api_spec(
+            table, api_version, resources, endpoint_cls)
     else:
         if isinstance(cache, OrderedDict):
             raw_spec = cache
@@ -516,5 +766,5 @@ def generate_classes_maybe_cached(cache, api_key, api_version, resources):
             msg = "cache must be an OrderedDict or str, given {}"
             raise ValueError(msg.format(type(cache)))
         spec = JsonRef.replace_refs(raw_spec)
-        classes = parse_api_spec(spec, api_version, resources)
+        classes = parse_api_spec(spec, api_version, resources, endpoint_cls)
     return classes
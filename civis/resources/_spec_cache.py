@@ -0,0 +1,178 @@
+"""Keep the Civis API specification on disk between processes."""
+from collections import OrderedDict
+from contextlib import contextmanager
+import errno
+import json
+import logging
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import requests
+
+from civis._utils import _hash_key
+from civis.compat import replace_file
+
+log = logging.getLogger(__name__)
+
+# Bump when the format of cache files changes, so that files written by
+# other versions of this package are ignored.
+SPEC_CACHE_FORMAT = 1
+DEFAULT_SPEC_CACHE_TTL = 24 * 60 * 60
+
+
+def _default_cache_dir():
+    cache_home = (os.environ.get('XDG_CACHE_HOME') or
+                  os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'civis')
+
+
+def get_spec_cache(api_key, api_version, base_url):
+    """Return the :class:`SpecCache` for an API key, or None if the on-disk
+    cache is disabled.
+
+    The cache directory and time-to-live are set by the
+    :envvar:`CIVIS_API_SPEC_CACHE_DIR` and
+    :envvar:`CIVIS_API_SPEC_CACHE_TTL` environment variables. A
+    time-to-live of 0 disables the cache.
+    """
+    try:
+        ttl = float(os.environ.get('CIVIS_API_SPEC_CACHE_TTL',
+                                   DEFAULT_SPEC_CACHE_TTL))
+    except ValueError:
+        ttl = DEFAULT_SPEC_CACHE_TTL
+    if ttl <= 0:
+        return None
+    cache_dir = (os.environ.get('CIVIS_API_SPEC_CACHE_DIR') or
+                 _default_cache_dir())
+    # The specification depends on the user's feature flags, so each key
+    # has its own file. Only a hash of the key is written to disk.
+    digest = _hash_key(base_url, api_version, api_key)
+    path = os.path.join(cache_dir, 'api_spec_{}.json'.format(digest[:32]))
+    return SpecCache(path, ttl)
+
+
+class SpecCache(object):
+    """An API specification stored in a file.
+
+    The file is replaced atomically, so readers never see a partial file.
+    When it expires, one process at a time refreshes it while others wait
+    for the result, and a specification with an ``ETag`` is revalidated
+    rather than downloaded again.
+
+    Parameters
+    ----------
+    path : str
+        The cache file.
+    ttl : float
+        Seconds after writing or revalidating the file during which it is
+        used without asking the API.
+    """
+    def __init__(self, path, ttl=DEFAULT_SPEC_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _read(self):
+        """Return the cached specification, its ETag, and whether it is
+        fresh. The specification is None if the file is missing or
+        unreadable.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                cached = json.load(f, object_pairs_hook=OrderedDict)
+        except (IOError, OSError, ValueError):
+            return None, None, False
+        if cached.get('format') != SPEC_CACHE_FORMAT or 'spec' not in cached:
+            return None, None, False
+        fresh = time.time() - mtime < self.ttl
+        return cached['spec'], cached.get('etag'), fresh
+
+    def _makedirs(self):
+        try:
+            os.makedirs(os.path.dirname(self.path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _write(self, spec, etag):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path),
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'format': SPEC_CACHE_FORMAT, 'etag': etag,
+                           'spec': spec}, f)
+            os.chmod(tmp_path, 0o600)
+            replace_file(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _refresh_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def get(self, download):
+        """Return the cached specification, refreshing it if it has expired.
+
+        Parameters
+        ----------
+        download : callable
+            Called with the ETag of the cached specification, or None, to
+            get the specification from the API. Returns the specification
+            and its ETag, or ``(None, None)`` if the cached specification
+            is still current.
+        """
+        spec, etag, fresh = self._read()
+        if fresh:
+            return spec
+        try:
+            self._makedirs()
+            with self._refresh_lock():
+                # Another process may have refreshed the file while we
+                # waited for the lock.
+                spec, etag, fresh = self._read()
+                if fresh:
+                    return spec
+                return self._refresh(spec, etag, download)
+        except requests.RequestException:
+            raise
+        except (IOError, OSError) as e:
+            log.debug("Unable to use the API specification cache at %s: %s",
+                      self.path, e)
+            new_spec, _ = download(None)
+            return new_spec
+
+    def _refresh(self, spec, etag, download):
+        try:
+            new_spec, new_etag = download(etag if spec is not None else None)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if spec is None:
+                raise
+            log.warning("Unable to refresh the API specification (%s). "
+                        "Using the cached copy in %s.", e, self.path)
+            return spec
+        if new_spec is None:
+            new_spec, new_etag = spec, etag
+        try:
+            if new_spec is spec:
+                os.utime(self.path, None)
+            else:
+                self._write(new_spec, new_etag)
+        except (IOError, OSError) as e:
+            log.debug("Unable to write the API specification cache at %s: "
+                      "%s", self.path, e)
+        return new_spec
@@ -1,7 +1,13 @@
 from __future__ import absolute_import
+from collections import deque, OrderedDict
+from concurrent import futures
+from itertools import islice
+import json
+
 import requests
 
 from civis._utils import camel_to_snake
+from civis.compat import lru_cache
 
 
 class CivisClientError(Exception):
@@ -13,6 +19,53 @@ class CivisClientError(Exception):
         return self.error_message
 
 
+# The function decoding API responses, chosen on first use unless set with
+# `set_json_decoder`
+_json_decoder = None
+
+
+def set_json_decoder(loads=None):
+    """Choose the function which decodes JSON responses from the API.
+
+    By default, responses are decoded with ``orjson`` if it is installed,
+    which is several times faster for large responses, and with the
+    standard library otherwise.
+
+    Parameters
+    ----------
+    loads : callable, optional
+        Takes the bytes of a JSON document and returns the decoded object,
+        raising :class:`ValueError` for invalid JSON. If None, restore the
+        default.
+    """
+    global _json_decoder
+    _json_decoder = loads
+
+
+def _get_json_decoder():
+    global _json_decoder
+    if _json_decoder is None:
+        try:
+            import orjson
+            _json_decoder = orjson.loads
+        except ImportError:
+            _json_decoder = json.loads
+    return _json_decoder
+
+
+def _json_loads(content):
+    """Decode the bytes of a JSON document."""
+    loads = _get_json_decoder()
+    if loads is not json.loads:
+        try:
+            return loads(content)
+        except ValueError:
+            # Fall back for documents the fast decoder rejects, such as
+            # integers too large for 64 bits.
+            pass
+    return json.loads(content.decode('utf-8'))
+
+
 def _response_to_json(response):
     """Parse a raw response to a dict.
 
@@ -36,12 +89,17 @@ def _response_to_json(response):
         return None
     else:
         try:
-            return response.json()
+            if _get_json_decoder() is json.loads:
+                return response.json()
+            return _json_loads(response.content)
         except ValueError:
             raise CivisClientError("Unable to parse JSON from response",
                                    response)
 
 
+RETURN_TYPES = ('snake', 'raw', 'pandas', 'columnar')
+
+
 def convert_response_data_type(response, headers=None, return_type='snake'):
     """Convert a raw response into a given type.
 
@@ -53,7 +111,7 @@ def convert_response_data_type(response, headers=None, return_type='snake'):
         If given and the return type supports it, attach these headers to the
         converted response. If `response` is a `requests.Response`, the headers
         will be inferred from it.
-    return_type : string, {'snake', 'raw', 'pandas'}
+    return_type : string, {'snake', 'raw', 'pandas', 'columnar'}
         Convert the response to this type. See documentation on
         `civis.APIClient` for details of the return types.
 
@@ -63,7 +121,7 @@ def convert_response_data_type(response, headers=None, return_type='snake'):
     `pandas.DataFrame`, or `pandas.Series`
         Depending on the value of `return_type`.
     """
-    assert return_type in ['snake', 'raw', 'pandas'], 'Invalid return type'
+    assert return_type in RETURN_TYPES, 'Invalid return type'
 
     if return_type == 'raw':
         return response
@@ -74,7 +132,12 @@ def convert_response_data_type(response, headers=None, return_type='snake'):
     else:
         data = response
 
-    if return_type == 'pandas':
+    if return_type == 'columnar':
+        if isinstance(data, list):
+            return columns_from_records(data)
+        return Response(data, headers=headers)
+
+    elif return_type == 'pandas':
         import pandas as pd
         if isinstance(data, list):
             return pd.DataFrame.from_records(data)
@@ -89,6 +152,124 @@ def convert_response_data_type(response, headers=None, return_type='snake'):
         return Response(data, headers=headers)
 
 
+def _total_pages(headers, first_page_size):
+    """Return the number of pages of a paginated endpoint, as reported by
+    the headers of its first page, or None if they don't say.
+    """
+    try:
+        if 'X-Pagination-Total-Pages' in headers:
+            return int(headers['X-Pagination-Total-Pages'])
+        if 'X-Pagination-Total-Entries' in headers:
+            total = int(headers['X-Pagination-Total-Entries'])
+            per_page = int(headers.get('X-Pagination-Per-Page',
+                                       first_page_size))
+            return -(-total // per_page)
+    except (TypeError, ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+# Memoized, since the same keys appear in every object of a list response
+_snake_key = lru_cache(maxsize=4096)(camel_to_snake)
+
+
+def _column_array(values, np):
+    kinds = set(map(type, values))
+    if kinds and (kinds <= {int, float} or kinds == {bool}):
+        try:
+            return np.array(values)
+        except OverflowError:
+            pass  # integers too large for int64
+    # Everything else, including strings, keeps its Python objects
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def columns_from_records(records):
+    """Build columns from a list of JSON objects.
+
+    Parameters
+    ----------
+    records : list of dict
+        Decoded JSON objects, such as the items of a list response.
+
+    Returns
+    -------
+    collections.OrderedDict
+        Maps the snake_case name of each key found in `records`, in order of
+        first appearance, to a column of values with None where an object
+        lacks the key. Columns are :class:`numpy:numpy.ndarray` objects if
+        NumPy is installed and lists otherwise. Numeric and boolean columns
+        have a native dtype, and other columns (including nested objects,
+        which are left as dicts) have the ``object`` dtype.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    keys = OrderedDict()
+    for record in records:
+        for key in record:
+            if key not in keys:
+                keys[key] = None
+    columns = OrderedDict()
+    for key in keys:
+        values = [record.get(key) for record in records]
+        if np is not None:
+            values = _column_array(values, np)
+        columns[_snake_key(key)] = values
+    return columns
+
+
+def _snake_case_lists(value):
+    """Return `value` with the keys of objects in lists snake-cased, as
+    :class:`Response` stores them, or `value` itself if nothing changes.
+    """
+    if isinstance(value, list):
+        if not any(isinstance(o, dict) for o in value):
+            return value
+        return [_snake_case_item(o) if isinstance(o, dict) else o
+                for o in value]
+    if isinstance(value, dict) and not isinstance(value, Response):
+        changed = None
+        for key, v in value.items():
+            new_v = _snake_case_lists(v)
+            if new_v is not v:
+                if changed is None:
+                    changed = dict(value)
+                changed[key] = new_v
+        return value if changed is None else changed
+    return value
+
+
+def _snake_case_item(obj):
+    if isinstance(obj, Response):
+        return obj
+    return dict(zip(map(_snake_key, obj), map(_snake_case_lists,
+                                              obj.values())))
+
+
+def _needs_conversion(value):
+    # Is this a dict or list value which hasn't been converted yet?
+    if isinstance(value, dict):
+        return not isinstance(value, Response)
+    if isinstance(value, list) and value:
+        if isinstance(value[0], Response):
+            return False
+        return any(isinstance(o, dict) for o in value)
+    return False
+
+
+def _convert(value):
+    # Stored values already have their final keys, so converting them to
+    # `Response` objects doesn't change their contents.
+    if isinstance(value, dict):
+        return Response._from_stored(value)
+    return [Response._from_stored(o) if isinstance(o, dict) else o
+            for o in value]
+
+
 class Response(dict):
     """Custom Civis response object.
 
@@ -110,30 +291,94 @@ class Response(dict):
     The main features of this class are that it maps camelCase to snake_case
     at the top level of the json object and attaches keys as attributes.
     Nested object keys are not changed.
+
+    Nested objects are converted to :class:`Response` objects the first time
+    they are accessed, and each value is stored only once. The keys of
+    objects in lists are snake-cased when the list is stored, so the
+    contents of a response don't depend on which values have been read.
     """
+    # Keys which would be hidden by these attributes are also set as
+    # instance attributes, so that they take precedence.
+    _RESERVED = frozenset(dir(dict)) | {'json_data', 'headers',
+                                        'calls_remaining', 'rate_limit'}
+
     def __init__(self, json_data, snake_case=True, headers=None):
         self.json_data = json_data
         if headers is not None:
-            # this circumvents recursive calls
             self.headers = headers
-            self.calls_remaining = headers.get('X-RateLimit-Remaining')
-            self.rate_limit = headers.get('X-RateLimit-Limit')
 
         if json_data is not None:
-            for key, v in json_data.items():
-                if snake_case:
-                    key = camel_to_snake(key)
+            values = map(_snake_case_lists, json_data.values())
+            if snake_case:
+                dict.update(self, zip(map(_snake_key, json_data), values))
+            else:
+                dict.update(self, zip(json_data, values))
+            self._set_reserved()
+
+    @classmethod
+    def _from_stored(cls, data):
+        # Wrap a value already stored by a `Response`, whose keys and
+        # lists are in their final form.
+        response = cls(None)
+        response.json_data = data
+        dict.update(response, data)
+        response._set_reserved()
+        return response
+
+    def _set_reserved(self):
+        if not self._RESERVED.isdisjoint(self):
+            for key in self._RESERVED.intersection(self):
+                self.__dict__[key] = self[key]
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if _needs_conversion(value):
+            value = _convert(value)
+            dict.__setitem__(self, key, value)
+        return value
 
-                if isinstance(v, dict):
-                    val = Response(v, False)
-                elif isinstance(v, list):
-                    val = [Response(o) if isinstance(o, dict) else o
-                           for o in v]
-                else:
-                    val = v
+    def __getattr__(self, name):
+        # Only called for names which aren't instance or class attributes
+        try:
+            return self[name]
+        except KeyError:
+            pass
+        headers = self.__dict__.get('headers')
+        if headers is not None:
+            if name == 'calls_remaining':
+                return headers.get('X-RateLimit-Remaining')
+            elif name == 'rate_limit':
+                return headers.get('X-RateLimit-Limit')
+        raise AttributeError("'{}' object has no attribute "
+                             "'{}'".format(type(self).__name__, name))
+
+    def _convert_all(self):
+        for key, value in dict.items(self):
+            if _needs_conversion(value):
+                dict.__setitem__(self, key, _convert(value))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
-                self.update({key: val})
-                self.__dict__.update({key: val})
+    def values(self):
+        self._convert_all()
+        return dict.values(self)
+
+    def items(self):
+        self._convert_all()
+        return dict.items(self)
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def copy(self):
+        self._convert_all()
+        return dict.copy(self)
 
 
 class PaginatedResponse:
@@ -149,11 +394,28 @@ class PaginatedResponse:
         be ignored. The given dict is not modified.
     endpoint : `civis.base.Endpoint`
         An endpoint used to make API requests.
+    page_size : int, optional
+        The number of items per page. Defaults to the API's default.
+    max_workers : int, optional
+        If greater than 1, fetch up to this many pages at once. See
+        :meth:`prefetch`.
+    cursor : dict, optional
+        Start after the position saved in this :attr:`cursor`, whose
+        request parameters replace `initial_params` and `page_size`. See
+        :meth:`resume`.
+    method_name : str, optional
+        The name of the generated method which made this response, used
+        in the endpoint's request metrics.
 
     Notes
     -----
     This response is returned automatically by endpoints which support
-    pagination when the `iterator` kwarg is specified.
+    pagination when the `iterator` kwarg is specified. Call
+    :meth:`prefetch` on it to fetch pages concurrently.
+
+    If an error is raised while fetching a page, iterating again continues
+    with the next item rather than from the start. Use :attr:`cursor` and
+    :meth:`resume` to continue in a later process.
 
     Examples
     --------
@@ -161,32 +423,209 @@ class PaginatedResponse:
     >>> queries = client.queries.list(iterator=True)
     >>> for query in queries:
     ...    print(query['id'])
+
+    >>> columns = client.queries.list(iterator=True).to_columns()
+    >>> columns['id']
+    array([1, 2, 3])
     """
-    def __init__(self, path, initial_params, endpoint):
+    def __init__(self, path, initial_params, endpoint, page_size=None,
+                 max_workers=1, cursor=None, method_name=None):
         self._path = path
-        self._params = initial_params.copy()
+        self._initial_params = initial_params
         self._endpoint = endpoint
-
-        # We are paginating through all items, so start at the beginning and
-        # let the API determine the limit.
-        self._params['page_num'] = 1
-        self._params.pop('limit', None)
-
-    def __iter__(self):
+        self._max_workers = max_workers
+        # Passed to the endpoint to name the calls in its metrics
+        self._request_kwargs = {}
+        if method_name is not None:
+            self._request_kwargs['method_name'] = method_name
+
+        if cursor is None:
+            # We are paginating through all items, so start at the beginning
+            # and let the API determine the limit unless a page size was
+            # chosen.
+            self._params = initial_params.copy()
+            self._params.pop('page_num', None)
+            self._params.pop('limit', None)
+            if page_size is not None:
+                self._params['limit'] = page_size
+            self._page_num = 1
+            self._offset = 0
+        else:
+            self._params = dict(cursor['params'])
+            self._page_num = cursor['page_num']
+            self._offset = cursor['offset']
+
+    @property
+    def cursor(self):
+        """The position of the iteration, as a JSON-serializable dict.
+
+        Save the cursor while iterating and pass it to :meth:`resume` to
+        continue from the next item in a later iteration or process. The
+        cursor holds the request parameters, the page number and the number
+        of items already yielded from that page.
+        """
+        return {'path': self._path,
+                'params': dict(self._params),
+                'page_num': self._page_num,
+                'offset': self._offset}
+
+    def resume(self, cursor):
+        """Continue iterating from a saved :attr:`cursor`.
+
+        Parameters
+        ----------
+        cursor : dict
+            The :attr:`cursor` of an iterator over the same endpoint. Its
+            request parameters, including the page size, are used in place
+            of this iterator's.
+
+        Returns
+        -------
+        :class:`PaginatedResponse`
+            An iterator over the items after the cursor. Pages are fetched
+            concurrently if this iterator was created by :meth:`prefetch`.
+
+        Examples
+        --------
+        >>> runs = client.scripts.list_python3_runs(job_id, iterator=True)
+        >>> if os.path.exists('cursor.json'):
+        ...     with open('cursor.json') as f:
+        ...         runs = runs.resume(json.load(f))
+        >>> for run in runs:
+        ...     process(run)
+        ...     with open('cursor.json', 'w') as f:
+        ...         json.dump(runs.cursor, f)
+        """
+        if cursor.get('path') != self._path:
+            raise ValueError("The cursor is for {}, not "
+                             "{}".format(cursor.get('path'), self._path))
+        return PaginatedResponse(self._path, self._initial_params,
+                                 self._endpoint, max_workers=self._max_workers,
+                                 cursor=cursor, **self._request_kwargs)
+
+    def prefetch(self, max_workers=4, page_size=None):
+        """Fetch pages concurrently while iterating.
+
+        After the first page, which tells how many pages there are, up to
+        `max_workers` of the following pages are requested at once. Items
+        are still yielded in order. If the API doesn't report the number
+        of pages, pages are fetched one after another.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The maximum number of pages requested at once, which is also
+            the number of pages fetched ahead of the one being iterated.
+        page_size : int, optional
+            The number of items per page. Defaults to the API's default.
+
+        Returns
+        -------
+        :class:`PaginatedResponse`
+            A new iterator over the same items.
+
+        Examples
+        --------
+        >>> for f in client.files.list(iterator=True).prefetch(8, 100):
+        ...    print(f['id'])
+        """
+        return PaginatedResponse(self._path, self._initial_params,
+                                 self._endpoint, page_size=page_size,
+                                 max_workers=max_workers,
+                                 **self._request_kwargs)
+
+    def _get_page(self, page_num):
+        params = dict(self._params, page_num=page_num)
+        response = self._endpoint._make_request('GET', self._path, params,
+                                                **self._request_kwargs)
+        return _response_to_json(response), response.headers
+
+    def _pages(self):
+        """Yield the number, items and headers of each page from the
+        cursor on.
+        """
+        if self._max_workers > 1:
+            return self._pages_concurrently(self._page_num)
+        return self._pages_serially(self._page_num)
+
+    def _pages_serially(self, page_num):
         while True:
-            response = self._endpoint._make_request('GET',
-                                                    self._path,
-                                                    self._params)
-            page_data = _response_to_json(response)
-            if len(page_data) == 0:
+            page_data, headers = self._get_page(page_num)
+            if not page_data:
                 return
 
-            for data in page_data:
-                converted_data = convert_response_data_type(
-                    data,
-                    headers=response.headers,
-                    return_type=self._endpoint._return_type
-                )
-                yield converted_data
+            yield page_num, page_data, headers
+
+            page_num += 1
+
+    def _pages_concurrently(self, first_page_num):
+        page_data, headers = self._get_page(first_page_num)
+        if not page_data:
+            return
+        yield first_page_num, page_data, headers
+
+        n_pages = _total_pages(headers, len(page_data))
+        if n_pages is None:
+            # Without pagination headers, the end is an empty page.
+            for page in self._pages_serially(first_page_num + 1):
+                yield page
+            return
 
-            self._params['page_num'] += 1
+        page_nums = iter(range(first_page_num + 1, n_pages + 1))
+        pool = futures.ThreadPoolExecutor(max_workers=self._max_workers)
+        pending = deque()
+        try:
+            for page_num in islice(page_nums, self._max_workers):
+                pending.append((page_num,
+                                pool.submit(self._get_page, page_num)))
+            while pending:
+                page_num, future = pending.popleft()
+                page_data, headers = future.result()
+                for next_num in islice(page_nums, 1):
+                    pending.append((next_num,
+                                    pool.submit(self._get_page, next_num)))
+                if page_data:
+                    yield page_num, page_data, headers
+        finally:
+            # The caller may stop iterating early.
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _items(self):
+        """Yield each remaining item and its headers, advancing the cursor
+        past each item as it is yielded.
+        """
+        for page_num, page_data, headers in self._pages():
+            if page_num != self._page_num:
+                self._page_num, self._offset = page_num, 0
+            while self._offset < len(page_data):
+                self._offset += 1
+                yield page_data[self._offset - 1], headers
+            self._page_num, self._offset = page_num + 1, 0
+
+    def __iter__(self):
+        # Iterating again, for example after an error while fetching a page,
+        # continues from the cursor.
+        for data, headers in self._items():
+            converted_data = convert_response_data_type(
+                data,
+                headers=headers,
+                return_type=self._endpoint._return_type
+            )
+            yield converted_data
+
+    def to_columns(self):
+        """Fetch all remaining pages and return their items as columns.
+
+        The decoded JSON of every page is gathered into columns directly,
+        without creating an object for each item, whatever the return type
+        of the client.
+
+        Returns
+        -------
+        collections.OrderedDict
+            Columns as described in :func:`columns_from_records`.
+        """
+        records = [data for data, _ in self._items()]
+        return columns_from_records(records)
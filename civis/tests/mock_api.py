@@ -0,0 +1,678 @@
+"""A local stand-in for the Civis API and for S3.
+
+:class:`MockCivisAPI` serves the Civis API on one localhost port and a
+storage service standing in for S3 on another, each from background
+threads. Clients talk to it over real HTTP, so tests and benchmarks
+exercise the whole HTTP stack of :class:`civis.APIClient` without the
+network:
+
+- ``/endpoints`` serves an API specification, with an ``ETag``.
+- Scripts, imports, jobs and queries can be created and run. Runs are
+  ``running`` for ``job_duration`` seconds and then finish in
+  ``final_state``. Successful SQL scripts get a CSV output file.
+- Files, and the imports used by :func:`civis.io.csv_to_civis`, are
+  uploaded to and downloaded from the storage service with URLs which
+  stand in for presigned S3 URLs. The storage service rejects requests
+  which carry an API key.
+- Every API call waits ``latency`` seconds, and the rate limit headers
+  count down from ``rate_limit`` as the API's do.
+
+Examples
+--------
+>>> with MockCivisAPI(latency=0.01, job_duration=0.1) as api:
+...     client = api.client()
+...     with open('data.csv', 'rb') as f:
+...         file_id = civis.io.file_to_civis(f, 'data', client=client)
+"""
+from __future__ import absolute_import, division
+from collections import Counter, OrderedDict
+import email
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs, urlparse
+
+import civis
+from civis._ratelimit import RATE_LIMIT_PERIOD
+from civis._utils import _clock
+from civis.compat import mock
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                         'civis_api_spec.json')
+
+# The key which names the parent job in the runs of each kind of job
+_RUN_PARENT_KEYS = {'scripts/sql': 'sqlId',
+                    'scripts/containers': 'containerId',
+                    'scripts/custom': 'customId',
+                    'scripts/python3': 'pythonId',
+                    'scripts/r': 'rId',
+                    'scripts/javascript': 'javascriptId',
+                    'imports': 'importId',
+                    'imports/files': 'importId',
+                    'jobs': 'jobId'}
+_JOB_ROUTE = re.compile(r'^/(?P<kind>{})(?:/(?P<id>\d+)(?:/(?P<rest>.+))?)?$'
+                        .format('|'.join(sorted(_RUN_PARENT_KEYS,
+                                                key=len, reverse=True))))
+_RUN_ROUTE = re.compile(r'^runs(?:/(?P<run_id>\d+)(?:/(?P<rest>.+))?)?$')
+_GZIP_MIN_SIZE = 1024
+_DEFAULT_PAGE_SIZE = 50
+
+
+def _camel_case(data):
+    """Convert the snake_case keys which the client sends into the
+    camelCase keys the API stores and returns.
+    """
+    if isinstance(data, dict):
+        return {re.sub(r'_([a-z0-9])', lambda m: m.group(1).upper(), key):
+                _camel_case(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [_camel_case(value) for value in data]
+    return data
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, description, headers=None):
+        self.status = status
+        self.description = description
+        self.headers = headers or {}
+
+
+def _not_found():
+    return _HTTPError(404, 'The requested resource could not be found.')
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def _make_handler(respond):
+    """Create a request handler class which answers every request with
+    ``respond(method, path, query, headers, body)``, which returns the
+    status, headers and body of the response.
+    """
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _read_body(self):
+            if self.headers.get('Transfer-Encoding', '') == 'chunked':
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0], 16)
+                    chunk = self.rfile.read(size)
+                    self.rfile.readline()
+                    if not size:
+                        return b''.join(chunks)
+                    chunks.append(chunk)
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def _handle(self):
+            url = urlparse(self.path)
+            body = self._read_body()
+            status, headers, content = respond(
+                self.command, url.path.rstrip('/') or '/',
+                parse_qs(url.query), self.headers, body)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class _Server(object):
+    def __init__(self, respond):
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0),
+                                            _make_handler(respond))
+        # Poll often, so that stopping the server is quick
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.01})
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MockCivisAPI(object):
+    """Serve a stand-in for the Civis API and S3 on localhost.
+
+    Parameters
+    ----------
+    latency : float, optional
+        Seconds each API call waits before responding.
+    job_duration : float, optional
+        Seconds each run of a script, import or query runs for.
+    storage_latency : float, optional
+        Seconds each request to the storage service waits.
+    n_items : int, optional
+        The number of credentials listed by ``/credentials``, paginated
+        as the API does. Credential 1 is the default credential.
+    spec : OrderedDict or str, optional
+        The API specification served by ``/endpoints``, or the name of a
+        JSON file with it. Defaults to the specification used by the
+        tests.
+    rate_limit : int, optional
+        Calls allowed per 5 minutes, refilled continuously. Calls beyond
+        the limit get a 429 response with a ``Retry-After`` header. The
+        default, None, reports a limit of 1000 without enforcing it.
+
+    Attributes
+    ----------
+    final_state : str
+        The state runs finish in, ``'succeeded'`` by default.
+    sql_result : bytes
+        The CSV output of each successful SQL script run.
+    databases : list of str
+        The names of the databases listed by ``/databases``.
+    calls : collections.Counter
+        The number of API calls made for each ``(method, path)``.
+    """
+    def __init__(self, latency=0, job_duration=0, storage_latency=0,
+                 n_items=100, spec=None, rate_limit=None):
+        self.latency = latency
+        self.job_duration = job_duration
+        self.storage_latency = storage_latency
+        self.n_items = n_items
+        self.rate_limit = rate_limit
+        self.final_state = 'succeeded'
+        self.sql_result = b'a,b\n1,2\n3,4\n'
+        self.databases = ['mock']
+        self.calls = Counter()
+
+        if spec is None:
+            spec = SPEC_PATH
+        if not isinstance(spec, dict):
+            with open(spec) as f:
+                spec = json.load(f, object_pairs_hook=OrderedDict)
+        self.spec = spec
+        self._spec_bytes = json.dumps(spec).encode('utf-8')
+        self._spec_etag = '"{}"'.format(
+            hashlib.sha1(self._spec_bytes).hexdigest())
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._queries = {}
+        self._files = {}
+        self._blobs = {}
+        self._failures = []
+        self._tokens = rate_limit
+        self._refilled = _clock()
+
+        self._api = _Server(self._respond_api)
+        self._storage = _Server(self._respond_storage)
+
+    @property
+    def url(self):
+        """The base URL of the API."""
+        return self._api.url
+
+    @property
+    def storage_url(self):
+        """The base URL of the storage service."""
+        return self._storage.url
+
+    def start(self):
+        self._api.start()
+        self._storage.start()
+        return self
+
+    def stop(self):
+        self._api.stop()
+        self._storage.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, **kwargs):
+        """Create a :class:`civis.APIClient` which calls this server.
+
+        Keyword arguments are passed to :class:`civis.APIClient`. The API
+        specification is given as ``local_api_spec`` unless another is
+        passed; pass ``local_api_spec=None`` to download it from
+        ``/endpoints``.
+        """
+        kwargs.setdefault('api_key', 'mock-api-key')
+        kwargs.setdefault('local_api_spec', self.spec)
+        with mock.patch.dict('os.environ', {'CIVIS_API_ENDPOINT': self.url}):
+            return civis.APIClient(**kwargs)
+
+    def fail_next(self, n_calls, status_code=503, retry_after=None):
+        """Answer the next `n_calls` API calls with `status_code`,
+        with a ``Retry-After`` header if `retry_after` is given.
+        """
+        headers = {}
+        if retry_after is not None:
+            headers['Retry-After'] = str(retry_after)
+        with self._lock:
+            self._failures.extend([(status_code, headers)] * n_calls)
+
+    def add_file(self, contents, name='file'):
+        """Store a file, as if uploaded, and return its ID."""
+        with self._lock:
+            return self._add_file(name, contents)['id']
+
+    def file_contents(self, file_id):
+        """Return the contents of an uploaded file, or None."""
+        with self._lock:
+            return self._blobs.get('files/{}'.format(file_id))
+
+    def upload_contents(self, import_id):
+        """Return the contents uploaded for a file import, or None."""
+        with self._lock:
+            return self._blobs.get('imports/{}'.format(import_id))
+
+    # API
+
+    def _respond_api(self, method, path, query, headers, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[(method, path)] += 1
+            failure = self._failures.pop(0) if self._failures else None
+            rate_headers = self._take_token()
+        try:
+            if not headers.get('Authorization'):
+                raise _HTTPError(401, 'Missing API key',
+                                 {'WWW-Authenticate': 'Basic realm="API"'})
+            if failure is not None:
+                status, failure_headers = failure
+                raise _HTTPError(status, 'Injected failure', failure_headers)
+            if rate_headers['X-RateLimit-Remaining'] < 0:
+                retry_after = self._seconds_to_token()
+                raise _HTTPError(429, 'Rate limit exceeded',
+                                 {'Retry-After': str(retry_after)})
+            data = _camel_case(json.loads(body.decode('utf-8'))
+                               if body else {})
+            with self._lock:
+                status, data, extra_headers = self._route(
+                    method, path, query, headers, data)
+        except _HTTPError as e:
+            status, extra_headers = e.status, e.headers
+            data = {'error': 'error', 'code': e.status,
+                    'errorDescription': e.description}
+        response_headers = {
+            'Content-Type': 'application/json',
+            'X-RateLimit-Limit': str(self.rate_limit or 1000),
+            'X-RateLimit-Remaining': str(max(
+                0, rate_headers['X-RateLimit-Remaining']))}
+        response_headers.update(extra_headers)
+        if isinstance(data, bytes):
+            content = data
+        elif data is None:
+            content = b''
+        else:
+            content = json.dumps(data).encode('utf-8')
+        if (len(content) >= _GZIP_MIN_SIZE and
+                'gzip' in headers.get('Accept-Encoding', '')):
+            content = _gzip(content)
+            response_headers['Content-Encoding'] = 'gzip'
+        return status, response_headers, content
+
+    def _take_token(self):
+        if self.rate_limit is None:
+            return {'X-RateLimit-Remaining': 1000}
+        now = _clock()
+        refill = (now - self._refilled) * self.rate_limit / RATE_LIMIT_PERIOD
+        self._tokens = min(self.rate_limit, self._tokens + refill)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return {'X-RateLimit-Remaining': int(self._tokens)}
+        return {'X-RateLimit-Remaining': -1}
+
+    def _seconds_to_token(self):
+        with self._lock:
+            missing = 1 - self._tokens
+        return int(math.ceil(missing * RATE_LIMIT_PERIOD / self.rate_limit))
+
+    def _route(self, method, path, query, headers, data):
+        """Return the status, data and headers of the response to an API
+        call. Called with the lock held.
+        """
+        if path == '/endpoints' and method == 'GET':
+            if headers.get('If-None-Match') == self._spec_etag:
+                return 304, None, {'ETag': self._spec_etag}
+            return 200, self._spec_bytes, {'ETag': self._spec_etag}
+        elif path == '/users/me' and method == 'GET':
+            return 200, {'id': 1, 'name': 'Mock User', 'username': 'mock',
+                         'initials': 'MU', 'featureFlags': {}}, {}
+        elif path == '/databases' and method == 'GET':
+            return 200, [{'id': i, 'name': name} for i, name in
+                         enumerate(self.databases, 1)], {}
+        elif path == '/credentials' and method == 'GET':
+            return self._list_credentials(query)
+        elif path == '/files' and method == 'POST':
+            return 200, self._post_file(data), {}
+        elif path.startswith('/files/') and method == 'GET':
+            return 200, self._get_file(path.split('/')[2]), {}
+        elif path == '/queries' and method == 'POST':
+            return 200, self._post_query(data), {}
+        elif path.startswith('/queries/') and method == 'GET':
+            return 200, self._get_query(path.split('/')[2]), {}
+        match = _JOB_ROUTE.match(path)
+        if match:
+            return self._route_job(method, match.group('kind'),
+                                   match.group('id'), match.group('rest'),
+                                   data)
+        raise _not_found()
+
+    def _list_credentials(self, query):
+        items = [{'id': i, 'name': 'credential_{}'.format(i),
+                  'type': 'Database', 'username': 'mock',
+                  'default': i == 1} for i in range(1, self.n_items + 1)]
+        if query.get('default', [''])[0].lower() == 'true':
+            items = [item for item in items if item['default']]
+        page_num = int(query.get('page_num', ['1'])[0])
+        limit = int(query.get('limit', [str(_DEFAULT_PAGE_SIZE)])[0])
+        start = (page_num - 1) * limit
+        headers = {'X-Pagination-Current-Page': str(page_num),
+                   'X-Pagination-Per-Page': str(limit),
+                   'X-Pagination-Total-Entries': str(len(items)),
+                   'X-Pagination-Total-Pages': str(-(-len(items) // limit))}
+        return 200, items[start:start + limit], headers
+
+    # Files
+
+    def _add_file(self, name, contents=None):
+        file_id = next(self._ids)
+        key = 'files/{}'.format(file_id)
+        record = {'id': file_id, 'name': name, 'createdAt': _now(),
+                  'expiresAt': None, 'fileSize': None}
+        self._files[file_id] = record
+        if contents is not None:
+            self._blobs[key] = contents
+            record['fileSize'] = len(contents)
+        return record
+
+    def _post_file(self, data):
+        record = self._add_file(data.get('name', 'file'))
+        record['expiresAt'] = data.get('expiresAt')
+        response = dict(record)
+        response['uploadUrl'] = '{}upload/files/{}'.format(
+            self.storage_url, record['id'])
+        response['uploadFields'] = {'key': 'files/{}'.format(record['id']),
+                                    'policy': 'mock-policy',
+                                    'x-amz-signature': 'mock-signature'}
+        return response
+
+    def _get_file(self, file_id):
+        record = self._files.get(int(file_id)) if file_id.isdigit() else None
+        if record is None:
+            raise _not_found()
+        response = dict(record)
+        key = 'files/{}'.format(file_id)
+        response['fileSize'] = len(self._blobs.get(key, b''))
+        response['fileUrl'] = (self.storage_url + key
+                               if key in self._blobs else None)
+        return response
+
+    # Queries
+
+    def _post_query(self, data):
+        query_id = next(self._ids)
+        self._queries[query_id] = {'id': query_id, 'sql': data.get('sql'),
+                                   'database': data.get('database'),
+                                   'createdAt': _now(), '_started': _clock()}
+        return self._query_view(self._queries[query_id])
+
+    def _get_query(self, query_id):
+        query = (self._queries.get(int(query_id)) if query_id.isdigit()
+                 else None)
+        if query is None:
+            raise _not_found()
+        return self._query_view(query)
+
+    def _query_view(self, query):
+        view = {key: value for key, value in query.items()
+                if not key.startswith('_')}
+        view['state'] = self._state(query['_started'])
+        if view['state'] == 'succeeded':
+            rows = [line.split(',') for line in
+                    self.sql_result.decode('utf-8').splitlines()]
+            view['resultColumns'] = rows[0] if rows else []
+            view['resultRows'] = rows[1:]
+        return view
+
+    # Jobs and their runs
+
+    def _state(self, started, cancelled=False):
+        if cancelled:
+            return 'cancelled'
+        if _clock() - started < self.job_duration:
+            return 'running'
+        return self.final_state
+
+    def _get_job(self, job_id):
+        job = self._jobs.get(int(job_id)) if job_id is not None else None
+        if job is None:
+            raise _not_found()
+        return job
+
+    def _route_job(self, method, kind, job_id, rest, data):
+        if job_id is None:
+            if method == 'POST' and kind != 'jobs':
+                return 200, self._post_job(kind, data), {}
+            elif method == 'GET':
+                return 200, [self._job_view(job) for job in
+                             self._jobs.values() if job['kind'] == kind], {}
+            raise _not_found()
+        job = self._get_job(job_id)
+        if rest is None:
+            if method in ('PUT', 'PATCH'):
+                job['attrs'].update(data)
+            elif method != 'GET':
+                raise _not_found()
+            return 200, self._job_view(job), {}
+        elif rest == 'archive' and method == 'PUT':
+            job['attrs']['archived'] = bool(data.get('status', True))
+            return 200, self._job_view(job), {}
+        elif rest == 'cancel' and method == 'POST':
+            for run in job['runs']:
+                run['_cancelled'] = True
+            return 200, {'id': job['id'], 'state': 'cancelled'}, {}
+        elif rest == 'syncs' and method == 'POST':
+            sync = dict(data, id=next(self._ids))
+            job['attrs'].setdefault('syncs', []).append(sync)
+            return 200, sync, {}
+        match = _RUN_ROUTE.match(rest)
+        if not match:
+            raise _not_found()
+        return self._route_run(method, kind, job, match.group('run_id'),
+                               match.group('rest'), data)
+
+    def _post_job(self, kind, data):
+        job_id = next(self._ids)
+        job = {'id': job_id, 'kind': kind, 'attrs': dict(data),
+               'createdAt': _now(), 'runs': OrderedDict()}
+        job['attrs'].setdefault('archived', False)
+        self._jobs[job_id] = job
+        view = self._job_view(job)
+        if kind == 'imports/files':
+            view['uploadUri'] = '{}imports/{}'.format(self.storage_url,
+                                                      job_id)
+            view['runUri'] = '{}imports/files/{}/runs'.format(
+                self.url, job_id)
+        return view
+
+    def _job_view(self, job):
+        view = dict(job['attrs'])
+        view.update(id=job['id'], createdAt=job['createdAt'])
+        runs = list(job['runs'].values())
+        view['lastRun'] = self._run_view(job, runs[-1]) if runs else None
+        view['state'] = view['lastRun']['state'] if runs else 'idle'
+        return view
+
+    def _route_run(self, method, kind, job, run_id, rest, data):
+        if run_id is None:
+            if method == 'POST':
+                run = self._post_run(job)
+                view = self._run_view(job, run, kind)
+                if kind == 'imports':
+                    # The API reports the ID of an import's run as `runId`
+                    view['runId'] = view['id']
+                return 200, view, {}
+            elif method == 'GET':
+                return 200, [self._run_view(job, run, kind) for run in
+                             reversed(list(job['runs'].values()))], {}
+            raise _not_found()
+        run = job['runs'].get(int(run_id))
+        if run is None:
+            raise _not_found()
+        if rest is None and method == 'GET':
+            return 200, self._run_view(job, run, kind), {}
+        elif rest == 'outputs' and method == 'GET':
+            self._run_view(job, run, kind)
+            return 200, list(run['outputs']), {}
+        elif rest == 'outputs' and method == 'POST':
+            output = {'objectType': data.get('objectType'),
+                      'objectId': data.get('objectId'),
+                      'name': self._output_name(data), 'link': None,
+                      'value': None}
+            run['outputs'].append(output)
+            return 200, output, {}
+        elif rest == 'logs' and method == 'GET':
+            return 200, [], {}
+        raise _not_found()
+
+    def _output_name(self, data):
+        if data.get('objectType') == 'File':
+            record = self._files.get(data.get('objectId'))
+            return record['name'] if record else None
+        return None
+
+    def _post_run(self, job):
+        run_id = next(self._ids)
+        run = {'id': run_id, 'createdAt': _now(), '_started': _clock(),
+               '_cancelled': False, 'outputs': [], '_finished': False}
+        job['runs'][run_id] = run
+        return run
+
+    def _run_view(self, job, run, kind=None):
+        state = self._state(run['_started'], run['_cancelled'])
+        if state == 'succeeded' and not run['_finished']:
+            run['_finished'] = True
+            self._finish_run(job, run)
+        view = {'id': run['id'], 'state': state,
+                'createdAt': run['createdAt'], 'startedAt': run['createdAt'],
+                'finishedAt': _now() if state != 'running' else None,
+                'isCancelRequested': run['_cancelled'],
+                'error': 'Job failed' if state == 'failed' else None}
+        view[_RUN_PARENT_KEYS[kind or job['kind']]] = job['id']
+        if job['kind'] == 'scripts/sql':
+            view['output'] = list(run['outputs']) if state == 'succeeded' \
+                else []
+        return view
+
+    def _finish_run(self, job, run):
+        """Create the outputs of a successful run."""
+        if job['kind'] != 'scripts/sql':
+            return
+        csv_settings = job['attrs'].get('csvSettings') or {}
+        record = self._add_file('output.csv', self.sql_result)
+        if csv_settings.get('forceMultifile'):
+            header = self.sql_result.decode('utf-8').split('\n', 1)[0]
+            manifest = {'query': job['attrs'].get('sql'),
+                        'header': header.split(','),
+                        'delimiter': ',', 'compression': 'none',
+                        'unquoted': False,
+                        'entries': [{'id': record['id'],
+                                     'name': record['name'],
+                                     'size': record['fileSize'],
+                                     'url': self.storage_url + 'files/{}'
+                                     .format(record['id']),
+                                     'url_signed': self.storage_url +
+                                     'files/{}'.format(record['id'])}]}
+            record = self._add_file('manifest.json',
+                                    json.dumps(manifest).encode('utf-8'))
+        run['outputs'].append({
+            'outputName': record['name'], 'fileId': record['id'],
+            'path': self.storage_url + 'files/{}'.format(record['id'])})
+
+    # Storage
+
+    def _respond_storage(self, method, path, query, headers, body):
+        if self.storage_latency:
+            time.sleep(self.storage_latency)
+        if headers.get('Authorization'):
+            # Presigned URLs carry their own credentials
+            return 400, {'Content-Type': 'application/xml'}, (
+                b'<Error><Code>InvalidArgument</Code><Message>Only one auth '
+                b'mechanism allowed</Message></Error>')
+        key = path.lstrip('/')
+        with self._lock:
+            if method == 'GET' and key in self._blobs:
+                return (200, {'Content-Type': 'application/octet-stream'},
+                        self._blobs[key])
+            elif method == 'PUT' and key.startswith('imports/'):
+                self._blobs[key] = body
+                return 200, {}, b''
+            elif method == 'POST' and key.startswith('upload/files/'):
+                key = key[len('upload/'):]
+                file_id = int(key.split('/')[1])
+                if file_id not in self._files:
+                    return 403, {}, b''
+                contents = _form_file(headers.get('Content-Type'), body)
+                if contents is None:
+                    return 400, {}, b''
+                self._blobs[key] = contents
+                self._files[file_id]['fileSize'] = len(contents)
+                return 204, {}, b''
+        return 404, {}, b''
+
+
+def _gzip(content):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(content)
+    return buf.getvalue()
+
+
+def _form_file(content_type, body):
+    """Return the ``file`` field of a multipart form, or None."""
+    raw = b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n'
+    if six.PY3:
+        message = email.message_from_bytes(raw + body)
+    else:
+        message = email.message_from_string(raw + body)
+    if not message.is_multipart():
+        return None
+    for part in message.get_payload():
+        if part.get_param('name', header='content-disposition') == 'file':
+            return part.get_payload(decode=True)
+    return None
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import json
+import os
+import sys
+
+import pytest
+
+from civis.compat import mock
+from civis.response import Response
+
+HAS_ASYNC = sys.version_info >= (3, 5)
+if HAS_ASYNC:
+    import asyncio
+    from civis import _async
+    HAS_ASYNC = _async.HAS_AIOHTTP
+
+pytestmark = pytest.mark.skipif(not HAS_ASYNC,
+                                reason="requires Python 3.5+ and aiohttp")
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))
+with open(os.path.join(THIS_DIR, "civis_api_spec.json")) as f:
+    civis_api_spec = json.load(f, object_pairs_hook=OrderedDict)
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _done(result):
+    fut = asyncio.Future()
+    fut.set_result(result)
+    return fut
+
+
+def _response(data, status_code=200, headers=None):
+    content = json.dumps(data).encode('utf-8') if data is not None else b''
+    return _async._AsyncResponse(status_code, 'OK', headers or {}, content,
+                                 'https://api.civisanalytics.com/')
+
+
+def _collect(async_iterator):
+    items = []
+    while True:
+        try:
+            items.append(_run(async_iterator.__anext__()))
+        except StopAsyncIteration:
+            return items
+
+
+def _client(return_type='snake'):
+    return _async.AsyncAPIClient(api_key='key', return_type=return_type,
+                                 local_api_spec=civis_api_spec)
+
+
+def test_generated_methods_are_awaitable():
+    client = _client()
+    # `request` is a coroutine function, so give a plain Mock returning
+    # a future; `patch` would otherwise create an AsyncMock on Python 3.8+
+    request = mock.Mock(return_value=_done(_response({'fileUrl': 'url'})))
+    with mock.patch.object(client._session, 'request',
+                           new=request) as mock_request:
+        coro = client.files.get(123)
+        assert asyncio.iscoroutine(coro)
+        result = _run(coro)
+
+    assert isinstance(result, Response)
+    assert result.file_url == 'url'
+    mock_request.assert_called_once_with(
+        'get', 'https://api.civisanalytics.com/files/123', params={}, json={})
+
+
+def test_resources_created_on_first_use():
+    client = _client()
+    assert 'files' not in vars(client)
+    assert 'files' in dir(client)
+    assert client.files is client.files
+    assert 'files' in vars(client)
+    with pytest.raises(AttributeError):
+        client.not_a_resource
+
+
+def test_raw_return_type():
+    client = _client(return_type='raw')
+    raw = _response({'id': 1})
+    with mock.patch.object(client._session, 'request',
+                           new=mock.Mock(return_value=_done(raw))):
+        assert _run(client.users.list_me()) is raw
+
+
+def test_api_error():
+    client = _client()
+    error = _response({'errorDescription': 'not found'}, status_code=404)
+    with mock.patch.object(client._session, 'request',
+                           new=mock.Mock(return_value=_done(error))):
+        with pytest.raises(_async.CivisAPIError) as excinfo:
+            _run(client.files.get(123))
+    assert excinfo.value.status_code == 404
+
+
+def test_async_pagination():
+    client = _client()
+    pages = [[{'id': 1}, {'id': 2}], [{'id': 3}], []]
+    page_nums = []
+
+    def request(method, url, params, json):
+        page_nums.append(params['page_num'])
+        return _done(_response(pages[params['page_num'] - 1]))
+
+    with mock.patch.object(client._session, 'request',
+                           new=mock.Mock(side_effect=request)):
+        paginator = client.credentials.list(iterator=True, limit=2)
+        assert isinstance(paginator, _async.AsyncPaginatedResponse)
+        items = _collect(paginator)
+
+    assert [item.id for item in items] == [1, 2, 3]
+    assert page_nums == [1, 2, 3]
+
+
+def test_retry_delay():
+    session = _async._AsyncSession('key', 10, retry_total=2)
+    unavailable = _response(None, status_code=503)
+    rate_limited = _response(None, status_code=429,
+                             headers={'Retry-After': '7'})
+    assert session._retry_delay('GET', unavailable, 0) == .75
+    assert session._retry_delay('GET', unavailable, 1) == 1.5
+    assert session._retry_delay('GET', unavailable, 2) is None
+    assert session._retry_delay('POST', unavailable, 0) is None
+    assert session._retry_delay('POST', rate_limited, 0) == 7
+    assert session._retry_delay('GET', _response({}), 0) is None
+    # Failed connections are retried for idempotent verbs
+    assert session._retry_delay('GET', None, 0) == .75
+    assert session._retry_delay('POST', None, 0) is None
+
+
+def test_encode_params():
+    params = {'a': None, 'b': True, 'c': [1, 2], 'd': 'x'}
+    assert sorted(_async._encode_params(params)) == [
+        ('b', 'True'), ('c', 1), ('c', 2), ('d', 'x')]
+
+
+def test_async_get_many():
+    client = _client()
+    error = _response({'errorDescription': 'not found'}, status_code=404)
+    urls = []
+
+    def request(method, url, params, json):
+        urls.append(url)
+        if url.endswith('/3'):
+            return _done(error)
+        return _done(_response({'id': int(url.rsplit('/', 1)[1])}))
+
+    with mock.patch.object(client._session, 'request',
+                           new=mock.Mock(side_effect=request)):
+        results = _run(client.files.get_many([1, 3, 2, 1], max_workers=2))
+    assert [r.id for r in results if isinstance(r, Response)] == [1, 2, 1]
+    assert isinstance(results[1], _async.CivisAPIError)
+    assert len(urls) == 3
@@ -1,6 +1,17 @@
+import socket
+import threading
+
+import pytest
 import requests
+from requests.packages.urllib3.exceptions import (
+    MaxRetryError, ProtocolError)
 
-from civis.base import Endpoint, get_base_url
+from civis._cache import ResponseCache
+from civis._metrics import RequestMetrics
+from civis._resilience import CircuitBreakers, RetryBudget
+from civis.base import (
+    AggressiveRetry, CircuitOpenError, CivisAPIError, Endpoint,
+    ForkSafeSession, TimeoutHTTPAdapter, get_base_url)
 from civis.compat import mock
 
 
@@ -20,3 +31,203 @@ def test_endpoint_base_url(mock_get_base_url):
     endpoint = Endpoint(session)
 
     assert endpoint._base_url == 'https://base.api.url/'
+
+
+def test_endpoint_requests_not_serialized():
+    # Requests made from different threads should be in flight together.
+    both_in_flight = threading.Event()
+    in_flight = []
+
+    def request(*args, **kwargs):
+        in_flight.append(1)
+        if len(in_flight) == 2:
+            both_in_flight.set()
+        both_in_flight.wait(5)
+        return mock.Mock(status_code=200, ok=True)
+
+    session = mock.MagicMock(spec=requests.Session)
+    session.request.side_effect = request
+    endpoint = Endpoint(session)
+    threads = [threading.Thread(target=endpoint._make_request,
+                                args=('GET', 'objects')) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert both_in_flight.is_set()
+    assert session.request.call_count == 2
+
+
+def test_endpoint_governor():
+    governor = mock.Mock()
+    session = mock.MagicMock(spec=requests.Session)
+    headers = {'X-RateLimit-Remaining': '9'}
+    session.request.return_value = mock.Mock(status_code=200, ok=True,
+                                             headers=headers)
+    endpoint = Endpoint(session, governor=governor)
+    endpoint._make_request('GET', 'objects')
+
+    governor.acquire.assert_called_once_with()
+    governor.update.assert_called_once_with(headers)
+
+
+def test_endpoint_cache():
+    session = mock.MagicMock(spec=requests.Session)
+    response = mock.Mock(status_code=200, ok=True, headers={'ETag': '"a"'})
+    session.request.return_value = response
+    cache = ResponseCache(ttl=0)
+    endpoint = Endpoint(session, return_type='raw', cache=cache)
+
+    assert endpoint._call_api('GET', 'files/1') is response
+    session.request.return_value = mock.Mock(status_code=304, ok=True,
+                                             headers={})
+    assert endpoint._call_api('GET', 'files/1') is response
+    _, kwargs = session.request.call_args
+    assert kwargs['headers'] == {'If-None-Match': '"a"'}
+    assert cache.metrics()['revalidations'] == 1
+
+    endpoint._call_api('PATCH', 'files/1', data={'name': 'new'})
+    assert cache.metrics()['size'] == 0
+
+
+def test_endpoint_metrics():
+    session = mock.MagicMock(spec=requests.Session)
+    session.request.return_value = mock.Mock(
+        status_code=200, ok=True, content=b'{}', raw=None,
+        request=mock.Mock(body=None))
+    metrics = RequestMetrics()
+    endpoint = Endpoint(session, return_type='raw', metrics=metrics)
+    endpoint._call_api('GET', 'files/1', method_name='get')
+    endpoint._call_api('GET', 'files/1')
+
+    assert sorted(metrics.snapshot()) == ['endpoint.GET', 'endpoint.get']
+    # The method name is not passed on to requests
+    for _, kwargs in session.request.call_args_list:
+        assert 'method_name' not in kwargs
+
+
+def test_endpoint_without_metrics():
+    session = mock.MagicMock(spec=requests.Session)
+    session.request.return_value = mock.Mock(status_code=200, ok=True)
+    endpoint = Endpoint(session, return_type='raw')
+    endpoint._call_api('GET', 'files/1', method_name='get')
+    _, kwargs = session.request.call_args
+    assert 'method_name' not in kwargs
+
+
+def test_endpoint_circuit_breaker():
+    session = mock.MagicMock(spec=requests.Session)
+    session.request.return_value = mock.Mock(status_code=503, ok=False,
+                                             content=None, reason='down')
+    breakers = CircuitBreakers(failure_threshold=2)
+    endpoint = Endpoint(session, return_type='raw', breakers=breakers)
+    for _ in range(2):
+        with pytest.raises(CivisAPIError):
+            endpoint._call_api('GET', 'files/1')
+    with pytest.raises(CircuitOpenError):
+        endpoint._call_api('GET', 'files/2')
+    assert session.request.call_count == 2
+
+    session.request.side_effect = requests.ConnectionError
+    with pytest.raises(requests.ConnectionError):
+        endpoint._call_api('GET', 'scripts/1')
+    assert breakers.state('scripts') == 'closed'
+
+
+def test_retry_budget_limits_status_retries():
+    budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=1)
+    retry = AggressiveRetry(3, status_forcelist=[503], budget=budget)
+    assert retry.is_retry('GET', 503)
+    retry = retry.new(total=2)
+    assert retry.budget is budget
+    assert not retry.is_retry('GET', 503)
+    assert not retry.is_retry('GET', 200)
+
+
+def test_retry_budget_untouched_when_retries_run_out():
+    budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=1)
+    retry = AggressiveRetry(0, status_forcelist=[503], budget=budget)
+    assert retry.is_retry('GET', 503)
+    with pytest.raises(MaxRetryError):
+        retry.increment('GET', '/', response=mock.Mock(status=503))
+    assert budget.metrics()['retries'] == 0
+
+
+def test_retry_budget_limits_error_retries():
+    budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=1)
+    retry = AggressiveRetry(3, budget=budget)
+    error = ProtocolError('connection aborted')
+    retry = retry.increment('GET', '/', error=error)
+    with pytest.raises(MaxRetryError):
+        retry.increment('GET', '/', error=error)
+
+
+def test_retry_budget_exhausted_raises_requests_errors():
+    # Find a local port with nothing listening on it
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=0)
+    session = requests.Session()
+    session.mount('http://', TimeoutHTTPAdapter(
+        timeout=5, max_retries=AggressiveRetry(3, budget=budget)))
+    with pytest.raises(requests.ConnectionError):
+        session.get('http://127.0.0.1:{}/files/1'.format(port))
+    assert budget.metrics()['refused'] == 1
+
+
+@mock.patch('civis.base.HTTPAdapter.send')
+def test_adapter_deposits_in_retry_budget(mock_send):
+    budget = RetryBudget()
+    adapter = TimeoutHTTPAdapter(
+        max_retries=AggressiveRetry(3, budget=budget))
+    adapter.send('request')
+    assert budget.metrics()['calls'] == 1
+
+
+@mock.patch('civis.base.HTTPAdapter.send')
+def test_timeout_adapter_default_timeout(mock_send):
+    adapter = TimeoutHTTPAdapter(timeout=5)
+    adapter.send('request')
+    mock_send.assert_called_once_with('request', timeout=5)
+
+    mock_send.reset_mock()
+    adapter.send('request', timeout=1)
+    mock_send.assert_called_once_with('request', timeout=1)
+
+
+def test_timeout_adapter_prewarm():
+    adapter = TimeoutHTTPAdapter(pool_maxsize=3)
+    conns = [mock.Mock() for _ in range(3)]
+    conns[1].connect.side_effect = socket.error
+    pool = mock.Mock()
+    pool._get_conn.side_effect = conns
+    with mock.patch.object(adapter.poolmanager, 'connection_from_url',
+                           return_value=pool):
+        adapter.prewarm('https://api.civisanalytics.com/', 5)
+    assert all(conn.connect.call_count == 1 for conn in conns)
+    assert pool._put_conn.call_args_list == [mock.call(c) for c in conns]
+
+
+def test_timeout_adapter_reset_connections():
+    adapter = TimeoutHTTPAdapter(pool_connections=4, pool_maxsize=8)
+    poolmanager = adapter.poolmanager
+    adapter.reset_connections()
+    assert adapter.poolmanager is not poolmanager
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 8
+
+
+def test_fork_safe_session_resets_adapters_in_child():
+    session = ForkSafeSession()
+    adapter = mock.Mock(spec=TimeoutHTTPAdapter)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.get_adapter('https://example.com')
+    assert adapter.reset_connections.call_count == 0
+    with mock.patch('os.getpid', return_value=session._pid + 1):
+        session.get_adapter('https://example.com')
+        session.get_adapter('http://example.com')
+    assert adapter.reset_connections.call_count == 1
@@ -0,0 +1,83 @@
+from civis import _cache
+from civis._cache import ResponseCache
+from civis.compat import mock
+
+
+def _response(status_code=200, etag=None):
+    headers = {'ETag': etag} if etag else {}
+    return mock.Mock(status_code=status_code, headers=headers)
+
+
+@mock.patch.object(_cache, '_clock', return_value=0)
+def test_cache_hit_until_expired(mock_clock):
+    cache = ResponseCache(ttl=10)
+    key = cache.key('files/1')
+    assert cache.get(key) == (None, None)
+    response = _response()
+    cache.put(key, response)
+    assert cache.get(key) == (response, None)
+
+    mock_clock.return_value = 11
+    assert cache.get(key) == (None, None)
+    metrics = cache.metrics()
+    assert metrics['hits'] == 1
+    assert metrics['misses'] == 1
+    assert metrics['hit_rate'] == 0.5
+    assert metrics['size'] == 0
+
+
+@mock.patch.object(_cache, '_clock', return_value=0)
+def test_cache_revalidate_etag(mock_clock):
+    cache = ResponseCache(ttl=10)
+    key = cache.key('files/1')
+    response = _response(etag='"abc"')
+    cache.put(key, response)
+
+    mock_clock.return_value = 11
+    assert cache.get(key) == (None, '"abc"')
+    assert cache.revalidated(key) is response
+    assert cache.get(key) == (response, None)
+    assert cache.metrics()['revalidations'] == 1
+
+
+def test_cache_key_params():
+    cache = ResponseCache()
+    assert cache.key('/files/1/', {'a': 1, 'b': 2}) == \
+        cache.key('files/1', {'b': 2, 'a': 1})
+    assert cache.key('files', {'a': 1}) != cache.key('files', {'a': 2})
+
+
+def test_cache_resource_ttls():
+    cache = ResponseCache(ttl=10, resource_ttls={'users': 0})
+    assert cache.ttl_for('files/1') == 10
+    cache.put(cache.key('users/me'), _response())
+    assert cache.metrics()['size'] == 0
+    cache.put(cache.key('users/me'), _response(etag='"abc"'))
+    assert cache.metrics()['size'] == 1
+
+
+def test_cache_maxsize():
+    cache = ResponseCache(maxsize=2)
+    for i in range(3):
+        cache.put(cache.key('files/{}'.format(i)), _response())
+    assert cache.get(cache.key('files/0')) == (None, None)
+    assert cache.metrics()['evictions'] == 1
+    assert cache.metrics()['size'] == 2
+
+
+def test_cache_invalidate_related_paths():
+    cache = ResponseCache()
+    for path in ['files', 'files/1', 'files/1/projects', 'files/2',
+                 'scripts/1']:
+        cache.put(cache.key(path), _response())
+    cache.invalidate('/files/1')
+    remaining = [path for path in ['files', 'files/1', 'files/1/projects',
+                                   'files/2', 'scripts/1']
+                 if cache.get(cache.key(path))[0] is not None]
+    assert remaining == ['files/2', 'scripts/1']
+
+
+def test_cache_errors_not_cached():
+    cache = ResponseCache()
+    cache.put(cache.key('files/1'), _response(status_code=202))
+    assert cache.metrics()['size'] == 0
@@ -2,8 +2,12 @@ from collections import OrderedDict
 import json
 import os
 
+from click.testing import CliRunner
+
 from civis.cli.__main__ import generate_cli, invoke
+from civis.cli._cli_commands import compile_api_spec_cmd
 from civis.compat import mock
+from civis.resources._compiled import is_compiled_api_spec
 from civis.resources._resources import BASE_RESOURCES_V1
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -35,7 +39,8 @@ def test_generate_cli_civis(mock_retrieve_spec_dict):
     mock_retrieve_spec_dict.return_value = civis_spec
 
     cli = generate_cli()
-    expected_cli_keys = set(BASE_RESOURCES_V1) | {'civis'}
+    expected_cli_keys = set(BASE_RESOURCES_V1) | {'civis', 'compile-api-spec',
+                                                  'check-api-spec'}
     assert sorted(cli.commands.keys()) == sorted(expected_cli_keys)
 
     # Check a regular command.
@@ -119,3 +124,13 @@ def test_parameter_case(mock_request, mock_yaml,
         json={},
         params={'firstParameter': 'a', 'secondParameter': 'b'},
         method='WIBBLE')
+
+
+def test_compile_api_spec_cmd():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        result = runner.invoke(compile_api_spec_cmd, [
+            'spec.bin', '--spec-file',
+            os.path.join(THIS_DIR, "civis_api_spec.json")])
+        assert result.exit_code == 0
+        assert is_compiled_api_spec('spec.bin')
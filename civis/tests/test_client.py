@@ -1,10 +1,15 @@
 from collections import OrderedDict
 import os
 import json
+import pickle
 import six
 
-from civis import APIClient
+import requests
+
+from civis import APIClient, ResponseIndex, find, find_one
+from civis.base import CivisAPIError
 from civis.compat import mock
+from civis.response import Response
 from civis.resources._resources import get_api_spec, generate_classes
 from civis.tests.testcase import CivisVCRTestCase
 
@@ -41,3 +46,162 @@ class ClientTests(CivisVCRTestCase):
             client.feature_flags
             client.feature_flags
             self.assertEqual(client.users.list_me.call_count, 1)
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_base_url_fixed_at_creation(self, *mocks):
+        # Resources are created on first use, but use the API endpoint
+        # which was configured when the client was created.
+        with mock.patch.dict('os.environ',
+                             {'CIVIS_API_ENDPOINT': 'http://localhost:8000'}):
+            client = APIClient()
+        self.assertEqual(client.files._base_url, 'http://localhost:8000/')
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_compressed_responses(self, *mocks):
+        client = APIClient()
+        self.assertIn('gzip', client._session.headers['Accept-Encoding'])
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_pool_maxsize(self, *mocks):
+        client = APIClient(pool_maxsize=32)
+        for url in ['https://api.civisanalytics.com', 'http://localhost']:
+            adapter = client._session.get_adapter(url)
+            self.assertEqual(adapter._pool_maxsize, 32)
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_connection_options(self, *mocks):
+        client = APIClient(pool_connections=4, timeout=(3, 30))
+        adapter = client._session.get_adapter('https://example.com')
+        self.assertEqual(adapter._pool_connections, 4)
+        self.assertEqual(adapter.timeout, (3, 30))
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_api_key_only_sent_to_api(self, *mocks):
+        client = APIClient(api_key='secret')
+        api_request = client._session.prepare_request(
+            requests.Request('GET', 'https://api.civisanalytics.com/users/me'))
+        s3_request = client._session.prepare_request(
+            requests.Request('GET', 'https://bucket.s3.amazonaws.com/key'))
+        self.assertIn('Authorization', api_request.headers)
+        self.assertNotIn('Authorization', s3_request.headers)
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_batch(self, *mocks):
+        client = APIClient(pool_maxsize=4)
+        error = CivisAPIError(mock.Mock(status_code=404, reason='Not Found',
+                                        content=None))
+
+        def get(file_id, **kwargs):
+            if file_id == 2:
+                raise error
+            return (file_id, kwargs)
+
+        with mock.patch.object(client.files, 'get', side_effect=get):
+            results = client.batch([(client.files.get, 1),
+                                    (client.files.get, (2,)),
+                                    (client.files.get, (3,), {'x': 'y'}),
+                                    (client.files.get, [4, 5])])
+        self.assertEqual(results, [(1, {}), error, (3, {'x': 'y'}),
+                                   ([4, 5], {})])
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_throttle_shares_governor(self, *mocks):
+        self.assertIsNone(APIClient(api_key='key').rate_limit_governor)
+        client = APIClient(api_key='key', throttle=True)
+        governor = client.rate_limit_governor
+        self.assertIsNotNone(governor)
+        self.assertIs(APIClient(api_key='key', throttle=True)
+                      .rate_limit_governor, governor)
+        self.assertIs(client.files._governor, governor)
+        adapter = client._session.get_adapter('https://example.com')
+        self.assertIs(adapter.max_retries.governor, governor)
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_response_cache(self, *mocks):
+        self.assertIsNone(APIClient().response_cache)
+        client = APIClient(cache_size=16, cache_ttl={'users': 600})
+        cache = client.response_cache
+        self.assertEqual(cache.maxsize, 16)
+        self.assertEqual(cache.ttl_for('users/me'), 600)
+        self.assertEqual(cache.ttl_for('files/1'), 60)
+        self.assertIs(client.files._cache, cache)
+
+    @mock.patch(api_import_str, return_value=civis_api_spec)
+    def test_pickle(self, mock_spec):
+        with mock.patch.dict('os.environ',
+                             {'CIVIS_API_ENDPOINT': 'http://localhost:8000'}):
+            client = APIClient(api_key='key', cache_size=16, timeout=5)
+        client.files
+        pickled = pickle.dumps(client)
+        mock_spec.reset_mock()
+        with mock.patch('civis.resources._resources.parse_api_spec') as parse:
+            copy = pickle.loads(pickled)
+        self.assertEqual(parse.call_count, 0)
+        self.assertEqual(mock_spec.call_count, 0)
+        self.assertIsNot(copy._session, client._session)
+        self.assertIsNot(copy.response_cache, client.response_cache)
+        self.assertEqual(copy.response_cache.maxsize, 16)
+        self.assertEqual(copy.transport.timeout, 5)
+        self.assertEqual(copy.files._base_url, 'http://localhost:8000/')
+        self.assertEqual(sorted(copy._classes), sorted(client._classes))
+        self.assertEqual(copy.files.get.__doc__, client.files.get.__doc__)
+        self.assertIs(copy.metadata_index, client.metadata_index)
+        # Doc strings aren't pickled, only the client's resources
+        table = client.__getstate__()['api_spec']
+        self.assertEqual(sorted(table['resources']), sorted(client._classes))
+        self.assertIsNone(table['resources']['files'][1][0][4])
+
+        # Pickling again reuses the compiled table
+        with mock.patch('civis.civis.get_compiled_api_spec') as compiled:
+            pickle.loads(pickle.dumps(client))
+        self.assertEqual(compiled.call_count, 0)
+
+
+def test_dir_lists_resources_and_methods():
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec)
+    names = dir(client)
+    assert 'files' in names
+    assert 'batch' in names
+    assert 'files' not in vars(client)
+
+    names = dir(client.files)
+    assert 'get' in names
+    assert 'get_many' in names
+    assert '_call_api' in names
+    assert 'get' in dir(type(client.files))
+
+
+def _outputs():
+    outputs = [Response({'name': 'file{}'.format(i % 50), 'objectId': i,
+                         'objectType': 'File' if i % 3 else 'Project'})
+               for i in range(200)]
+    outputs.append(Response({'name': ['unhashable'], 'objectId': 200}))
+    outputs.append(Response({'objectId': 201}))
+    return outputs
+
+
+def test_response_index_matches_find():
+    outputs = _outputs()
+    index = ResponseIndex(outputs, 'name')
+    queries = [{'name': 'file3'},
+               {'name': 'file3', 'object_type': 'File'},
+               {'object_type': 'Project', 'name': 'file4'},
+               {'name': 'missing'},
+               {'name': ['unhashable']},
+               {'name': True},
+               {'name': False},
+               {'object_id': lambda i: i > 190},
+               {'name': 'file3', 'object_id': 103},
+               {}]
+    for query in queries:
+        assert index.find(**query) == find(outputs, **query)
+        assert index.find_one(**query) is find_one(outputs, **query)
+
+
+def test_response_index_filter_func():
+    outputs = _outputs()
+    index = ResponseIndex(outputs)
+    assert index.find(lambda o: o.object_id < 3, name='ignored') == \
+        outputs[:3]
+    assert len(index) == len(outputs)
+    assert list(index) == outputs
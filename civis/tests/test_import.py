@@ -0,0 +1,63 @@
+"""Check that `import civis` stays fast. Each test imports civis in a new
+interpreter, since this one has already imported everything.
+"""
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Optional or heavy dependencies, and the parts of civis which use them,
+# which are imported on first use.
+DEFERRED_MODULES = ['aiohttp', 'civis._async', 'civis.futures', 'civis.io',
+                    'civis.ml', 'civis.parallel', 'httpx', 'joblib', 'numpy',
+                    'pandas', 'pubnub', 'requests_toolbelt', 'sklearn',
+                    'unittest.mock']
+
+
+def _run(code):
+    output = subprocess.check_output(
+        [sys.executable, '-c', textwrap.dedent(code)])
+    return json.loads(output.decode('utf-8'))
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5),
+                    reason="civis.io is imported eagerly before Python 3.5")
+def test_import_defers_modules():
+    modules = _run("""
+        import json, sys
+        import civis
+        print(json.dumps(sorted(sys.modules)))
+    """)
+    assert 'civis.civis' in modules
+    assert [m for m in DEFERRED_MODULES if m in modules] == []
+
+
+def test_import_time():
+    # Measure civis itself, after its required dependencies, relative to
+    # `requests` measured in the same interpreter, so that a slow machine
+    # slows both. Take the best of a few runs to smooth out noise.
+    ratios = [_run("""
+        import json, time
+        start = time.time()
+        import requests
+        baseline = time.time() - start
+        import jsonref, six
+        start = time.time()
+        import civis
+        print(json.dumps((time.time() - start) / baseline))
+    """) for _ in range(3)]
+    assert min(ratios) < 2
+
+
+def test_lazy_attributes():
+    loaded = _run("""
+        import json, sys
+        import civis
+        assert 'io' in dir(civis)
+        assert civis.io.read_civis is not None
+        assert civis.futures.CivisFuture is not None
+        print(json.dumps('civis.io' in sys.modules))
+    """)
+    assert loaded
@@ -203,8 +203,9 @@ class ImportTests(CivisVCRTestCase):
         y = '{"url": "https://httpbin.org/stream/3", "headers": {"Host": "httpbin.org", "Accept-Encoding": "gzip, deflate", "Accept": "*/*", "User-Agent": "python-requests/2.7.0 CPython/3.4.3 Linux/3.19.0-25-generic"}, "args": {}, "id": 1, "origin": "108.211.184.39"}\n'  # noqa: E501
         z = '{"url": "https://httpbin.org/stream/3", "headers": {"Host": "httpbin.org", "Accept-Encoding": "gzip, deflate", "Accept": "*/*", "User-Agent": "python-requests/2.7.0 CPython/3.4.3 Linux/3.19.0-25-generic"}, "args": {}, "id": 2, "origin": "108.211.184.39"}\n'  # noqa: E501
         expected = x + y + z
+        client = civis.APIClient()
         with tempfile.NamedTemporaryFile() as tmp:
-            civis.io._tables._download_file(url, tmp.name)
+            civis.io._tables._download_file(url, tmp.name, client)
             with open(tmp.name, "r") as f:
                 data = f.read()
         assert data == expected
@@ -283,7 +284,7 @@ def test_file_to_dataframe_infer():
     m_client = mock.Mock()
     m_client.files.get.return_value = Response({'name': 'spam.csv',
                                                 'file_url': 'url'})
-    with mock.patch.object(civis.io._files.pd, 'read_csv') as mock_read_csv:
+    with mock.patch.object(pd, 'read_csv') as mock_read_csv:
         civis.io.file_to_dataframe(121, compression='infer', client=m_client)
         assert mock_read_csv.called_once_with(121, compression='infer')
 
@@ -293,7 +294,7 @@ def test_file_to_dataframe_infer_gzip():
     m_client = mock.Mock()
     m_client.files.get.return_value = Response({'name': 'spam.csv.gz',
                                                 'file_url': 'url'})
-    with mock.patch.object(civis.io._files.pd, 'read_csv') as mock_read_csv:
+    with mock.patch.object(pd, 'read_csv') as mock_read_csv:
         civis.io.file_to_dataframe(121, compression='infer', client=m_client)
         assert mock_read_csv.called_once_with(121, compression='gzip')
 
@@ -303,7 +304,7 @@ def test_file_to_dataframe_kwargs():
     m_client = mock.Mock()
     m_client.files.get.return_value = Response({'name': 'spam.csv',
                                                 'file_url': 'url'})
-    with mock.patch.object(civis.io._files.pd, 'read_csv') as mock_read_csv:
+    with mock.patch.object(pd, 'read_csv') as mock_read_csv:
         civis.io.file_to_dataframe(121, compression='special', client=m_client,
                                    delimiter='|', nrows=10)
         assert mock_read_csv.called_once_with(121, compression='special',
@@ -0,0 +1,151 @@
+import gc
+import json
+import os
+from collections import OrderedDict
+import weakref
+
+import pytest
+
+from civis import APIClient, _metadata
+from civis._metadata import MetadataIndex, get_metadata_index
+from civis.compat import mock
+from civis.response import Response
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))
+with open(os.path.join(THIS_DIR, "civis_api_spec.json")) as f:
+    civis_api_spec = json.load(f, object_pairs_hook=OrderedDict)
+
+
+def _cred(id, name, username='user', owner='user', host_id=1,
+          host_name='db1'):
+    return Response({'id': id, 'name': name, 'username': username,
+                     'owner': owner, 'remoteHostId': host_id,
+                     'remoteHostName': host_name})
+
+
+def _client():
+    client = mock.Mock()
+    client.databases.list.return_value = [
+        Response({'id': 1, 'name': 'db1'}), Response({'id': 2, 'name': 'db2'})]
+    client.credentials.list.return_value = [
+        _cred(10, 'aws', owner='user'), _cred(11, 'aws', owner='other'),
+        _cred(12, 'db-cred', username='jsmith', host_id=2, host_name='db2')]
+    client.tables.list.return_value = [
+        Response({'id': 5, 'schema': 'schema', 'name': 'table'})]
+    return client
+
+
+def test_database_listed_once():
+    index, client = MetadataIndex(), _client()
+    assert index.database(client, 'db1')['id'] == 1
+    assert index.database(client, 'db2')['id'] == 2
+    assert index.database(client, 2)['name'] == 'db2'
+    assert client.databases.list.call_count == 1
+    assert index.metrics() == {'hits': 2, 'misses': 1}
+
+
+def test_missing_database_lists_again():
+    index, client = MetadataIndex(), _client()
+    index.database(client, 'db1')
+    client.databases.list.return_value.append(
+        Response({'id': 3, 'name': 'new'}))
+    assert index.database(client, 'new')['id'] == 3
+    assert index.database(client, 'gone') is None
+    assert client.databases.list.call_count == 3
+
+
+@mock.patch.object(_metadata, '_clock', return_value=0)
+def test_listing_expires(mock_clock):
+    index, client = MetadataIndex(ttl=10), _client()
+    index.database(client, 'db1')
+    mock_clock.return_value = 11
+    index.database(client, 'db1')
+    assert client.databases.list.call_count == 2
+
+
+def test_credentials_lookups():
+    index, client = MetadataIndex(), _client()
+    creds = index.credentials(client, 'Database', username='jsmith',
+                              host='db2')
+    assert [c['id'] for c in creds] == [12]
+    assert index.credentials(client, 'Database', username='jsmith',
+                             host=2) == creds
+    aws = index.credentials(client, 'Database', name='aws')
+    assert [c['id'] for c in aws] == [10, 11]
+    aws = index.credentials(client, 'Database', name='aws', owner='other')
+    assert [c['id'] for c in aws] == [11]
+    client.credentials.list.assert_called_once_with(type='Database',
+                                                    iterator=True)
+
+
+def test_table_id_cached():
+    index, client = MetadataIndex(), _client()
+    assert index.table_id(client, 1, 'schema.table') == 5
+    assert index.table_id(client, 1, 'schema.table') == 5
+    assert client.tables.list.call_count == 1
+
+
+def test_table_id_not_exact_match():
+    index, client = MetadataIndex(), _client()
+    with pytest.raises(ValueError):
+        index.table_id(client, 1, 'schema.tab')
+    # Failed lookups aren't kept
+    with pytest.raises(ValueError):
+        index.table_id(client, 1, 'schema.tab')
+    assert client.tables.list.call_count == 2
+
+
+def test_warm_and_invalidate():
+    index, client = MetadataIndex(), _client()
+    index.warm(client, tables=[(1, 'schema')])
+    client.tables.list.assert_called_once_with(database_id=1,
+                                               schema='schema', iterator=True)
+    assert client.credentials.list.call_count == 2
+    index.database(client, 'db1')
+    index.table_id(client, 1, 'schema.table')
+    assert client.databases.list.call_count == 1
+    assert client.tables.list.call_count == 1
+
+    index.invalidate('databases')
+    index.database(client, 'db1')
+    index.table_id(client, 1, 'schema.table')
+    assert client.databases.list.call_count == 2
+    assert client.tables.list.call_count == 1
+
+    index.invalidate()
+    index.table_id(client, 1, 'schema.table')
+    assert client.tables.list.call_count == 2
+
+    with pytest.raises(ValueError):
+        index.invalidate('files')
+
+
+def test_shared_by_api_key():
+    assert get_metadata_index('key', 'url') is get_metadata_index('key', 'url')
+    assert (get_metadata_index('key', 'url') is not
+            get_metadata_index('other', 'url'))
+
+
+@mock.patch.object(_metadata, '_indexes', {})
+def test_client_lookups_shared():
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec)
+    other = APIClient(api_key='key', local_api_spec=civis_api_spec)
+    assert client.metadata_index is other.metadata_index
+    response = [Response({'id': 1, 'name': 'db1'})]
+    with mock.patch.object(type(client.databases), 'list',
+                           return_value=response) as mock_list:
+        assert client.get_database_id('db1') == 1
+        assert other.get_database_id('db1') == 1
+    assert mock_list.call_count == 1
+
+
+@mock.patch.object(_metadata, '_indexes', {})
+def test_client_not_kept_alive():
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec)
+    with mock.patch.object(type(client.users), 'list_me',
+                           return_value=Response({'username': 'me'})):
+        assert client.username == 'me'
+    ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert ref() is None
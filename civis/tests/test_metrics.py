@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from civis import _metrics
+from civis._metrics import RequestMetrics
+from civis.compat import mock
+
+
+def _response(status_code=200, content=b'{}', body=None, retries=0):
+    response = mock.Mock(status_code=status_code, content=content)
+    response.request.body = body
+    response.raw.retries.history = [mock.Mock()] * retries
+    return response
+
+
+@mock.patch.object(_metrics, '_clock', side_effect=[0, 0.02, 0, 2])
+def test_metrics_snapshot(mock_clock):
+    metrics = RequestMetrics(latency_buckets=[0.1, 1])
+    metrics.observe('files.get', 'GET', 'u',
+                    lambda: _response(content=b'12345', retries=2))
+    metrics.observe('files.post', 'POST', 'u',
+                    lambda: _response(status_code=503, body=b'{"a": 1}'))
+
+    snapshot = json.loads(json.dumps(metrics.snapshot()))
+    assert snapshot['files.get'] == {
+        'calls': 1, 'errors_4xx': 0, 'errors_5xx': 0, 'exceptions': 0,
+        'retries': 2, 'bytes_sent': 0, 'bytes_received': 5,
+        'seconds': 0.02, 'max_seconds': 0.02,
+        'latency': [[0.1, 1], [1, 0], [None, 0]]}
+    assert snapshot['files.post']['errors_5xx'] == 1
+    assert snapshot['files.post']['bytes_sent'] == 8
+    assert snapshot['files.post']['latency'] == [[0.1, 0], [1, 0], [None, 1]]
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_metrics_callbacks():
+    metrics = RequestMetrics()
+    calls = []
+
+    @metrics.before_request
+    def before(info):
+        calls.append(('before', dict(info)))
+
+    @metrics.after_request
+    def after(info):
+        calls.append(('after', info['name'], info['status_code']))
+
+    metrics.observe('files.get', 'GET', 'u', lambda: _response(404))
+    assert calls == [
+        ('before', {'name': 'files.get', 'method': 'GET', 'url': 'u'}),
+        ('after', 'files.get', 404)]
+    assert metrics.snapshot()['files.get']['errors_4xx'] == 1
+
+
+def test_metrics_exception():
+    metrics = RequestMetrics()
+    after = metrics.after_request(mock.Mock())
+    error = IOError('connection reset')
+
+    def send():
+        raise error
+
+    with pytest.raises(IOError):
+        metrics.observe('files.get', 'GET', 'u', send)
+    assert metrics.snapshot()['files.get']['exceptions'] == 1
+    assert after.call_args[0][0]['exception'] is error
+
+
+def test_metrics_callback_errors_ignored():
+    metrics = RequestMetrics()
+    metrics.before_request(mock.Mock(side_effect=ValueError))
+    metrics.after_request(mock.Mock(side_effect=ValueError))
+    after = metrics.after_request(mock.Mock())
+
+    response = _response()
+    assert metrics.observe('files.get', 'GET', 'u',
+                           lambda: response) is response
+    assert after.call_count == 1
+    assert metrics.snapshot()['files.get']['calls'] == 1
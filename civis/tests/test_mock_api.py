@@ -0,0 +1,180 @@
+"""Exercise the client over HTTP against the local stand-in for the API."""
+import io
+import multiprocessing
+import os
+
+import pytest
+import requests
+
+import civis
+from civis.futures import CivisFuture
+from civis.resources._resources import get_api_spec, generate_classes
+from civis.compat import mock
+from civis.tests.mock_api import MockCivisAPI
+
+
+@pytest.fixture
+def api():
+    with MockCivisAPI() as api:
+        yield api
+
+
+def test_api_call(api):
+    client = api.client()
+    assert client.users.list_me().username == 'mock'
+    assert api.calls[('GET', '/users/me')] == 1
+
+
+def test_api_key_required(api):
+    response = requests.get(api.url + 'users/me')
+    assert response.status_code == 401
+    assert 'WWW-Authenticate' in response.headers
+
+
+def test_download_api_spec(api):
+    get_api_spec.cache_clear()
+    generate_classes.cache_clear()
+    try:
+        with mock.patch.dict('os.environ',
+                             {'CIVIS_API_SPEC_CACHE_TTL': '0'}):
+            client = api.client(local_api_spec=None)
+        assert client.users.list_me().username == 'mock'
+    finally:
+        get_api_spec.cache_clear()
+        generate_classes.cache_clear()
+    assert api.calls[('GET', '/endpoints')] == 1
+
+
+def test_retries_injected_failures(api):
+    api.fail_next(1, status_code=503, retry_after=0)
+    client = api.client()
+    assert client.users.list_me().username == 'mock'
+    assert api.calls[('GET', '/users/me')] == 2
+
+
+def test_rate_limit():
+    with MockCivisAPI(rate_limit=2) as api:
+        client = api.client(retry_total=0)
+        assert client.users.list_me().headers['X-RateLimit-Remaining'] == '1'
+        client.users.list_me()
+        with pytest.raises(requests.exceptions.RetryError):
+            client.users.list_me()
+    assert api.calls[('GET', '/users/me')] == 3
+
+
+def test_paginated_list(api):
+    client = api.client()
+    credentials = list(client.credentials.list(iterator=True))
+    assert [c.id for c in credentials] == list(range(1, 101))
+    assert client.default_credential == 1
+
+
+def test_file_round_trip(api):
+    client = api.client()
+    file_id = civis.io.file_to_civis(io.BytesIO(b'some data'), 'data',
+                                     client=client)
+    assert api.file_contents(file_id) == b'some data'
+    buf = io.BytesIO()
+    civis.io.civis_to_file(file_id, buf, client=client)
+    assert buf.getvalue() == b'some data'
+
+
+def test_storage_rejects_api_key(api):
+    file_id = api.add_file(b'data')
+    url = api.client().files.get(file_id).file_url
+    response = requests.get(url, auth=('key', ''))
+    assert response.status_code == 400
+
+
+def test_read_civis_sql():
+    with MockCivisAPI(job_duration=0.05) as api:
+        client = api.client()
+        data = civis.io.read_civis_sql('select 1', 'mock', client=client,
+                                       polling_interval=0.01)
+    assert data == [['a', 'b'], ['1', '2'], ['3', '4']]
+
+
+def test_csv_to_civis(api, tmpdir):
+    path = str(tmpdir.join('data.csv'))
+    with open(path, 'w') as f:
+        f.write('a,b\n1,2\n')
+    client = api.client()
+    fut = civis.io.csv_to_civis(path, 'mock', 'schema.table', client=client,
+                                polling_interval=0.01)
+    assert fut.result().state == 'succeeded'
+    assert api.upload_contents(fut.poller_args[0]) == b'a,b\n1,2\n'
+
+
+def test_query_civis(api):
+    client = api.client()
+    fut = civis.io.query_civis('select 1', 'mock', client=client,
+                               polling_interval=0.01)
+    assert fut.result().result_rows == [['1', '2'], ['3', '4']]
+
+
+def test_failed_run():
+    with MockCivisAPI(job_duration=0.05) as api:
+        api.final_state = 'failed'
+        client = api.client()
+        job = client.scripts.post_containers(required_resources={},
+                                             docker_command='true',
+                                             docker_image_name='image')
+        run = client.scripts.post_containers_runs(job.id)
+        fut = CivisFuture(client.scripts.get_containers_runs,
+                          (job.id, run.id), polling_interval=0.01,
+                          client=client)
+        assert fut.exception() is not None
+    assert fut.failed()
+
+
+def test_run_outputs(api):
+    client = api.client()
+    file_id = api.add_file(b'data', name='result.txt')
+    job = client.scripts.post_custom(from_template_id=1)
+    run = client.scripts.post_custom_runs(job.id)
+    client.scripts.post_custom_runs_outputs(job.id, run.id, 'File', file_id)
+    outputs = client.scripts.list_custom_runs_outputs(job.id, run.id)
+    assert outputs[0].name == 'result.txt'
+    assert civis.io.file_id_from_run_output('result.txt', job.id, run.id,
+                                            client=client) == file_id
+
+
+def test_get_many(api):
+    file_ids = [api.add_file(b'data', name=str(i)) for i in range(5)]
+    client = api.client()
+    results = client.files.get_many(file_ids + [999] + file_ids[:2],
+                                    max_workers=4)
+    assert [r.name for r in results[:5]] == ['0', '1', '2', '3', '4']
+    assert isinstance(results[5], civis.base.CivisAPIError)
+    assert results[5].status_code == 404
+    assert results[6] is results[0]
+    assert api.calls[('GET', '/files/{}'.format(file_ids[0]))] == 1
+
+
+def _username(client):
+    return client.users.list_me().username
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires fork")
+def test_client_in_worker_processes(api):
+    get_api_spec.cache_clear()
+    generate_classes.cache_clear()
+    try:
+        with mock.patch.dict('os.environ',
+                             {'CIVIS_API_SPEC_CACHE_TTL': '0'}):
+            client = api.client(local_api_spec=None)
+        assert _username(client) == 'mock'
+        pool = multiprocessing.get_context('fork').Pool(2)
+        try:
+            # Workers inherit the client's connections when forked and
+            # receive pickled copies of it with each task.
+            assert pool.map(_username, [client] * 4) == ['mock'] * 4
+            assert pool.apply(_username, (client,)) == 'mock'
+        finally:
+            pool.terminate()
+        assert _username(client) == 'mock'
+    finally:
+        get_api_spec.cache_clear()
+        generate_classes.cache_clear()
+    assert api.calls[('GET', '/endpoints')] == 1
+    assert api.calls[('GET', '/users/me')] == 7
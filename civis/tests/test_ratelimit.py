@@ -0,0 +1,96 @@
+import threading
+
+from civis import _ratelimit
+from civis._ratelimit import RateLimitGovernor, get_governor
+from civis.compat import mock
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_governor_unpaced_until_limit_known():
+    governor = RateLimitGovernor()
+    for _ in range(5):
+        assert governor.acquire() == 0
+    metrics = governor.metrics()
+    assert metrics['calls'] == 5
+    assert metrics['throttled_calls'] == 0
+    assert metrics['rate_limit'] is None
+
+
+def test_governor_update_from_headers():
+    governor = RateLimitGovernor(period=10)
+    governor.update({'X-RateLimit-Limit': '100',
+                     'X-RateLimit-Remaining': '7'})
+    metrics = governor.metrics()
+    assert metrics['rate_limit'] == 100
+    assert 7 <= metrics['tokens'] < 8
+
+    # Responses without rate limit headers don't change the pace
+    governor.update({})
+    assert governor.metrics()['rate_limit'] == 100
+
+
+@mock.patch.object(_ratelimit, '_clock')
+def test_governor_waits_for_tokens(mock_clock):
+    clock = FakeClock()
+    mock_clock.side_effect = clock
+    governor = RateLimitGovernor(period=10)
+    governor.update({'X-RateLimit-Limit': '10',
+                     'X-RateLimit-Remaining': '0'})
+
+    def wait(timeout):
+        clock.now += timeout
+
+    with mock.patch.object(governor._cond, 'wait', side_effect=wait):
+        waited = governor.acquire()
+
+    # One token is replenished every second
+    assert waited == 1
+    metrics = governor.metrics()
+    assert metrics['throttled_calls'] == 1
+    assert metrics['throttled_seconds'] == 1
+
+
+@mock.patch.object(_ratelimit, '_clock')
+def test_governor_retry_after_pauses(mock_clock):
+    clock = FakeClock()
+    mock_clock.side_effect = clock
+    governor = RateLimitGovernor()
+    governor.update({'Retry-After': '3'})
+
+    def wait(timeout):
+        clock.now += timeout
+
+    with mock.patch.object(governor._cond, 'wait', side_effect=wait):
+        assert governor.acquire() == 3
+        assert governor.acquire() == 0
+    assert governor.metrics()['pauses'] == 1
+
+
+def test_governor_shared_between_threads():
+    governor = RateLimitGovernor(period=0.05)
+    governor.update({'X-RateLimit-Limit': '2',
+                     'X-RateLimit-Remaining': '0'})
+    threads = [threading.Thread(target=governor.acquire) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    metrics = governor.metrics()
+    assert metrics['calls'] == 4
+    assert metrics['throttled_calls'] == 4
+
+
+def test_get_governor_per_key():
+    governor = get_governor('key', 'https://api.civisanalytics.com/')
+    assert get_governor('key', 'https://api.civisanalytics.com/') is governor
+    assert get_governor('other', 'https://api.civisanalytics.com/') \
+        is not governor
+    assert get_governor('key', 'http://localhost/') is not governor
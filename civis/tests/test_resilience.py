@@ -0,0 +1,78 @@
+from civis import _resilience
+from civis._resilience import CircuitBreakers, RetryBudget
+from civis.compat import mock
+
+
+@mock.patch.object(_resilience, '_clock', return_value=0)
+def test_retry_budget(mock_clock):
+    budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_balance=2)
+    changes = budget.on_state_change(mock.Mock())
+
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    assert budget.state == 'exhausted'
+    changes.assert_called_once_with('retry_budget', 'available', 'exhausted')
+
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    assert budget.state == 'available'
+    changes.assert_called_with('retry_budget', 'exhausted', 'available')
+    assert budget.metrics() == {'calls': 2, 'retries': 3, 'refused': 2,
+                                'balance': 0}
+
+
+@mock.patch.object(_resilience, '_clock', return_value=0)
+def test_retry_budget_refills_over_time(mock_clock):
+    budget = RetryBudget(ratio=0, min_retries_per_second=1, max_balance=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    mock_clock.return_value = 1
+    assert budget.withdraw()
+
+
+@mock.patch.object(_resilience, '_clock', return_value=0)
+def test_circuit_breaker_opens_and_recovers(mock_clock):
+    breakers = CircuitBreakers(failure_threshold=2, reset_timeout=10)
+    changes = breakers.on_state_change(mock.Mock())
+
+    breakers.record('files/1', False)
+    assert breakers.allow('files/2')
+    breakers.record('files/2', False)
+    assert breakers.state('files') == 'open'
+    assert not breakers.allow('files/3')
+    # Other resources are unaffected
+    assert breakers.allow('scripts/1')
+
+    mock_clock.return_value = 11
+    assert breakers.allow('files/4')
+    assert breakers.state('files') == 'half_open'
+    # Only one trial call at a time
+    assert not breakers.allow('files/5')
+    breakers.record('files/4', True)
+    assert breakers.state('files') == 'closed'
+    assert changes.call_args_list == [
+        mock.call('files', 'closed', 'open'),
+        mock.call('files', 'open', 'half_open'),
+        mock.call('files', 'half_open', 'closed')]
+
+
+@mock.patch.object(_resilience, '_clock', return_value=0)
+def test_circuit_breaker_failed_trial(mock_clock):
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=10)
+    breakers.record('files', False)
+    mock_clock.return_value = 11
+    assert breakers.allow('files')
+    breakers.record('files', False)
+    assert breakers.state('files') == 'open'
+    assert not breakers.allow('files')
+
+
+def test_circuit_breaker_successes_reset_failures():
+    breakers = CircuitBreakers(failure_threshold=2)
+    breakers.record('files', False)
+    breakers.record('files', True)
+    breakers.record('files', False)
+    assert breakers.state('files') == 'closed'
@@ -5,10 +5,12 @@ import pytest
 import six
 
 from jsonref import JsonRef
+import requests
 from requests.exceptions import HTTPError
 
-from civis.compat import mock
-from civis.resources import _resources
+from civis.base import Endpoint
+from civis.compat import mock, signature, TemporaryDirectory
+from civis.resources import _compiled, _resources, _spec_cache
 
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))
 with open(os.path.join(THIS_DIR, "civis_api_spec.json")) as f:
@@ -53,7 +55,7 @@ def test_create_method_iterator_kwarg():
 
     method(mock_endpoint, iterator=True)
     mock_endpoint._call_api.assert_called_once_with(
-        'get', '/objects', {}, {}, iterator=True)
+        'get', '/objects', {}, {}, iterator=True, method_name='mock_name')
 
 
 def test_create_method_no_iterator_kwarg():
@@ -219,6 +221,7 @@ class MockExpiredKeyResponse:
 mock_str = 'civis.resources._resources.requests.Session.get'
 
 
+@mock.patch.dict('os.environ', {'CIVIS_API_SPEC_CACHE_TTL': '0'})
 @mock.patch(mock_str, return_value=MockExpiredKeyResponse)
 def test_expired_api_key(mock_response):
     msg = "401 error downloading API specification. API key may be expired."
@@ -231,6 +234,52 @@ def test_expired_api_key(mock_response):
     assert http_error_raised
 
 
+def test_spec_cache_path():
+    with mock.patch.dict('os.environ', {'CIVIS_API_SPEC_CACHE_DIR': '/tmp/x',
+                                        'CIVIS_API_SPEC_CACHE_TTL': '60'}):
+        cache = _spec_cache.get_spec_cache('key', '1.0', 'https://api/')
+        assert os.path.dirname(cache.path) == '/tmp/x'
+        assert 'key' not in os.path.basename(cache.path)
+        assert cache.ttl == 60
+        other = _spec_cache.get_spec_cache('key2', '1.0', 'https://api/')
+        assert other.path != cache.path
+    with mock.patch.dict('os.environ', {'CIVIS_API_SPEC_CACHE_TTL': '0'}):
+        assert _spec_cache.get_spec_cache('key', '1.0', 'https://api/') is None
+
+
+def test_spec_cache_download_once():
+    download = mock.Mock(return_value=({'paths': {}}, '"v1"'))
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'civis', 'spec.json')
+        assert _spec_cache.SpecCache(path).get(download) == {'paths': {}}
+        assert _spec_cache.SpecCache(path).get(download) == {'paths': {}}
+    download.assert_called_once_with(None)
+
+
+def test_spec_cache_revalidate():
+    download = mock.Mock(return_value=({'paths': {}}, '"v1"'))
+    with TemporaryDirectory() as tempdir:
+        cache = _spec_cache.SpecCache(os.path.join(tempdir, 'spec.json'))
+        cache.get(download)
+        os.utime(cache.path, (0, 0))
+
+        download.return_value = (None, None)
+        assert cache.get(download) == {'paths': {}}
+        download.assert_called_with('"v1"')
+        assert cache._read()[2]
+
+
+def test_spec_cache_stale_if_offline():
+    download = mock.Mock(return_value=({'paths': {}}, None))
+    with TemporaryDirectory() as tempdir:
+        cache = _spec_cache.SpecCache(os.path.join(tempdir, 'spec.json'))
+        cache.get(download)
+        os.utime(cache.path, (0, 0))
+
+        download.side_effect = requests.ConnectionError
+        assert cache.get(download) == {'paths': {}}
+
+
 def test_create_method_unexpected_kwargs():
     args = [{"name": 'foo', "in": 'query', "required": True, "doc": ""},
             {"name": 'bar', "in": 'query', "required": False, "doc": ""}]
@@ -241,7 +290,8 @@ def test_create_method_unexpected_kwargs():
     # Method works without unexpected kwarg
     method(mock_endpoint, foo=0, bar=0)
     mock_endpoint._call_api.assert_called_once_with(
-        'get', '/objects', {"foo": 0, "bar": 0}, {}, iterator=False)
+        'get', '/objects', {"foo": 0, "bar": 0}, {}, iterator=False,
+        method_name='mock_name')
 
     # Method raises TypeError with unexpected kwarg
     if six.PY3:
@@ -255,6 +305,41 @@ def test_create_method_unexpected_kwargs():
     assert str(excinfo.value) == expected_msg
 
 
+def test_create_method_routes_arguments():
+    args = [{"name": 'id', "in": 'path', "required": True, "doc": ""},
+            {"name": 'name', "in": 'body', "required": True, "doc": ""},
+            {"name": 'limit', "in": 'query', "required": False, "doc": ""},
+            {"name": 'page_num', "in": 'query', "required": False, "doc": ""}]
+    method = _resources.create_method(args, 'get', 'mock_name',
+                                      '/objects/{id}', 'fake_doc')
+    mock_endpoint = mock.MagicMock()
+
+    with mock.patch.object(_resources.Signature, 'bind') as mock_bind:
+        method(mock_endpoint, 1, 'a', limit=5)
+        method(mock_endpoint, id=2, name='b', iterator=True)
+    assert not mock_bind.called
+    assert mock_endpoint._call_api.call_args_list == [
+        mock.call('get', '/objects/1', {'limit': 5}, {'name': 'a'},
+                  iterator=False, method_name='mock_name'),
+        mock.call('get', '/objects/2', {}, {'name': 'b'}, iterator=True,
+                  method_name='mock_name')]
+
+
+@pytest.mark.parametrize('args,kwargs,expected_msg', [
+    ((1,), {}, "missing a required argument: 'name'"),
+    ((1, 'a', 3), {}, "too many positional arguments"),
+    ((1, 'a'), {'id': 2}, "multiple values for argument 'id'"),
+])
+def test_create_method_binding_errors(args, kwargs, expected_msg):
+    params = [{"name": 'id', "in": 'path', "required": True, "doc": ""},
+              {"name": 'name', "in": 'body', "required": True, "doc": ""}]
+    method = _resources.create_method(params, 'get', 'mock_name',
+                                      '/objects/{id}', 'fake_doc')
+    with pytest.raises(TypeError) as excinfo:
+        method(mock.MagicMock(), *args, **kwargs)
+    assert str(excinfo.value) == expected_msg
+
+
 @mock.patch(MOCKED_OPEN, new_callable=mock.mock_open,
             read_data='{"test": true}')
 @mock.patch('civis.resources._resources.generate_classes', autospec=True)
@@ -267,21 +352,24 @@ def test_generate_classes_maybe_cached(mock_parse, mock_gen, mock_open):
     # Calls generate_classes when no cache is passed
     _resources.generate_classes_maybe_cached(None, api_key, api_version,
                                              resources)
-    mock_gen.assert_called_once_with(api_key, api_version, resources)
+    mock_gen.assert_called_once_with(api_key, api_version, resources,
+                                     Endpoint, None)
     mock_gen.reset_mock()
 
     # Handles OrderedDict
     spec = OrderedDict({"test": True})
     _resources.generate_classes_maybe_cached(spec, api_key, api_version,
                                              resources)
-    mock_parse.assert_called_once_with(spec, api_version, resources)
+    mock_parse.assert_called_once_with(spec, api_version, resources,
+                                       Endpoint)
     assert not mock_gen.called
 
     # Handles str
     mock_parse.reset_mock()
     _resources.generate_classes_maybe_cached('mock', api_key, api_version,
                                              resources)
-    mock_parse.assert_called_once_with(spec, api_version, resources)
+    mock_parse.assert_called_once_with(spec, api_version, resources,
+                                       Endpoint)
     assert not mock_gen.called
 
     # Error when a regular dict is passed
@@ -289,3 +377,114 @@ def test_generate_classes_maybe_cached(mock_parse, mock_gen, mock_open):
     with pytest.raises(ValueError):
         _resources.generate_classes_maybe_cached(bad_spec, api_key,
                                                  api_version, resources)
+
+
+def test_parse_api_spec_lazy():
+    spec = JsonRef.replace_refs(civis_api_spec)
+    classes = _resources.parse_api_spec(spec, "1.0", "all")
+    assert 'files' in classes
+    assert not classes._classes
+
+    files = classes['files']
+    assert classes['files'] is files
+    assert list(classes._classes) == ['files']
+    assert 'get' in dir(files)
+    assert 'get' not in vars(files)
+
+    method = files.get
+    assert 'get' in vars(files)
+    assert method.__doc__
+    assert str(signature(method)).startswith('(self, id')
+
+
+def test_resource_lazy_methods_bound():
+    spec = JsonRef.replace_refs(civis_api_spec)
+    classes = _resources.parse_api_spec(spec, "1.0", "all")
+    session = mock.Mock()
+    endpoint = classes['files'](session, 'raw')
+    with mock.patch.object(endpoint, '_call_api') as mock_call:
+        endpoint.get(1)
+    mock_call.assert_called_once_with('get', 'files/1', {}, {},
+                                      iterator=False, method_name='get')
+    with pytest.raises(AttributeError):
+        endpoint.not_a_method
+
+
+def test_get_many_generated():
+    spec = JsonRef.replace_refs(civis_api_spec)
+    classes = _resources.parse_api_spec(spec, "1.0", "all")
+    assert 'get_many' in dir(classes['files'])
+    # No `GET /databases/{id}`
+    assert 'get_many' not in dir(classes['databases'])
+
+    endpoint = classes['files'](mock.Mock(), 'snake')
+    error = ValueError("not found")
+
+    def get(file_id):
+        if file_id == 3:
+            raise error
+        return {'id': file_id}
+
+    with mock.patch.object(endpoint, 'get', side_effect=get) as mock_get:
+        assert endpoint.get_many([1, 3, 1, 2]) == [
+            {'id': 1}, error, {'id': 1}, {'id': 2}]
+        assert mock_get.call_count == 3
+        by_id = endpoint.get_many([2, 1], max_workers=1, as_dict=True)
+    assert list(by_id.items()) == [(2, {'id': 2}), (1, {'id': 1})]
+
+
+@pytest.mark.parametrize('resources', ['base', 'all'])
+def test_compiled_api_spec(resources):
+    expected = _resources.parse_api_spec(
+        JsonRef.replace_refs(civis_api_spec), "1.0", resources)
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'spec.bin')
+        _compiled.write_compiled_api_spec(civis_api_spec, path)
+        classes = _resources.generate_classes_maybe_cached(
+            path, 'key', "1.0", resources)
+
+    assert list(classes) == list(expected)
+    for name in expected:
+        assert classes[name].__name__ == expected[name].__name__
+        assert dir(classes[name]) == dir(expected[name])
+        for method_name in expected[name]._operations:
+            method = getattr(classes[name], method_name)
+            expected_method = getattr(expected[name], method_name)
+            assert method.__doc__ == expected_method.__doc__
+            assert signature(method) == signature(expected_method)
+
+
+def test_strip_compiled_api_spec():
+    table = _compiled.compile_api_spec(civis_api_spec)
+    stripped = _compiled.strip_compiled_api_spec(table, 'base')
+    assert all(method[4] is None
+               for _, methods in stripped['resources'].values()
+               for method in methods)
+    assert len(json.dumps(stripped)) < len(json.dumps(table)) / 4
+    assert (list(_compiled.classes_from_compiled_api_spec(
+                stripped, "1.0", 'base')) ==
+            list(_compiled.classes_from_compiled_api_spec(
+                table, "1.0", 'base')))
+
+    with mock.patch.dict(_compiled._tables_with_docs, clear=True):
+        files = _compiled.classes_from_compiled_api_spec(
+            stripped, "1.0", 'base')['files']
+        assert files.get.__doc__ == 'Calls GET /files/{id}'
+
+        _compiled.get_compiled_api_spec(table, 'key')
+        files = _compiled.classes_from_compiled_api_spec(
+            stripped, "1.0", 'base')['files']
+        expected = _compiled.classes_from_compiled_api_spec(
+            table, "1.0", 'base')['files']
+        assert files.get.__doc__ == expected.get.__doc__
+
+
+def test_compiled_api_spec_is_current():
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'spec.bin')
+        _compiled.write_compiled_api_spec(civis_api_spec, path)
+        assert _compiled.compiled_api_spec_is_current(path, civis_api_spec)
+
+        changed_spec = OrderedDict(civis_api_spec)
+        changed_spec['info'] = {'title': 'Civis API', 'version': '2'}
+        assert not _compiled.compiled_api_spec_is_current(path, changed_spec)
@@ -1,3 +1,6 @@
+import json
+import pickle
+
 import pytest
 
 import requests
@@ -8,16 +11,25 @@ try:
 except ImportError:
     has_pandas = False
 
+try:
+    import numpy as np
+    has_numpy = True
+except ImportError:
+    has_numpy = False
+
+from civis import response as _response
 from civis.compat import mock
 from civis.response import (
     CivisClientError, PaginatedResponse, _response_to_json,
-    convert_response_data_type, Response
+    columns_from_records, convert_response_data_type, Response,
+    set_json_decoder
 )
 
 
 def _create_mock_response(data, headers):
     mock_response = mock.MagicMock(spec=requests.Response)
     mock_response.json.return_value = data
+    mock_response.content = json.dumps(data).encode('utf-8')
     mock_response.headers = headers
     mock_response.status_code = 200
     return mock_response
@@ -76,11 +88,202 @@ def test_pagination():
     assert len(all_data) == 5
 
 
+def _mock_paged_endpoint(n_items, page_size, headers):
+    # Serve `n_items` items in pages, answering from the request params
+    def make_request(method, path, params):
+        start = (params['page_num'] - 1) * page_size
+        items = [{'id': i} for i in range(start, min(start + page_size,
+                                                     n_items))]
+        return _create_mock_response(items, headers)
+    mock_endpoint = mock.MagicMock()
+    mock_endpoint._make_request.side_effect = make_request
+    mock_endpoint._return_type = 'snake'
+    return mock_endpoint
+
+
+@pytest.mark.parametrize('headers', [
+    {'X-Pagination-Total-Pages': '7'},
+    {'X-Pagination-Total-Entries': '65', 'X-Pagination-Per-Page': '10'},
+    {'X-Pagination-Total-Entries': '65'},
+])
+def test_pagination_prefetch(headers):
+    mock_endpoint = _mock_paged_endpoint(65, 10, headers)
+    paginator = PaginatedResponse('/objects', {'limit': 3, 'param': 'v'},
+                                  mock_endpoint).prefetch(max_workers=3,
+                                                          page_size=10)
+
+    assert [obj['id'] for obj in paginator] == list(range(65))
+    # Only the pages reported by the headers are requested.
+    pages = sorted(call[0][2]['page_num']
+                   for call in mock_endpoint._make_request.call_args_list)
+    assert pages == list(range(1, 8))
+    for call in mock_endpoint._make_request.call_args_list:
+        assert call[0][2]['limit'] == 10
+        assert call[0][2]['param'] == 'v'
+
+
+def test_pagination_prefetch_without_headers():
+    mock_endpoint = _mock_paged_endpoint(25, 10, {})
+    paginator = PaginatedResponse('/objects', {}, mock_endpoint)
+
+    ids = [obj['id'] for obj in paginator.prefetch(max_workers=4)]
+
+    assert ids == list(range(25))
+    # Falls back to fetching pages one by one until an empty page.
+    assert mock_endpoint._make_request.call_count == 4
+
+
+def test_pagination_prefetch_stops_early():
+    mock_endpoint = _mock_paged_endpoint(
+        1000, 10, {'X-Pagination-Total-Pages': '100'})
+    paginator = PaginatedResponse('/objects', {}, mock_endpoint)
+
+    for obj in paginator.prefetch(max_workers=2):
+        if obj['id'] == 15:
+            break
+
+    # The first page, and at most two pages ahead of the second
+    assert mock_endpoint._make_request.call_count <= 4
+
+
+def test_pagination_prefetch_error():
+    mock_endpoint = _mock_paged_endpoint(
+        30, 10, {'X-Pagination-Total-Pages': '3'})
+    make_request = mock_endpoint._make_request.side_effect
+
+    def fail_on_page_2(method, path, params):
+        if params['page_num'] == 2:
+            raise ValueError('page 2')
+        return make_request(method, path, params)
+    mock_endpoint._make_request.side_effect = fail_on_page_2
+
+    ids = []
+    with pytest.raises(ValueError):
+        for obj in PaginatedResponse('/objects', {},
+                                     mock_endpoint).prefetch():
+            ids.append(obj['id'])
+    assert ids == list(range(10))
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_pagination_cursor_resume(max_workers):
+    headers = {'X-Pagination-Total-Pages': '3'}
+    mock_endpoint = _mock_paged_endpoint(25, 10, headers)
+    paginator = PaginatedResponse('/objects', {'param': 'v'}, mock_endpoint,
+                                  page_size=10, max_workers=max_workers)
+
+    ids = []
+    for obj in paginator:
+        ids.append(obj['id'])
+        if obj['id'] == 12:
+            break
+    cursor = json.loads(json.dumps(paginator.cursor))
+    assert cursor == {'path': '/objects',
+                      'params': {'param': 'v', 'limit': 10},
+                      'page_num': 2, 'offset': 3}
+
+    mock_endpoint._make_request.reset_mock()
+    other = PaginatedResponse('/objects', {}, mock_endpoint,
+                              max_workers=max_workers)
+    ids.extend(obj['id'] for obj in other.resume(cursor))
+
+    assert ids == list(range(25))
+    pages = sorted(call[0][2]['page_num']
+                   for call in mock_endpoint._make_request.call_args_list)
+    assert pages[:2] == [2, 3]
+    for call in mock_endpoint._make_request.call_args_list:
+        assert call[0][2]['limit'] == 10
+
+
+def test_pagination_resume_wrong_path():
+    paginator = PaginatedResponse('/objects', {}, mock.MagicMock())
+    cursor = dict(paginator.cursor, path='/other')
+    with pytest.raises(ValueError):
+        paginator.resume(cursor)
+
+
+def test_pagination_continues_after_error():
+    mock_endpoint = _mock_paged_endpoint(25, 10, {})
+    make_request = mock_endpoint._make_request.side_effect
+    failures = [requests.ConnectionError('page 2')]
+
+    def fail_once_on_page_2(method, path, params):
+        if params['page_num'] == 2 and failures:
+            raise failures.pop()
+        return make_request(method, path, params)
+    mock_endpoint._make_request.side_effect = fail_once_on_page_2
+
+    paginator = PaginatedResponse('/objects', {}, mock_endpoint)
+    ids = []
+    with pytest.raises(requests.ConnectionError):
+        for obj in paginator:
+            ids.append(obj['id'])
+    assert ids == list(range(10))
+
+    # Nothing is repeated, and page 1 isn't fetched again.
+    ids.extend(obj['id'] for obj in paginator)
+    assert ids == list(range(25))
+    pages = [call[0][2]['page_num']
+             for call in mock_endpoint._make_request.call_args_list]
+    assert pages == [1, 2, 2, 3, 4]
+
+
+def test_pagination_to_columns():
+    results = [
+        [{'id': 1, 'jobName': 'job_1'}, {'id': 2, 'jobName': 'job_2'}],
+        [{'id': 3, 'jobName': 'job_3', 'extra': True}],
+        []
+    ]
+    mock_endpoint = mock.MagicMock()
+    mock_endpoint._make_request.side_effect = [
+        _create_mock_response(result, {}) for result in results
+    ]
+    mock_endpoint._return_type = 'columnar'
+
+    paginator = PaginatedResponse('/objects', {'limit': 2}, mock_endpoint)
+    columns = paginator.to_columns()
+
+    assert list(columns) == ['id', 'job_name', 'extra']
+    assert list(columns['id']) == [1, 2, 3]
+    assert list(columns['job_name']) == ['job_1', 'job_2', 'job_3']
+    assert list(columns['extra']) == [None, None, True]
+    assert mock_endpoint._make_request.call_count == 3
+
+
 def test_response_to_json_no_error():
     raw_response = _create_mock_response({'key': 'value'}, None)
     assert _response_to_json(raw_response) == {'key': 'value'}
 
 
+def test_response_to_json_custom_decoder():
+    raw_response = _create_mock_response({'key': 'value'}, None)
+    loads = mock.Mock(return_value={'decoded': True})
+    set_json_decoder(loads)
+    try:
+        assert _response_to_json(raw_response) == {'decoded': True}
+    finally:
+        set_json_decoder()
+    loads.assert_called_once_with(b'{"key": "value"}')
+
+
+def test_response_to_json_decoder_fallback():
+    # Documents which the fast decoder rejects are decoded with `json`.
+    raw_response = _create_mock_response(None, None)
+    raw_response.content = b'{"id": 100000000000000000000}'
+    set_json_decoder(mock.Mock(side_effect=ValueError))
+    try:
+        assert _response_to_json(raw_response) == {'id': 10 ** 20}
+    finally:
+        set_json_decoder()
+
+
+@mock.patch.object(_response, '_json_decoder', json.loads)
+def test_response_to_json_standard_library():
+    raw_response = _create_mock_response({'key': 'value'}, None)
+    raw_response.content = None
+    assert _response_to_json(raw_response) == {'key': 'value'}
+
+
 def test_response_to_no_content_snake():
     for code in [204, 205]:
         raw_response = _create_empty_response(code, {'header1': 'val1'})
@@ -94,6 +297,7 @@ def test_response_to_no_content_snake():
 def test_response_to_json_parsing_error():
     raw_response = mock.MagicMock()
     raw_response.json.side_effect = ValueError('Invalid json')
+    raw_response.content = b'Invalid json'
     with pytest.raises(CivisClientError) as excinfo:
         _response_to_json(raw_response)
     assert 'Unable to parse JSON from response' in str(excinfo.value)
@@ -152,3 +356,99 @@ def test_convert_data_type_civis_list():
     assert isinstance(data[0], Response)
     assert data[0]['foo'] == 'bar'
     assert data[0].headers == {'header': 'val'}
+
+
+def test_convert_data_type_columnar():
+    response = _create_mock_response(
+        [{'fooBar': 1, 'name': 'a', 'nested': {'x': 1}},
+         {'fooBar': 2, 'name': 'b', 'nested': None}],
+        {'header': 'val'})
+    data = convert_response_data_type(response, return_type='columnar')
+
+    assert list(data) == ['foo_bar', 'name', 'nested']
+    assert list(data['foo_bar']) == [1, 2]
+    assert list(data['name']) == ['a', 'b']
+    assert list(data['nested']) == [{'x': 1}, None]
+
+
+def test_convert_data_type_columnar_single_object():
+    response = _create_mock_response({'fooBar': 1}, {'header': 'val'})
+    data = convert_response_data_type(response, return_type='columnar')
+
+    assert isinstance(data, Response)
+    assert data.foo_bar == 1
+    assert data.headers == {'header': 'val'}
+
+
+@pytest.mark.skipif(not has_numpy, reason='numpy not installed')
+def test_columns_from_records_dtypes():
+    columns = columns_from_records([
+        {'i': 1, 'f': 1, 'b': True, 's': 'x', 'big': 2 ** 70, 'l': [1, 2]},
+        {'i': 2, 'f': 2.5, 'b': False, 's': None, 'big': 1, 'l': [3, 4]},
+    ])
+
+    assert columns['i'].dtype == np.int64
+    assert columns['f'].dtype == np.float64
+    assert columns['b'].dtype == np.bool_
+    for name in ['s', 'big', 'l']:
+        assert columns[name].dtype == object
+        assert columns[name].shape == (2,)
+    assert columns['l'][1] == [3, 4]
+
+
+def test_columns_from_records_empty():
+    assert columns_from_records([]) == {}
+
+
+def test_response_nested_objects():
+    json_data = {'fooBar': {'bazQux': 1},
+                 'items': [{'innerKey': 2}, 3],
+                 'scalars': [1, 2]}
+    response = Response(json_data, headers={'X-RateLimit-Remaining': '9',
+                                            'X-RateLimit-Limit': '10'})
+
+    assert response.json_data is json_data
+    assert sorted(response) == ['foo_bar', 'items', 'scalars']
+    assert isinstance(response.foo_bar, Response)
+    assert response.foo_bar.bazQux == 1
+    assert response['foo_bar'] is response.foo_bar
+    # Keys which shadow dict methods are still attributes
+    assert response.items[0].inner_key == 2
+    assert response.items[1] == 3
+    assert response.scalars == [1, 2]
+    assert response.get('missing') is None
+    assert response.calls_remaining == '9'
+    assert response.rate_limit == '10'
+    assert response == {'foo_bar': {'bazQux': 1},
+                        'items': [{'inner_key': 2}, 3],
+                        'scalars': [1, 2]}
+    with pytest.raises(AttributeError):
+        response.missing
+
+
+def test_response_dict_matches_converted():
+    json_data = {'params': [{'defaultValue': 3}], 'fooBar': {'bazQux': 1}}
+    expected = {'params': [{'default_value': 3}], 'foo_bar': {'bazQux': 1}}
+    assert dict(Response(json_data)) == expected
+    assert Response(json_data) == expected
+
+    read = Response(json_data)
+    read.params
+    read.foo_bar
+    assert read == Response(json_data)
+    assert dict(read) == dict(Response(json_data))
+
+
+def test_response_values_converted():
+    response = Response({'a': {'b': 1}, 'c': [{'d': 2}]})
+    assert all(isinstance(v, (Response, list)) for v in response.values())
+    assert isinstance(dict(response.items())['a'], Response)
+    assert isinstance(response.copy()['c'][0], Response)
+
+
+def test_response_pickle():
+    response = Response({'fooBar': {'baz': 1}}, headers={'h': 'v'})
+    unpickled = pickle.loads(pickle.dumps(response))
+    assert unpickled == response
+    assert unpickled.foo_bar.baz == 1
+    assert unpickled.headers == {'h': 'v'}
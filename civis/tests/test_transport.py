@@ -0,0 +1,267 @@
+from collections import OrderedDict
+import io
+import json
+import os
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from six.moves.urllib.parse import urlparse
+
+import civis
+from civis import APIClient
+from civis.base import AggressiveRetry
+from civis.compat import mock
+from civis.resources._resources import get_api_spec, generate_classes
+from civis import _transport
+
+THIS_DIR = os.path.dirname(os.path.realpath(__file__))
+with open(os.path.join(THIS_DIR, "civis_api_spec.json")) as f:
+    civis_api_spec = json.load(f, object_pairs_hook=OrderedDict)
+
+API_URL = 'https://api.civisanalytics.com/'
+
+requires_httpx = pytest.mark.skipif(not _transport.HAS_HTTPX,
+                                    reason="requires httpx")
+
+
+class MemoryTransport(BaseAdapter):
+    """Answer requests from a dict of ``(method, path)`` to a status code
+    and a JSON-serializable object or bytes.
+    """
+    def __init__(self, routes):
+        super(MemoryTransport, self).__init__()
+        self.routes = routes
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        key = (request.method, urlparse(request.url).path)
+        status, data = self.routes.get(
+            key, (404, {'errorDescription': 'Not found'}))
+        response = requests.Response()
+        response.status_code = status
+        response.reason = 'OK' if status < 400 else 'Error'
+        response.headers = CaseInsensitiveDict(
+            {'Content-Type': 'application/json'})
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode('utf-8')
+        response.raw = io.BytesIO(data)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_memory_transport():
+    transport = MemoryTransport({('GET', '/files/1'): (200, {'id': 1})})
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec,
+                       transport=transport)
+    assert client.transport is transport
+    assert client.files.get(1).id == 1
+    assert transport.requests[0].headers['Authorization'].startswith('Basic')
+
+
+def test_memory_transport_downloads_api_spec():
+    get_api_spec.cache_clear()
+    generate_classes.cache_clear()
+    transport = MemoryTransport(
+        {('GET', '/endpoints'): (200, civis_api_spec),
+         ('GET', '/users/me'): (200, {'username': 'me'})})
+    try:
+        with mock.patch.dict('os.environ',
+                             {'CIVIS_API_SPEC_CACHE_TTL': '0'}):
+            client = APIClient(api_key='key', transport=transport)
+        assert client.users.list_me().username == 'me'
+    finally:
+        get_api_spec.cache_clear()
+        generate_classes.cache_clear()
+    assert [r.url for r in transport.requests] == [
+        API_URL + 'endpoints', API_URL + 'users/me']
+
+
+def test_memory_transport_file_download():
+    transport = MemoryTransport(
+        {('GET', '/files/1'): (200, {'id': 1,
+                                     'fileUrl': 'https://s3.test/f'}),
+         ('GET', '/f'): (200, b'file contents')})
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec,
+                       transport=transport)
+    buf = io.BytesIO()
+    civis.io.civis_to_file(1, buf, client=client)
+    assert buf.getvalue() == b'file contents'
+    # The API key isn't sent to the storage host
+    assert 'Authorization' not in transport.requests[1].headers
+
+
+def test_invalid_transport():
+    with pytest.raises(ValueError):
+        APIClient(api_key='key', local_api_spec=civis_api_spec,
+                  transport='carrier-pigeon')
+
+
+@requires_httpx
+def test_http2_transport_settings():
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec,
+                       transport='http2', timeout=5, retry_total=3)
+    assert isinstance(client.transport, _transport.HTTP2Adapter)
+    assert client.transport.timeout == 5
+    assert isinstance(client.transport.max_retries, AggressiveRetry)
+    assert client.transport.max_retries.total == 3
+
+
+def _http2_session(handler, max_retries=None, **kwargs):
+    import httpx
+    adapter = _transport.HTTP2Adapter(
+        max_retries=max_retries, transport=httpx.MockTransport(handler),
+        **kwargs)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    return session
+
+
+def _retry(total=2, **kwargs):
+    return AggressiveRetry(total, backoff_factor=0,
+                           status_forcelist=[502, 503], **kwargs)
+
+
+@requires_httpx
+def test_http2_adapter_api_call():
+    import httpx
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={'fileUrl': 'url'},
+                              headers={'X-Test': 'yes'})
+
+    client = APIClient(api_key='key', local_api_spec=civis_api_spec,
+                       transport=_transport.HTTP2Adapter(
+                           transport=httpx.MockTransport(handler)))
+    resp = client.files.get(1)
+    assert resp.file_url == 'url'
+    assert resp.headers['x-test'] == 'yes'
+    assert str(seen[0].url) == API_URL + 'files/1'
+    assert seen[0].headers['Authorization'].startswith('Basic')
+    assert 'civis-python' in seen[0].headers['User-Agent']
+
+
+@requires_httpx
+def test_http2_adapter_retries_response():
+    import httpx
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), headers={'Retry-After': '0'},
+                              json={})
+
+    session = _http2_session(handler, _retry())
+    response = session.post(API_URL + 'scripts')
+    assert response.status_code == 200
+    assert len(response.raw.retries.history) == 1
+
+
+@requires_httpx
+def test_http2_adapter_retries_exhausted():
+    import httpx
+
+    def handler(request):
+        return httpx.Response(503, json={})
+
+    session = _http2_session(handler, _retry(total=1))
+    with pytest.raises(requests.exceptions.RetryError):
+        session.get(API_URL + 'files/1')
+
+
+@requires_httpx
+def test_http2_adapter_retries_connection_error():
+    import httpx
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError('refused', request=request)
+        return httpx.Response(200, json={})
+
+    session = _http2_session(handler, _retry())
+    assert session.post(API_URL + 'scripts').status_code == 200
+    assert len(calls) == 2
+
+
+@requires_httpx
+def test_http2_adapter_does_not_retry_post_after_read_error():
+    import httpx
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadError('reset', request=request)
+
+    session = _http2_session(handler, _retry())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.post(API_URL + 'scripts')
+    assert len(calls) == 1
+
+
+@requires_httpx
+def test_http2_adapter_timeout():
+    import httpx
+
+    def handler(request):
+        raise httpx.ReadTimeout('slow', request=request)
+
+    session = _http2_session(handler)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(API_URL + 'files/1')
+
+
+@requires_httpx
+def test_http2_adapter_retries_file_body_from_start():
+    import httpx
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.read())
+        status = 503 if len(bodies) == 1 else 200
+        return httpx.Response(status, headers={'Retry-After': '0'})
+
+    session = _http2_session(handler, _retry())
+    response = session.put(API_URL + 'upload', data=io.BytesIO(b'abc'))
+    assert response.status_code == 200
+    assert bodies == [b'abc', b'abc']
+
+
+@requires_httpx
+def test_http2_adapter_streams_download():
+    import httpx
+
+    def handler(request):
+        return httpx.Response(200, content=b'x' * 100000)
+
+    session = _http2_session(handler)
+    response = session.get('https://s3.test/f', stream=True)
+    chunks = list(response.iter_content(32 * 1024))
+    assert len(chunks) > 1
+    assert b''.join(chunks) == b'x' * 100000
+
+
+@requires_httpx
+@pytest.mark.skipif(_transport.SyncBackend is None,
+                    reason="requires httpcore 0.14 or later")
+def test_http2_adapter_disables_nagle():
+    adapter = _transport.HTTP2Adapter()
+    pool = adapter._client._transport._pool
+    assert isinstance(pool._network_backend, _transport._NoDelayBackend)
+
+
+@requires_httpx
+def test_http2_adapter_reset_connections():
+    adapter = _transport.HTTP2Adapter(http2=False, verify=False)
+    client = adapter._client
+    adapter.reset_connections()
+    assert adapter._client is not client
+    assert not client.is_closed
@@ -1,5 +1,6 @@
 from civis.compat import mock
 from civis._utils import camel_to_snake, to_camelcase, maybe_get_random_name
+from civis._utils import run_concurrently
 
 
 def test_camel_to_snake():
@@ -33,3 +34,14 @@ def test_maybe_random_name_random(mock_uuid):
 def test_maybe_random_name_not_random():
     given_name = '22222'
     assert maybe_get_random_name(given_name) == given_name
+
+
+def test_run_concurrently():
+    error = ValueError('bad')
+
+    def fail():
+        raise error
+
+    funcs = [lambda: 1, fail, lambda: 3]
+    assert run_concurrently(funcs, max_workers=2) == [1, error, 3]
+    assert run_concurrently([], max_workers=2) == []
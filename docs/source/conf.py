@@ -40,6 +40,7 @@ extensions = [
 autosummary_generate = True
 
 intersphinx_mapping = {
+    'numpy': ('https://numpy.org/doc/stable', None),
     'pandas': ('http://pandas.pydata.org/pandas-docs/stable', None),
     'python': ('https://docs.python.org/3.4', None),
     'requests': ('https://requests.readthedocs.io/en/latest/', None),
@@ -60,6 +60,8 @@ def main():
             ],
             'pubnub': ['pubnub>=4.0.0,<=4.99'],
             'joblib': ['joblib>=0.11.0,<=0.11.99'],
+            'aiohttp:python_version>="3.5"': ['aiohttp>=2.3,<=3.99'],
+            'http2:python_version>="3.6"': ['httpx[http2]>=0.18,<=0.99'],
         },
         entry_points={
             'console_scripts': [